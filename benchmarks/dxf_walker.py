@@ -0,0 +1,93 @@
+"""
+Benchmark of the DXF chain walker (generate_cq_code) on synthetic DXFs.
+
+The drawings consist of closed polygons made of LINE and ARC entities that are
+written in random order and random direction, similar to laser-cut parts.
+
+    python benchmarks/dxf_walker.py 1000 10000 100000
+
+For each size the inline code generation, the data file generation and
+loading the data file with load_dxf are timed.
+"""
+
+import sys
+import math
+import random
+import tempfile
+from time import perf_counter
+
+import ezdxf
+
+from cq_editor.dxf_data import load_dxf
+from cq_editor.widgets.editor import generate_cq_code, generate_dxf_data
+
+
+def make_dxf(path, n_segments, sides=20, seed=0):
+
+    rng = random.Random(seed)
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+
+    entities = []
+    n_polygons = max(n_segments // sides, 1)
+    cols = math.ceil(math.sqrt(n_polygons))
+
+    for k in range(n_polygons):
+        cx, cy = 10.0 * (k % cols), 10.0 * (k // cols)
+        pts = [
+            (
+                cx + 4 * math.cos(2 * math.pi * i / sides),
+                cy + 4 * math.sin(2 * math.pi * i / sides),
+            )
+            for i in range(sides)
+        ]
+
+        for i in range(sides):
+            p1, p2 = pts[i], pts[(i + 1) % sides]
+            if i % 5 == 0:
+                a1 = math.degrees(2 * math.pi * i / sides)
+                a2 = math.degrees(2 * math.pi * (i + 1) / sides)
+                entities.append(("ARC", (cx, cy), a1, a2))
+            elif rng.random() < 0.5:
+                entities.append(("LINE", p2, p1))
+            else:
+                entities.append(("LINE", p1, p2))
+
+    rng.shuffle(entities)
+
+    for ent in entities:
+        if ent[0] == "LINE":
+            msp.add_line(ent[1], ent[2])
+        else:
+            msp.add_arc(ent[1], 4, ent[2], ent[3])
+
+    doc.saveas(path)
+
+
+def main(sizes):
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = f"{tmp}/bench_{n}.dxf"
+            make_dxf(path, n)
+
+            t0 = perf_counter()
+            code = generate_cq_code(path)
+            dt = perf_counter() - t0
+
+            print(f"{n:>7} segments: {dt:8.3f} s ({code.count('.close()')} chains)")
+
+            t0 = perf_counter()
+            generate_dxf_data(path)
+            dt_data = perf_counter() - t0
+
+            t0 = perf_counter()
+            load_dxf(path + ".json")
+            dt_load = perf_counter() - t0
+
+            print(f"{'':>7}   data file: {dt_data:8.3f} s, load_dxf: {dt_load:8.3f} s")
+
+
+if __name__ == "__main__":
+
+    main([int(n) for n in sys.argv[1:]] or [1000, 10000, 100000])
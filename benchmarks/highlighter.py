@@ -0,0 +1,97 @@
+"""
+Benchmark of the Python syntax highlighter on generated scripts.
+
+The scripts look like generated DXF chains and point lists with a few
+docstrings, comments and strings.
+
+    python benchmarks/highlighter.py 10000 100000 1000000
+
+For each size (in characters) the highlighting of the whole document, of a
+single-character edit and of opening and closing a triple-quoted string at
+the top of the document (which re-highlights every following block) are
+timed.
+"""
+
+import sys
+import random
+from time import perf_counter
+
+from PyQt5.QtWidgets import QApplication, QPlainTextDocumentLayout
+from PyQt5.QtGui import QTextDocument, QTextCursor
+
+from cq_editor.widgets.pyhighlight import PythonHighlighter
+
+
+def make_script(n_chars, seed=0):
+
+    rng = random.Random(seed)
+    lines = [
+        '"""',
+        "Generated part.",
+        '"""',
+        "import cadquery as cq",
+        "",
+        "pts = [",
+    ]
+
+    size = sum(len(line) + 1 for line in lines)
+    chain = False
+
+    while size < n_chars:
+        if rng.random() < 0.01:
+            chain = not chain
+            line = "result = (cq.Workplane('XY')" if chain else ")  # end of chain"
+        elif chain:
+            line = f"    .lineTo({rng.uniform(-100, 100):.4f}, {rng.uniform(-100, 100):.4f})"
+        else:
+            line = f"    ({rng.uniform(-100, 100):.4f}, {rng.uniform(-100, 100):.4f}),"
+
+        lines.append(line)
+        size += len(line) + 1
+
+    lines.append("]")
+
+    return "\n".join(lines)
+
+
+def main(sizes):
+
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    for n in sizes:
+        doc = QTextDocument()
+        # changes are signaled only with a layout
+        doc.setDocumentLayout(QPlainTextDocumentLayout(doc))
+        doc.setPlainText(make_script(n))
+
+        highlighter = PythonHighlighter(doc)
+
+        t0 = perf_counter()
+        highlighter.rehighlight()
+        dt_full = perf_counter() - t0
+
+        # the pending delayed highlight of the new document
+        app.processEvents()
+
+        cursor = QTextCursor(doc.findBlockByNumber(doc.blockCount() // 2))
+
+        t0 = perf_counter()
+        cursor.insertText("1")
+        dt_edit = perf_counter() - t0
+
+        cursor = QTextCursor(doc.findBlockByNumber(4))
+
+        t0 = perf_counter()
+        cursor.insertText('"""')
+        cursor.deletePreviousChar()
+        dt_state = perf_counter() - t0
+
+        print(
+            f"{n:>8} chars: full {dt_full:8.3f} s, edit {1000 * dt_edit:8.2f} ms, "
+            f"open/close string {dt_state:8.3f} s"
+        )
+
+
+if __name__ == "__main__":
+
+    main([int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000])
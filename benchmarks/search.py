@@ -0,0 +1,64 @@
+"""
+Benchmark of the editor search on generated scripts.
+
+    python benchmarks/search.py 10000 100000 1000000
+
+For each size (in characters) the time to type a search text character by
+character is measured, which is the time the editor is blocked by the
+search, as well as the time until the background search has counted all
+the matches and the time to jump to the last match.
+"""
+
+import os
+import sys
+from time import perf_counter
+
+from PyQt5.QtWidgets import QApplication
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from highlighter import make_script
+from cq_editor.widgets.editor import Editor
+
+
+def main(sizes, query="lineTo"):
+
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    for n in sizes:
+        editor = Editor()
+        editor.resize(800, 600)
+        editor.show()
+        editor.set_text(make_script(n))
+        app.processEvents()
+
+        search = editor.search_widget
+        search.show_search()
+
+        t0 = perf_counter()
+        for i in range(1, len(query) + 1):
+            search.search_input.setText(query[:i])
+        dt_typing = perf_counter() - t0
+
+        while search.searching:
+            app.processEvents()
+        dt_count = perf_counter() - t0
+
+        search.find_all_matches(query)
+
+        t0 = perf_counter()
+        search.find_previous()
+        dt_last = perf_counter() - t0
+
+        print(
+            f"{n:>8} chars: typing {1000 * dt_typing / len(query):8.2f} ms/key, "
+            f"count {dt_count:6.3f} s ({search.total_matches} matches), "
+            f"last match {1000 * dt_last:8.2f} ms"
+        )
+
+        editor.close()
+
+
+if __name__ == "__main__":
+
+    main([int(n) for n in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -1,6 +1,10 @@
 import sys
 import argparse
+from time import perf_counter
 
+T0 = perf_counter()
+
+from PyQt5.QtCore import QObject, QEvent, QTimer
 from PyQt5.QtWidgets import QApplication
 
 NAME = "CQ-editor"
@@ -8,13 +12,62 @@ NAME = "CQ-editor"
 # need to initialize QApp here, otherewise svg icons do not work on windows
 app = QApplication(sys.argv, applicationName=NAME)
 
+T_APP = perf_counter()
+
 from .main_window import MainWindow
 
+T_IMPORT = perf_counter()
+
+
+class FirstPaint(QObject):
+    """
+    Calls callback with the time of the first paint of the watched widget.
+    """
+
+    def __init__(self, widget, callback):
+
+        super(FirstPaint, self).__init__(widget)
+
+        self.callback = callback
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            self.callback(perf_counter())
+
+        return False
+
+
+def startup_report(win, t_window, t_paint):
+
+    print(f"QApplication             {1000 * (T_APP - T0):>10.1f} ms")
+    print(f"import main_window       {1000 * (T_IMPORT - T_APP):>10.1f} ms")
+    print(f"MainWindow()             {1000 * (t_window - T_IMPORT):>10.1f} ms")
+    print(f"first paint after        {1000 * (t_paint - T0):>10.1f} ms")
+    print()
+    print(win.startupReport())
+
+    def kernel_started():
+        print(f"\nconsole kernel started after {1000 * (perf_counter() - T0):.1f} ms")
+
+    console = win.components.get("console")
+    if console and console.kernel_ready:
+        kernel_started()
+    elif console:
+        console.sigKernelStarted.connect(kernel_started)
+
 
 def main():
 
     parser = argparse.ArgumentParser(description=NAME)
     parser.add_argument("filename", nargs="?", default=None)
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print the import and construction time of the components",
+    )
 
     args = parser.parse_args(app.arguments()[1:])
 
@@ -22,7 +75,19 @@ def main():
 
     try:
         win = MainWindow(filename=args.filename if args.filename else None)
+        t_window = perf_counter()
+
+        if args.profile_startup:
+            # after the panes visible at startup were created
+            FirstPaint(
+                win,
+                lambda t_paint: QTimer.singleShot(
+                    0, lambda: startup_report(win, t_window, t_paint)
+                ),
+            )
+
         win.show()
+
         app.exec_()
     except Exception as e:
         import traceback
@@ -0,0 +1,195 @@
+"""
+Headless batch rendering and export.
+
+Scripts are executed with the same semantics as Debugger.render (see
+script_runner) in a pool of worker processes and the shown objects are
+exported without creating any Qt objects.
+"""
+
+import os
+import sys
+import argparse
+import traceback
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from random import seed
+
+import cadquery as cq
+from OCP.AIS import AIS_InteractiveObject
+from path import Path
+
+from .cq_utils import export, to_compound, is_obj_empty, safe_name, unique_names
+from .script_runner import run_script, RANDOM_SEED
+
+FORMATS = ("step", "stl", "brep")
+
+
+def _to_shape(obj):
+
+    if isinstance(obj, cq.Assembly):
+        return obj.toCompound()
+
+    return to_compound(obj)
+
+
+def _output_stems(scripts):
+    """
+    Names of the output files of the scripts. Scripts with the same file name
+    are named after their path relative to the common directory of all the
+    scripts, e.g. a/part.py and b/part.py are exported as a_part and b_part.
+    """
+
+    paths = [Path(script).absolute() for script in scripts]
+    counts = Counter(p.stem for p in paths)
+
+    if paths and max(counts.values()) > 1:
+        root = os.path.commonpath([p.parent for p in paths])
+        stems = [
+            safe_name(p.relpath(root).stripext()) if counts[p.stem] > 1 else p.stem
+            for p in paths
+        ]
+    else:
+        stems = [p.stem for p in paths]
+
+    return unique_names(stems)
+
+
+def export_objects(cq_objects, stem, outdir, fmt="step", split=False, precision=0.1):
+    """
+    Export the shown objects into outdir. Returns the list of written files.
+    """
+
+    shapes = {
+        name: _to_shape(obj.shape)
+        for name, obj in cq_objects.items()
+        if not isinstance(obj.shape, AIS_InteractiveObject)
+        and not is_obj_empty(obj.shape)
+    }
+
+    if split:
+        # distinct object names can have the same sanitized name
+        names = unique_names([f"{stem}-{safe_name(name)}" for name in shapes])
+        items = list(zip(names, shapes.values()))
+    elif shapes:
+        items = [(stem, cq.Compound.makeCompound(list(shapes.values())))]
+    else:
+        items = []
+
+    rv = []
+
+    for name, shape in items:
+        fname = outdir / f"{name}.{fmt}"
+        export(shape, fmt, fname, precision)
+        rv.append(fname)
+
+    return rv
+
+
+def render_file(
+    script_path,
+    outdir,
+    fmt="step",
+    split=False,
+    precision=0.1,
+    reload_modules=True,
+    stem=None,
+):
+    """
+    Execute a single script and export the result, named stem or after the
+    script. Returns a tuple of the script path, the written files and the
+    formatted traceback (or None).
+    """
+
+    script_path = Path(script_path).absolute()
+    stem = stem or script_path.stem
+
+    seed(RANDOM_SEED)
+
+    try:
+        cq_objects, _ = run_script(
+            script_path.read_text(), script_path, reload_modules=reload_modules
+        )
+        outputs = export_objects(cq_objects, stem, Path(outdir), fmt, split, precision)
+    except Exception:
+        return script_path, [], traceback.format_exc()
+
+    return script_path, outputs, None
+
+
+def run_batch(scripts, outdir, jobs=None, **kwargs):
+    """
+    Render and export many scripts. Yields the results of render_file as they
+    become available; with jobs=1 everything runs in the current process.
+    """
+
+    outdir = Path(outdir).absolute()
+    outdir.makedirs_p()
+
+    stems = _output_stems(scripts)
+
+    if jobs == 1:
+        for script, stem in zip(scripts, stems):
+            yield render_file(script, outdir, stem=stem, **kwargs)
+        return
+
+    with ProcessPoolExecutor(jobs, mp_context=get_context("spawn")) as executor:
+        futures = [
+            executor.submit(render_file, script, outdir, stem=stem, **kwargs)
+            for script, stem in zip(scripts, stems)
+        ]
+
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        prog="cq-editor --batch",
+        description="Render CadQuery scripts and export the results headlessly.",
+    )
+    parser.add_argument("--batch", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("scripts", nargs="+", help="scripts to render")
+    parser.add_argument("-o", "--output", default=".", help="output directory")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="step")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count(), help="number of processes"
+    )
+    parser.add_argument(
+        "--split", action="store_true", help="write one file per shown object"
+    )
+    parser.add_argument("--precision", type=float, default=0.1, help="STL tolerance")
+    parser.add_argument(
+        "--no-reload",
+        action="store_true",
+        help="do not unload modules imported by the scripts",
+    )
+
+    args = parser.parse_args(argv)
+
+    failed = 0
+
+    for script, outputs, error in run_batch(
+        args.scripts,
+        args.output,
+        args.jobs,
+        fmt=args.format,
+        split=args.split,
+        precision=args.precision,
+        reload_modules=not args.no_reload,
+    ):
+        if error:
+            failed += 1
+            print(f"{script}: FAILED\n{error}", file=sys.stderr)
+        elif not outputs:
+            print(f"{script}: nothing to export")
+        else:
+            print(f"{script}: {', '.join(outputs)}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+jedi completions computed in a separate process.
+
+Inferring cadquery takes seconds the first time, so jedi runs in a persistent
+worker process that is warmed up with a cadquery completion when it starts.
+Only the newest pending request is answered and the jedi Script of the last
+text is kept, so that repeated requests on an unchanged buffer reuse its
+inference.
+"""
+
+import multiprocessing
+from itertools import count
+
+WARMUP = "import cadquery as cq\ncq.Workplane()."
+
+
+def format_signature(signature):
+    """
+    Human readable signature without the optional parameters.
+    """
+
+    params = [
+        (
+            f"{p.name}={p.description.split('=')[1].strip()}"
+            if "=" in p.description
+            else p.name
+        )
+        for p in signature.params
+        if "Optional" not in p.description
+    ]
+
+    return f"{signature.name}({','.join(params)})"
+
+
+class ScriptCache(object):
+    """
+    Completions of a text, reusing the jedi Script while the text and the
+    path do not change.
+    """
+
+    def __init__(self):
+
+        self._script = None
+        self._key = None
+
+    def complete(self, text, path=None, line=None, column=None, signatures=False):
+
+        # jedi is slow to import, load it in the worker process only
+        import jedi
+
+        if (text, path) != self._key:
+            self._script = jedi.Script(text, path=path or None)
+            self._key = (text, path)
+
+        if signatures:
+            return [
+                format_signature(s) for s in self._script.get_signatures(line, column)
+            ]
+
+        return [c.name for c in self._script.complete(line, column)]
+
+
+def completion_main(conn, warmup=WARMUP):
+    """Entry point of the completion process."""
+
+    cache = ScriptCache()
+
+    if warmup:
+        try:
+            cache.complete(warmup)
+        except Exception:
+            pass
+
+    while True:
+        try:
+            request = conn.recv()
+
+            # answer only the newest of the pending requests
+            while request is not None and conn.poll():
+                request = conn.recv()
+        except EOFError:
+            break
+
+        if request is None:
+            break
+
+        request_id, *args = request
+
+        try:
+            rv = cache.complete(*args)
+        except Exception:
+            rv = []
+
+        conn.send((request_id, rv))
+
+
+class Completer(object):
+    """
+    Client side of the completion process shared by the editors.
+    """
+
+    def __init__(self, warmup=WARMUP):
+
+        self.warmup = warmup
+
+        self._process = None
+        self._conn = None
+        self._callbacks = {}
+        self._ids = count(1)
+
+    def start(self):
+
+        if self._process is None or not self._process.is_alive():
+            ctx = multiprocessing.get_context("spawn")
+            self._conn, child_conn = ctx.Pipe()
+            self._process = ctx.Process(
+                target=completion_main, args=(child_conn, self.warmup), daemon=True
+            )
+            self._process.start()
+            child_conn.close()
+
+            self._callbacks.clear()
+
+    def submit(self, text, path, line, column, signatures, callback):
+        """
+        Request completions at the 1-based line and 0-based column. callback
+        is called by poll with the request id and the completions. Returns
+        the request id.
+        """
+
+        self.start()
+
+        request_id = next(self._ids)
+        self._callbacks[request_id] = callback
+        self._conn.send((request_id, text, path, line, column, signatures))
+
+        return request_id
+
+    def poll(self):
+        """
+        Call the callbacks of the answered requests. Returns the number of
+        requests still pending.
+        """
+
+        try:
+            while self._callbacks and self._conn.poll():
+                request_id, rv = self._conn.recv()
+
+                # the older requests were superseded
+                for i in [i for i in self._callbacks if i < request_id]:
+                    del self._callbacks[i]
+
+                callback = self._callbacks.pop(request_id, None)
+                if callback:
+                    try:
+                        callback(request_id, rv)
+                    except RuntimeError:  # the editor was deleted
+                        pass
+        except (OSError, EOFError):
+            pass
+
+        if not self._process.is_alive():
+            self._callbacks.clear()
+
+        return len(self._callbacks)
+
+    def shutdown(self):
+
+        if self._process is not None:
+            try:
+                self._conn.send(None)
+            except OSError:  # the process is gone already
+                pass
+
+            self._process.join(1)
+            self._process.terminate()
+            self._process = None
+            self._conn = None
+
+
+COMPLETER = Completer()
@@ -3,7 +3,12 @@ from cadquery.occ_impl.assembly import toCAF
 
 from typing import List, Union
 from importlib import reload
-from types import SimpleNamespace
+from types import SimpleNamespace, ModuleType
+from collections import OrderedDict, defaultdict
+from hashlib import sha1
+from io import BytesIO
+import re
+from math import floor, log2
 
 from OCP.XCAFPrs import XCAFPrs_AISObject
 from OCP.TopoDS import TopoDS_Shape
@@ -14,13 +19,443 @@ from OCP.Quantity import (
     Quantity_NOC_GOLD as GOLD,
 )
 from OCP.Graphic3d import Graphic3d_NOM_JADE, Graphic3d_MaterialAspect
+from OCP.Prs3d import Prs3d_Drawer
+from OCP.StdPrs import StdPrs_ToolTriangulatedShape
+from OCP.BRepTools import BRepTools
+from OCP.BRep import BRep_Tool
+from OCP.TopTools import TopTools_FormatVersion
+from OCP.TopExp import TopExp_Explorer
+from OCP.TopAbs import TopAbs_FACE
+from OCP.TopoDS import TopoDS, TopoDS_Compound
+from OCP.TopLoc import TopLoc_Location
+from OCP.BRep import BRep_Builder
+from OCP.BRepMesh import BRepMesh_IncrementalMesh
+from OCP.BRepBndLib import BRepBndLib
+from OCP.Bnd import Bnd_Box
 
 from PyQt5.QtGui import QColor
 
+from .profiler import span
+
 DEFAULT_FACE_COLOR = Quantity_Color(GOLD)
 DEFAULT_MATERIAL = Graphic3d_MaterialAspect(Graphic3d_NOM_JADE)
 
 
+def shape_hash(shape: TopoDS_Shape) -> str:
+    """
+    Content hash of the geometry and topology of a shape (triangulation excluded).
+    """
+
+    buf = BytesIO()
+    BRepTools.Write_s(
+        shape,
+        buf,
+        False,
+        False,
+        TopTools_FormatVersion.TopTools_FormatVersion_VERSION_1,
+    )
+
+    return sha1(buf.getvalue()).hexdigest()
+
+
+def geometry_hash(obj, options={}):
+    """
+    Fingerprint of a CQ object and its display options. Returns None for
+    objects that cannot be hashed (assemblies, AIS objects).
+    """
+
+    digest = object_hash(obj)
+
+    if digest is None:
+        return None
+
+    return digest, repr(sorted(options.items()))
+
+
+_ATOMIC = (int, float, complex, str, bytes, bool, type(None), ModuleType, type)
+
+
+def object_state(value, depth=4):
+    """
+    Cheap signature of the state of a value that can be changed in place,
+    e.g. with Shape.move, Assembly.add or list.append. Returns None if the
+    state of the value cannot be captured.
+    """
+
+    if isinstance(value, _ATOMIC) or hasattr(value, "__code__"):
+        return ()
+
+    if depth == 0:
+        return None
+
+    if isinstance(value, cq.Shape):
+        return hash(value.wrapped), value.wrapped.Orientation()
+
+    if isinstance(value, (cq.Vector, cq.Location)):
+        return value.toTuple()
+
+    if isinstance(value, cq.Plane):
+        return value.origin.toTuple(), value.xDir.toTuple(), value.zDir.toTuple()
+
+    if isinstance(value, cq.Workplane):
+        parts = (
+            value.plane,
+            value.objects,
+            value.ctx.pendingWires,
+            value.ctx.pendingEdges,
+        )
+        extra = (id(value.parent), value._tag)
+    elif isinstance(value, cq.Sketch):
+        parts = (value._faces, value._edges, value.locs, value._selection or [])
+        extra = (tuple(value._tags), len(value._constraints))
+    elif isinstance(value, cq.Assembly):
+        parts = [(a.loc, a.obj) for a in value.objects.values()]
+        extra = tuple((name, a.color) for name, a in value.objects.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        parts = value
+        extra = (type(value), len(value))
+    elif isinstance(value, dict):
+        parts = list(value.values())
+        extra = (type(value), tuple(value))
+    else:
+        return None
+
+    rv = [extra]
+
+    for part in parts:
+        state = object_state(part, depth - 1)
+        if state is None:
+            return None
+        rv.append((id(part), state))
+
+    return tuple(rv)
+
+
+# id of a CQ object -> (object, state, hash) of the last hashed objects
+_HASHES = OrderedDict()
+_HASHES_SIZE = 256
+
+
+def object_hash(obj):
+    """
+    shape_hash of the compound of a CQ object or None if it cannot be hashed
+    (assemblies, AIS objects). The hash is computed once per object and
+    reused until the object is changed in place.
+    """
+
+    if isinstance(obj, (cq.Assembly, AIS_InteractiveObject)):
+        return None
+
+    state = object_state(obj)
+    memo = _HASHES.get(id(obj))
+
+    if memo is not None and memo[0] is obj and state is not None and memo[1] == state:
+        _HASHES.move_to_end(id(obj))
+        return memo[2]
+
+    try:
+        comp = to_compound(obj)
+    except (ValueError, IndexError):
+        return None
+
+    rv = shape_hash(comp.wrapped)
+
+    if state is not None:
+        # the object is kept alive so that its id is not reused
+        _HASHES[id(obj)] = (obj, state, rv)
+        _HASHES.move_to_end(id(obj))
+
+        while len(_HASHES) > _HASHES_SIZE:
+            _HASHES.popitem(last=False)
+
+    return rv
+
+
+def face_count(shape: TopoDS_Shape) -> int:
+
+    rv = 0
+    exp = TopExp_Explorer(shape, TopAbs_FACE)
+
+    while exp.More():
+        rv += 1
+        exp.Next()
+
+    return rv
+
+
+def triangulation_size(shape: TopoDS_Shape) -> int:
+    """
+    Approximate memory footprint of the triangulation attached to the faces of a shape.
+    """
+
+    rv = 0
+    loc = TopLoc_Location()
+    exp = TopExp_Explorer(shape, TopAbs_FACE)
+
+    while exp.More():
+        tri = BRep_Tool.Triangulation_s(TopoDS.Face_s(exp.Current()), loc)
+        if tri is not None:
+            # nodes with normals + triangle indices
+            rv += 36 * tri.NbNodes() + 12 * tri.NbTriangles()
+        exp.Next()
+
+    return rv
+
+
+def triangle_count(shape: TopoDS_Shape) -> int:
+    """
+    Number of triangles in the triangulation attached to the faces of a shape.
+    """
+
+    rv = 0
+    loc = TopLoc_Location()
+    exp = TopExp_Explorer(shape, TopAbs_FACE)
+
+    while exp.More():
+        tri = BRep_Tool.Triangulation_s(TopoDS.Face_s(exp.Current()), loc)
+        if tri is not None:
+            rv += tri.NbTriangles()
+        exp.Next()
+
+    return rv
+
+
+def _drawer(deviation: float, angular_deviation: float) -> Prs3d_Drawer:
+
+    drawer = Prs3d_Drawer()
+    drawer.SetDeviationCoefficient(deviation)
+    drawer.SetDeviationAngle(angular_deviation)
+
+    return drawer
+
+
+def tessellate(shape: TopoDS_Shape, deviation: float, angular_deviation: float):
+    """
+    Mesh a shape with the same settings the viewer would use for display.
+    """
+
+    with span("tessellate", "shape"):
+        StdPrs_ToolTriangulatedShape.Tessellate_s(
+            shape, _drawer(deviation, angular_deviation)
+        )
+
+
+def tessellate_many(
+    shapes: List[TopoDS_Shape], deviation: float, angular_deviation: float
+):
+    """
+    Mesh many shapes at once using the parallel incremental mesher.
+
+    Shapes are grouped by the order of magnitude of their display deflection
+    and every group is meshed in a single parallel pass with the finest
+    deflection of the group, so the result satisfies the display settings of
+    each member. Already meshed shapes are skipped.
+    """
+
+    groups = defaultdict(list)
+
+    for shape in shapes:
+        drawer = _drawer(deviation, angular_deviation)
+        if StdPrs_ToolTriangulatedShape.IsTessellated_s(shape, drawer):
+            continue
+
+        deflection = StdPrs_ToolTriangulatedShape.GetDeflection_s(shape, drawer)
+        if deflection > 0:
+            groups[floor(log2(deflection))].append((shape, deflection))
+
+    builder = BRep_Builder()
+
+    for group in groups.values():
+        comp = TopoDS_Compound()
+        builder.MakeCompound(comp)
+        for shape, _ in group:
+            builder.Add(comp, shape)
+
+        with span("tessellate", f"{len(group)} shapes"):
+            BRepMesh_IncrementalMesh(
+                comp, min(d for _, d in group), False, angular_deviation, True
+            )
+
+
+def shape_size(shape: TopoDS_Shape) -> float:
+    """
+    Largest dimension of the bounding box of a shape.
+    """
+
+    box = Bnd_Box()
+    BRepBndLib.Add_s(shape, box, True)
+
+    if box.IsVoid():
+        return 0.0
+
+    xmin, ymin, zmin, xmax, ymax, zmax = box.Get()
+
+    return max(xmax - xmin, ymax - ymin, zmax - zmin)
+
+
+def lod_deviation(
+    size: float,
+    pixels_per_unit: float,
+    pixel_error: float,
+    finest: float,
+    coarsest: float,
+) -> float:
+    """
+    Deviation coefficient keeping the chordal error of a shape of the given
+    size below pixel_error pixels on screen. Results are finest * 2**k clamped
+    to [finest, coarsest] so that small zoom changes do not cause remeshing.
+    """
+
+    if finest >= coarsest or size <= 0 or pixels_per_unit <= 0:
+        return finest
+
+    # the absolute deflection is 4 * size * coefficient, see Prs3d::GetDeflection
+    required = pixel_error / pixels_per_unit / (4 * size)
+
+    if required >= coarsest:
+        return coarsest
+    elif required <= finest:
+        return finest
+
+    return finest * 2 ** floor(log2(required / finest))
+
+
+class MeshCache(object):
+    """
+    LRU cache of tessellated shapes keyed on the geometry hash and the
+    deviation settings. Unchanged shapes are swapped for their already
+    meshed counterpart so that OCCT does not mesh them again.
+    """
+
+    # bytes accounted for entries without a triangulation (yet), e.g. wires
+    NOMINAL_SIZE = 1024
+
+    def __init__(self, budget=256):
+
+        # key -> [shape, size, measured]
+        self._entries = OrderedDict()
+        # hash of the cached shape -> key, to find entries without hashing
+        self._keys = {}
+        self.deviation = 1e-5
+        self.angular_deviation = 0.1
+        self.budget = budget * 2**20
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+
+        return self.budget > 0
+
+    def configure(self, deviation, angular_deviation, budget):
+        """
+        Update the deviation settings and the memory budget (in MB).
+        """
+
+        self.deviation = deviation
+        self.angular_deviation = angular_deviation
+        self.budget = budget * 2**20
+
+        if self.enabled:
+            self._evict()
+        else:
+            self.clear()
+
+    def key(self, shape: TopoDS_Shape, digest=None):
+
+        return digest or shape_hash(shape), self.deviation, self.angular_deviation
+
+    def get(self, shape: TopoDS_Shape, digest=None) -> TopoDS_Shape:
+        """
+        Return a shape geometrically identical to the one passed in, reusing
+        the triangulation of a previously displayed one if available. digest
+        is the shape_hash of the shape if already known.
+        """
+
+        key = self.key(shape, digest)
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return self._entries[key][0]
+
+        self.misses += 1
+
+        # meshing happens on display, the size is measured in refresh
+        self._entries[key] = [shape, self.NOMINAL_SIZE, False]
+        self._keys[hash(shape)] = key
+        self.size += self.NOMINAL_SIZE
+
+        return shape
+
+    def lookup(self, shape: TopoDS_Shape, digest=None):
+        """
+        The cached shape geometrically identical to the one passed in or None.
+        """
+
+        entry = self._entries.get(self.key(shape, digest))
+
+        return entry[0] if entry is not None else None
+
+    def refresh(self):
+        """
+        Account for triangulations created since the last call and evict.
+        """
+
+        for entry in self._entries.values():
+            shape, size, measured = entry
+
+            if not measured:
+                new_size = triangulation_size(shape)
+
+                if new_size > 0:
+                    self.size += new_size - size
+                    entry[1:] = new_size, True
+                elif face_count(shape) == 0:
+                    # nothing to mesh, keep the nominal size
+                    entry[2] = True
+
+        self._evict()
+
+    def remeasure(self, shape: TopoDS_Shape):
+        """
+        Account for a cached shape meshed again, e.g. with a finer deviation.
+        """
+
+        entry = self._entries.get(self._keys.get(hash(shape)))
+
+        if entry is not None and entry[0].IsSame(shape):
+            new_size = triangulation_size(shape)
+
+            if new_size > 0:
+                self.size += new_size - entry[1]
+                entry[1:] = new_size, True
+
+            self._evict()
+
+    def clear(self):
+
+        self._entries.clear()
+        self._keys.clear()
+        self.size = 0
+
+    def __len__(self):
+
+        return len(self._entries)
+
+    def _evict(self):
+
+        while self._entries and self.size > self.budget:
+            _, (shape, size, _) = self._entries.popitem(last=False)
+            self._keys.pop(hash(shape), None)
+            self.size -= size
+
+
+MESH_CACHE = MeshCache()
+
+
 def is_cq_obj(obj):
 
     from cadquery import Workplane, Shape, Assembly, Sketch
@@ -98,6 +533,8 @@ def make_AIS(
         ais = obj
     else:
         shape = to_compound(obj)
+        if MESH_CACHE.enabled:
+            shape = cq.Shape.cast(MESH_CACHE.get(shape.wrapped, object_hash(obj)))
         ais = AIS_Shape(shape.wrapped)
 
     set_material(ais, DEFAULT_MATERIAL)
@@ -129,6 +566,37 @@ def export(
         comp.exportBrep(file)
 
 
+def safe_name(name: str) -> str:
+    """
+    Replace the characters that are not safe in file names.
+    """
+
+    return re.sub(r"[^\w\-.]", "_", name)
+
+
+def unique_names(names: List[str]) -> List[str]:
+    """
+    Make the names unique by appending a numeric suffix to the repeated ones.
+    """
+
+    taken = set(names)
+    seen = set()
+    rv = []
+
+    for name in names:
+        if name in seen:
+            i = 2
+            while f"{name}_{i}" in taken:
+                i += 1
+            name = f"{name}_{i}"
+            taken.add(name)
+
+        seen.add(name)
+        rv.append(name)
+
+    return rv
+
+
 def to_occ_color(color) -> Quantity_Color:
 
     if not isinstance(color, QColor):
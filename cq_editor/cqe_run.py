@@ -6,7 +6,19 @@ if "CASROOT" in os.environ:
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-from cq_editor.__main__ import main
+
+def main():
+
+    # dispatch before importing the GUI, which creates the QApplication
+    if "--batch" in sys.argv[1:]:
+        from cq_editor.batch import main as batch_main
+
+        sys.exit(batch_main(sys.argv[1:]))
+
+    from cq_editor.__main__ import main as gui_main
+
+    gui_main()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,104 @@
+"""
+Compact data files for imported DXF drawings.
+
+Instead of pasting a huge method chain into the editor, the DXF importer can
+write the chained geometry into a JSON sidecar file and insert a one-line
+load_dxf(...) call. The file holds a list of items:
+
+    ["C", cx, cy, r]                    circle
+    ["E", cx, cy, x_radius, y_radius]   ellipse
+    ["P", x0, y0, segments]             closed chain starting at (x0, y0)
+
+with the chain segments being
+
+    ["L", x, y]                         line to (x, y)
+    ["A", mx, my, x, y]                 arc through (mx, my) to (x, y)
+    ["S", [x0, y0, x1, y1, ...]]        spline through the points
+"""
+
+import json
+
+import cadquery as cq
+
+VERSION = 1
+
+# same as Workplane.close
+CLOSE_TOLERANCE = 1e-6
+
+
+def write_dxf_data(items, path):
+    """
+    Write the items into a data file one by one.
+    """
+
+    with open(path, "w") as f:
+        f.write(f'{{"version": {VERSION}, "items": [\n')
+
+        for i, item in enumerate(items):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(item, separators=(",", ":")))
+
+        f.write("\n]}\n")
+
+
+def _chain_wire(x0, y0, segments):
+
+    start = pos = cq.Vector(x0, y0)
+    edges = []
+
+    for seg in segments:
+        kind = seg[0]
+
+        if kind == "L":
+            end = cq.Vector(seg[1], seg[2])
+            edges.append(cq.Edge.makeLine(pos, end))
+        elif kind == "A":
+            end = cq.Vector(seg[3], seg[4])
+            edges.append(cq.Edge.makeThreePointArc(pos, cq.Vector(seg[1], seg[2]), end))
+        elif kind == "S":
+            coords = seg[1]
+            pts = [cq.Vector(x, y) for x, y in zip(coords[::2], coords[1::2])]
+            edges.append(cq.Edge.makeSpline(pts))
+            end = pts[-1]
+        else:
+            raise ValueError(f"Unknown segment type {kind}")
+
+        pos = end
+
+    if (pos - start).Length > CLOSE_TOLERANCE:
+        edges.append(cq.Edge.makeLine(pos, start))
+
+    return cq.Wire.assembleEdges(edges)
+
+
+def load_dxf(path):
+    """
+    Load a DXF data file and return a Workplane with the wires pending, ready
+    to be extruded.
+    """
+
+    with open(path) as f:
+        data = json.load(f)
+
+    wires = []
+
+    for item in data["items"]:
+        kind = item[0]
+
+        if kind == "C":
+            wires.append(
+                cq.Wire.makeCircle(item[3], cq.Vector(item[1], item[2]), (0, 0, 1))
+            )
+        elif kind == "E":
+            wires.append(
+                cq.Wire.makeEllipse(
+                    item[3], item[4], cq.Vector(item[1], item[2]), (0, 0, 1), (1, 0, 0)
+                )
+            )
+        elif kind == "P":
+            wires.append(_chain_wire(*item[1:]))
+        else:
+            raise ValueError(f"Unknown item type {kind}")
+
+    return cq.Workplane("XY").add(wires).toPending()
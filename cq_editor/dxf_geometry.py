@@ -0,0 +1,235 @@
+"""
+Vectorized geometry kernel of the DXF importer.
+
+The coordinates are evaluated and rounded in batched NumPy arrays. The
+results are identical to the scalar math/round() evaluation: values that lie
+so close to a rounding boundary that the last bit could matter are evaluated
+again with the scalar functions.
+"""
+
+import math
+
+import numpy as np
+
+TOLERANCE = 1e-4
+ROUND_DIGITS = 4
+
+# values below this are snapped to 0
+ZERO = 1e-9
+
+# distance (in units of the last kept digit, absolute and relative to the
+# value) to a rounding boundary below which the scalar evaluation is used
+AMBIGUITY = 1e-6
+RELATIVE_AMBIGUITY = 1e-12
+
+SPLINE_DISTANCE = 0.1
+
+
+def clean(val):
+
+    if abs(val) < ZERO:
+        return 0.0
+
+    return round(val, ROUND_DIGITS)
+
+
+def _ambiguous(values):
+    """
+    Mask of the values for which a tiny error can change the rounded result.
+    """
+
+    scaled = values * 10**ROUND_DIGITS
+
+    limit = AMBIGUITY + np.abs(scaled) * RELATIVE_AMBIGUITY
+
+    return (np.abs(scaled - np.floor(scaled) - 0.5) < limit) | (
+        np.abs(np.abs(values) - ZERO) < ZERO * AMBIGUITY
+    )
+
+
+def clean_array(values):
+    """
+    Vectorized clean(). Returns a float array of the same shape.
+    """
+
+    values = np.asarray(values, dtype=float)
+    scale = 10.0**ROUND_DIGITS
+
+    rv = np.rint(values * scale) / scale
+    rv[np.abs(values) < ZERO] = 0.0
+
+    ambiguous = _ambiguous(values)
+    if ambiguous.any():
+        rv[ambiguous] = [clean(v) for v in values[ambiguous].tolist()]
+
+    return rv
+
+
+def dedupe_points(points):
+    """
+    Drop the points of a cleaned (n, 2) array that coincide with their
+    predecessor. The last point is always kept so that the end of the curve
+    does not move.
+    """
+
+    if len(points) < 2:
+        return points
+
+    keep = np.ones(len(points), dtype=bool)
+    # cleaned points are either equal or at least TOLERANCE apart
+    keep[1:] = np.hypot(*np.diff(points, axis=0).T) >= TOLERANCE / 2
+
+    if not keep[-1]:
+        # keep the end point instead of its predecessor
+        last = np.flatnonzero(keep)[-1]
+        keep[-1] = True
+        keep[last] = last == 0
+
+    return points[keep]
+
+
+def _tuples(arr):
+
+    return [tuple(p) for p in arr.tolist()]
+
+
+def _arc_point(center, radius, angle):
+
+    rad = math.radians(angle)
+
+    return (
+        center[0] + radius * math.cos(rad),
+        center[1] + radius * math.sin(rad),
+    )
+
+
+def arc_midpoint(center, radius, start_angle, end_angle):
+    """
+    Scalar reference of the arc midpoint.
+    """
+
+    if end_angle < start_angle:
+        end_angle += 360
+
+    mx, my = _arc_point(center, radius, (start_angle + end_angle) / 2)
+
+    return (clean(mx), clean(my))
+
+
+def _arc_scalar(center, radius, start_angle, end_angle):
+
+    start = _arc_point(center, radius, start_angle)
+    end = _arc_point(center, radius, end_angle)
+
+    return (
+        (clean(start[0]), clean(start[1])),
+        (clean(end[0]), clean(end[1])),
+        arc_midpoint(center, radius, start_angle, end_angle),
+    )
+
+
+def arc_points(centers, radii, start_angles, end_angles):
+    """
+    Start, end and mid points of many arcs (angles in degrees). Returns three
+    lists of cleaned (x, y) tuples.
+    """
+
+    if len(radii) == 0:
+        return [], [], []
+
+    centers = np.asarray(centers, dtype=float)[:, :2]
+    radii = np.asarray(radii, dtype=float)[:, None]
+    start_angles = np.asarray(start_angles, dtype=float)
+    end_angles = np.asarray(end_angles, dtype=float)
+
+    mid_angles = (
+        start_angles + np.where(end_angles < start_angles, end_angles + 360, end_angles)
+    ) / 2
+
+    # (3, n, 2) array of the start, end and mid points
+    angles = np.radians(np.stack((start_angles, end_angles, mid_angles)))
+    raw = centers + radii * np.stack((np.cos(angles), np.sin(angles)), axis=-1)
+
+    # cos/sin may differ from libm in the last bit
+    ambiguous = _ambiguous(raw).any(axis=(0, 2))
+
+    starts, ends, mids = (_tuples(a) for a in clean_array(raw))
+
+    for i in np.flatnonzero(ambiguous).tolist():
+        starts[i], ends[i], mids[i] = _arc_scalar(
+            centers[i].tolist(),
+            radii[i, 0].item(),
+            start_angles[i].item(),
+            end_angles[i].item(),
+        )
+
+    return starts, ends, mids
+
+
+def _isclose(a, b):
+    # scalar np.isclose
+    return abs(a - b) <= 1e-8 + 1e-5 * abs(b)
+
+
+def flattening(bspline, distance, segments=4):
+    """
+    Same points as ezdxf's BSpline.flattening, which spends most of its time
+    in calling np.isclose on scalars.
+    """
+
+    from ezdxf.math import distance_point_line_3d
+
+    evaluator = bspline.evaluator
+    point = evaluator.point
+    rv = []
+
+    def subdiv(s, e, start_t, end_t):
+        mid_t = (start_t + end_t) * 0.5
+        m = point(mid_t)
+        try:
+            dist = distance_point_line_3d(m, s, e)
+        except ZeroDivisionError:  # s == e
+            dist = 0
+        if dist < distance:
+            rv.append(e)
+        else:
+            subdiv(s, m, start_t, mid_t)
+            subdiv(m, e, mid_t, end_t)
+
+    knots = np.unique(np.array(bspline.knots())).tolist()
+    t = knots[0]
+    start_point = point(t)
+    rv.append(start_point)
+
+    for t1 in knots[1:]:
+        delta = (t1 - t) / segments
+        while t < t1:
+            next_t = t + delta
+            if _isclose(next_t, t1):
+                next_t = t1
+            end_point = point(next_t)
+            subdiv(start_point, end_point, t, next_t)
+            t = next_t
+            start_point = end_point
+
+    return rv
+
+
+def flatten_splines(splines, distance=SPLINE_DISTANCE):
+    """
+    Flatten many ezdxf splines at once. Returns a list of the cleaned (x, y)
+    point lists without consecutive duplicates.
+    """
+
+    if not splines:
+        return []
+
+    arrays = [
+        np.array([(p[0], p[1]) for p in flattening(s.construction_tool(), distance)])
+        for s in splines
+    ]
+
+    offsets = np.cumsum([len(a) for a in arrays])[:-1]
+    cleaned = np.split(clean_array(np.concatenate(arrays)), offsets)
+
+    return [_tuples(dedupe_points(pts)) for pts in cleaned]
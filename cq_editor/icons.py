@@ -78,6 +78,7 @@ _icons_specs = {
     "arrow-continue": (("fa5s.arrow-right",), {}),
     "clear": (("fa5s.eraser",), {}),
     "clear-2": (("fa5s.broom",), {}),
+    "stop": (("fa5s.stop",), {}),
 }
 
 
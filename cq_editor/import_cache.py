@@ -0,0 +1,196 @@
+"""
+Cache of parsed STEP files shared by the importers.
+
+Parsing a large STEP file takes much longer than loading the same geometry
+from a binary BREP. Imported shapes are stored on disk keyed by the content
+hash of the file and kept in an in-memory LRU keyed by the path, mtime and
+size, so that unchanged vendor parts are parsed only once.
+"""
+
+import os
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+from hashlib import sha1
+
+import cadquery as cq
+from logbook import Logger
+from path import Path
+
+_logger = Logger("Import cache")
+
+# bump to invalidate the cache files
+VERSION = 1
+
+CHUNK_SIZE = 1 << 20
+
+
+def default_cache_dir():
+
+    if sys.platform == "win32":
+        root = os.environ.get("LOCALAPPDATA", "~")
+    else:
+        root = os.environ.get("XDG_CACHE_HOME", "~/.cache")
+
+    return Path(root).expanduser() / "cq-editor" / "imports"
+
+
+class ImportCache(object):
+    """
+    In-memory LRU of imported STEP files on top of a directory of binary
+    BREP files.
+    """
+
+    def __init__(self, size=8, cache_dir=None, max_disk_size=2 * 1024**3):
+
+        self.size = size
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_disk_size = max_disk_size
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._data = OrderedDict()
+
+    def __len__(self):
+
+        return len(self._data)
+
+    @staticmethod
+    def _stat_key(path, unit):
+
+        st = os.stat(path)
+
+        return str(Path(path).absolute()), st.st_mtime_ns, st.st_size, unit.upper()
+
+    @staticmethod
+    def _content_hash(path, unit):
+
+        h = sha1(f"{VERSION}:{cq.__version__}:{unit.upper()}:".encode())
+
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                h.update(chunk)
+
+        return h.hexdigest()
+
+    def _remember(self, key, shapes):
+
+        self._data[key] = shapes
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.size:
+            self._data.popitem(last=False)
+
+    def _load_disk(self, fname):
+
+        if not fname.exists():
+            return None
+
+        try:
+            comp = cq.Shape.importBin(fname)
+        except Exception:
+            _logger.warning(f"Corrupt cache file {fname}")
+            return None
+
+        # keep recently used files when pruning
+        fname.touch()
+
+        return [s.wrapped for s in comp]
+
+    def _store_disk(self, fname, shapes):
+
+        tmp = fname + f".{os.getpid()}.tmp"
+
+        try:
+            self.cache_dir.makedirs_p()
+            cq.Compound.makeCompound([cq.Shape.cast(s) for s in shapes]).exportBin(tmp)
+            os.replace(tmp, fname)
+        except Exception as e:
+            _logger.warning(f"Cannot write cache file {fname}: {e}")
+            Path(tmp).remove_p()
+            return
+
+        self._prune_disk()
+
+    def _prune_disk(self):
+
+        files = sorted(self.cache_dir.files("*.bin"), key=lambda f: f.mtime)
+        total = sum(f.size for f in files)
+
+        for f in files:
+            if total <= self.max_disk_size:
+                break
+            total -= f.size
+            f.remove_p()
+
+    def import_step(self, fileName, unit="MM", importer=None):
+        """
+        Cached replacement of cq.importers.importStep. importer is the
+        function used on a cache miss.
+        """
+
+        fileName = str(fileName)
+        importer = importer or cq.importers.importStep
+        key = self._stat_key(fileName, unit)
+        shapes = self._data.get(key)
+
+        if shapes is not None:
+            self.hits += 1
+            self._data.move_to_end(key)
+        else:
+            fname = self.cache_dir / self._content_hash(fileName, unit) + ".bin"
+            shapes = self._load_disk(fname)
+
+            if shapes is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                shapes = [s.wrapped for s in importer(fileName, unit).vals()]
+                self._store_disk(fname, shapes)
+
+            self._remember(key, shapes)
+
+        # fresh wrappers, scripts may set attributes on the shapes
+        return cq.Workplane("XY").newObject([cq.Shape.cast(s) for s in shapes])
+
+    def clear(self, disk=False):
+
+        self._data.clear()
+        self.hits = self.disk_hits = self.misses = 0
+
+        if disk and self.cache_dir.exists():
+            for f in self.cache_dir.files("*.bin"):
+                f.remove_p()
+
+
+IMPORT_CACHE = ImportCache()
+
+
+@contextmanager
+def cached_imports(cache=IMPORT_CACHE):
+    """
+    Route cq.importers.importStep (and importShape, which calls it) through
+    the cache while the context manager is active.
+    """
+
+    importers = cq.importers
+    original = importers.importStep
+
+    # already active
+    if getattr(original, "cached", False):
+        yield
+        return
+
+    def importStep(fileName, unit="MM"):
+        return cache.import_step(fileName, unit, original)
+
+    importStep.__doc__ = original.__doc__
+    importStep.cached = True
+    importers.importStep = importStep
+
+    try:
+        yield
+    finally:
+        importers.importStep = original
@@ -4,6 +4,7 @@ from PyQt5.QtCore import QObject, pyqtSignal
 from PyQt5.QtGui import QPalette, QColor
 from PyQt5.QtWidgets import (
     QLabel,
+    QProgressBar,
     QMainWindow,
     QToolBar,
     QDockWidget,
@@ -14,14 +15,6 @@ from PyQt5.QtWidgets import (
 from logbook import Logger
 import cadquery as cq
 
-from .widgets.editor import Editor
-from .widgets.viewer import OCCViewer
-from .widgets.console import ConsoleWidget
-from .widgets.object_tree import ObjectTree
-from .widgets.traceback_viewer import TracebackPane
-from .widgets.debugger import Debugger, LocalsView
-from .widgets.cq_object_inspector import CQObjectInspector
-from .widgets.log import LogViewer
 from . import __version__
 from .utils import (
     dock,
@@ -35,7 +28,7 @@ from .mixins import MainMixin
 from .icons import icon
 from pyqtgraph.parametertree import Parameter
 from .preferences import PreferencesWidget
-from .widgets.kernel_inspector import KernelInspector
+from .completion import COMPLETER
 # from .widgets.pathfinder import Pathfinder
 class _PrintRedirectorSingleton(QObject):
     """This class monkey-patches `sys.stdout.write` to emit a signal.
@@ -76,6 +69,7 @@ class MainWindow(QMainWindow, MainMixin):
                     "Dark",
                 ],
             },
+            {"name": "Enable console", "type": "bool", "value": True},
         ],
     )
 
@@ -93,7 +87,7 @@ class MainWindow(QMainWindow, MainMixin):
             myappid = "cq-editor"  # arbitrary string
             ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
 
-        self.viewer = OCCViewer(self)
+        self.viewer = self.createComponent("viewer", ".widgets.viewer:OCCViewer")
         self.setCentralWidget(self.viewer.canvas)
 
         self.prepare_panes()
@@ -106,8 +100,6 @@ class MainWindow(QMainWindow, MainMixin):
 
         self.components["object_tree"].addLines()
 
-        self.prepare_console()
-
         self.fill_dummy()
 
         self.setup_logging()
@@ -117,6 +109,7 @@ class MainWindow(QMainWindow, MainMixin):
 
         self.restorePreferences()
         self.restoreWindow()
+        self.update_console_dock()
 
         # Handle the event of the editor being hidden or shown
         self.editor_dock = self.docks["editor"]
@@ -151,7 +144,8 @@ class MainWindow(QMainWindow, MainMixin):
             QApplication.instance().setPalette(QApplication.style().standardPalette())
 
             # The console theme needs to be changed separately
-            self.components["console"].app_theme_changed("Light")
+            if "console" in self.components:
+                self.components["console"].app_theme_changed("Light")
         # Use the dark theme/palette
         elif self.preferences["Light/Dark Theme"] == "Dark":
             QApplication.instance().setStyle("Fusion")
@@ -177,7 +171,8 @@ class MainWindow(QMainWindow, MainMixin):
             QApplication.instance().setPalette(palette)
 
             # The console theme needs to be changed separately
-            self.components["console"].app_theme_changed("Dark")
+            if "console" in self.components:
+                self.components["console"].app_theme_changed("Dark")
 
         # We alter the color of the toolbar separately to avoid having separate dark theme icons
         p = self.toolbar.palette()
@@ -200,6 +195,26 @@ class MainWindow(QMainWindow, MainMixin):
 
         self.toolbar.setPalette(p)
 
+        self.update_console_dock()
+
+    def update_console_dock(self):
+        """
+        Hide the console dock when the console is disabled, so that its
+        kernel is never started.
+        """
+
+        enabled = self.preferences["Enable console"]
+        dock = self.docks["console"]
+
+        dock.toggleViewAction().setEnabled(enabled)
+        if not enabled:
+            dock.hide()
+
+    def push_console_vars(self, variables):
+
+        if self.preferences["Enable console"]:
+            self.components["console"].push_vars(variables)
+
     def closeEvent(self, event):
 
         self.saveWindow()
@@ -212,35 +227,40 @@ class MainWindow(QMainWindow, MainMixin):
 
             if rv:
                 event.accept()
-                super(MainWindow, self).closeEvent(event)
             else:
                 event.ignore()
-        else:
-            super(MainWindow, self).closeEvent(event)
+                return
+
+        # stop the background processes
+        self.components["debugger"].shutdown()
+        COMPLETER.shutdown()
+
+        super(MainWindow, self).closeEvent(event)
 
     def prepare_panes(self):
 
         self.registerComponent(
             "editor",
-            Editor(self),
+            ".widgets.editor:Editor",
             lambda c: dock(c, "Editor", self, defaultArea="left"),
         )
 
         self.registerComponent(
             "object_tree",
-            ObjectTree(self),
+            ".widgets.object_tree:ObjectTree",
             lambda c: dock(c, "Objects", self, defaultArea="right"),
         )
 
         self.registerComponent(
             "traceback_viewer",
-            TracebackPane(self),
+            ".widgets.traceback_viewer:TracebackPane",
             lambda c: dock(c, "Current traceback", self, defaultArea="bottom"),
         )
         self.registerComponent(
             "kernel_inspector",
-            KernelInspector(self),
+            ".widgets.kernel_inspector:KernelInspector",
             lambda c: dock(c, "Kernel Inspector", self, defaultArea="right"),
+            lazy=True,
         )
         # self.registerComponent(
         #     "pathfinder",
@@ -249,30 +269,37 @@ class MainWindow(QMainWindow, MainMixin):
         # )
         # if "object_tree" in self.docks and "pathfinder" in self.docks:
         #     self.tabifyDockWidget(self.docks["object_tree"], self.docks["pathfinder"])
-        self.registerComponent("debugger", Debugger(self))
+        self.registerComponent("debugger", ".widgets.debugger:Debugger")
 
         self.registerComponent(
             "console",
-            ConsoleWidget(self),
+            ".widgets.console:ConsoleWidget",
             lambda c: dock(c, "Console", self, defaultArea="bottom"),
+            lazy=True,
         )
 
         self.registerComponent(
             "variables_viewer",
-            LocalsView(self),
+            ".widgets.debugger:LocalsView",
             lambda c: dock(c, "Variables", self, defaultArea="right"),
         )
 
         self.registerComponent(
             "cq_object_inspector",
-            CQObjectInspector(self),
+            ".widgets.cq_object_inspector:CQObjectInspector",
             lambda c: dock(c, "CQ object inspector", self, defaultArea="right"),
         )
         self.registerComponent(
             "log",
-            LogViewer(self),
+            ".widgets.log:LogViewer",
             lambda c: dock(c, "Log viewer", self, defaultArea="bottom"),
         )
+        self.registerComponent(
+            "profiler",
+            ".widgets.profile_viewer:ProfileViewer",
+            lambda c: dock(c, "Profiler", self, defaultArea="bottom"),
+            lazy=True,
+        )
 
         for d in self.docks.values():
             d.show()
@@ -293,7 +320,7 @@ class MainWindow(QMainWindow, MainMixin):
         menu_help = menu.addMenu("&Help")
 
         # per component menu elements
-        menus = {
+        self.menus = menus = {
             "File": menu_file,
             "Edit": menu_edit,
             "Run": menu_run,
@@ -387,19 +414,32 @@ class MainWindow(QMainWindow, MainMixin):
         self.status_label = QLabel("", parent=self)
         self.statusBar().insertPermanentWidget(0, self.status_label)
 
+        # busy indicator for renders running in the worker process
+        self.render_progress = QProgressBar(self, maximumWidth=120)
+        self.render_progress.setRange(0, 0)
+        self.render_progress.hide()
+        self.statusBar().insertPermanentWidget(1, self.render_progress)
+
     def prepare_actions(self):
 
         self.components["debugger"].sigRendered.connect(
             self.components["object_tree"].addObjects
         )
+        self.components["debugger"].sigObjectsStreamed.connect(
+            self.components["object_tree"].streamObjects
+        )
+        self.components["debugger"].sigStreamAborted.connect(
+            self.components["object_tree"].abortStream
+        )
         self.components["debugger"].sigTraceback.connect(
             self.components["traceback_viewer"].addTraceback
         )
         self.components["debugger"].sigLocals.connect(
             self.components["variables_viewer"].update_frame
         )
-        self.components["debugger"].sigLocals.connect(
-            self.components["console"].push_vars
+        self.components["debugger"].sigLocals.connect(self.push_console_vars)
+        self.components["debugger"].sigRendering.connect(
+            self.render_progress.setVisible
         )
 
         self.components["object_tree"].sigObjectsAdded[list].connect(
@@ -431,6 +471,9 @@ class MainWindow(QMainWindow, MainMixin):
         self.components["traceback_viewer"].sigHighlightLine.connect(
             self.components["editor"].go_to_line
         )
+        self.connectComponent(
+            self.components["debugger"].sigProfile, "profiler", "addProfile"
+        )
 
         self.components["cq_object_inspector"].sigDisplayObjects.connect(
             self.components["viewer"].display_many
@@ -473,6 +516,27 @@ class MainWindow(QMainWindow, MainMixin):
         )
         # Allows updating of the status bar from the Editor
         self.components["editor"].statusChanged.connect(self.update_statusbar)
+        self.components["debugger"].statusChanged.connect(self.update_statusbar)
+
+    def componentLoaded(self, name, component):
+
+        self.prepare_menubar_component(self.menus, component.menuActions())
+        add_actions(self.toolbar, component.toolbarActions())
+
+        if name == "console":
+            self.prepare_console()
+
+            # the theme is applied to the console only when changed
+            if self.preferences["Light/Dark Theme"] == "Dark":
+                component.app_theme_changed("Dark")
+        elif name == "profiler":
+            component.sigHighlightLine.connect(self.components["editor"].go_to_line)
+
+            # the history is recorded after every render, so it is only
+            # forwarded once the profiler exists
+            debugger = self.components["debugger"]
+            component.setHistory(debugger.history())
+            debugger.sigHistory.connect(component.setHistory)
 
     def prepare_console(self):
 
@@ -525,6 +589,12 @@ class MainWindow(QMainWindow, MainMixin):
 
     def edit_preferences(self):
 
+        # show the preferences of the components not created yet too, but do
+        # not start the kernel of a disabled console
+        self.loadComponents(
+            exclude=() if self.preferences["Enable console"] else ("console",)
+        )
+
         prefs = PreferencesWidget(self, self.components)
         prefs.exec_()
 
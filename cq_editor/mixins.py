@@ -6,11 +6,33 @@ Created on Wed May 23 22:02:30 2018
 @author: adam
 """
 
+from collections import namedtuple
 from functools import reduce
+from importlib import import_module
 from operator import add
+from time import perf_counter
 from logbook import Logger
 
-from PyQt5.QtCore import pyqtSlot, QSettings
+from PyQt5.QtCore import pyqtSlot, QSettings, QTimer
+from PyQt5.QtWidgets import QWidget
+
+ComponentTiming = namedtuple("ComponentTiming", "import_time construction_time lazy")
+
+
+class ComponentRegistry(dict):
+    """
+    Components by name. Looking up a lazy component that was not created yet
+    creates it.
+    """
+
+    def __init__(self, load):
+
+        super(ComponentRegistry, self).__init__()
+        self._load = load
+
+    def __missing__(self, name):
+
+        return self._load(name)
 
 
 class MainMixin(object):
@@ -26,13 +48,137 @@ class MainMixin(object):
 
         self.settings = QSettings(self.org, self.name)
 
-    def registerComponent(self, name, component, dock=None):
+        self.components = ComponentRegistry(self.loadComponent)
+        self.docks = {}
+        self.timings = {}
+
+        self._lazy = {}
+        self._pending = []
+
+    def createComponent(self, name, spec, lazy=False):
+        """
+        Import and construct a component from a "module:Class" spec relative
+        to this package, timing both steps.
+        """
+
+        module, cls = spec.split(":")
+
+        t0 = perf_counter()
+        module = import_module(module, __package__)
+        t1 = perf_counter()
+        component = getattr(module, cls)(self)
+        t2 = perf_counter()
+
+        self.timings[name] = ComponentTiming(t1 - t0, t2 - t1, lazy)
+
+        return component
+
+    def registerComponent(self, name, component, dock=None, lazy=False):
+        """
+        Register a component instance or a "module:Class" spec. Lazy
+        components are created the first time they are looked up or their
+        dock becomes visible; until then the dock holds a placeholder.
+        """
+
+        if lazy:
+            self._lazy[name] = component
+
+            if dock:
+                self.docks[name] = dock(QWidget())
+                self.docks[name].visibilityChanged.connect(
+                    lambda visible: self._dockVisibilityChanged(name, visible)
+                )
+
+            return
+
+        if isinstance(component, str):
+            component = self.createComponent(name, component)
 
         self.components[name] = component
 
         if dock:
             self.docks[name] = dock(component)
 
+    def _dockVisibilityChanged(self, name, visible):
+
+        if visible and name in self._lazy:
+            # let the window paint before constructing the component
+            self._pending.append(name)
+            QTimer.singleShot(0, self._loadPending)
+
+    def _loadPending(self):
+
+        while self._pending:
+            name = self._pending.pop(0)
+
+            if name in self._lazy:
+                self.components[name]
+
+    def loadComponent(self, name):
+
+        if name not in self._lazy:
+            raise KeyError(name)
+
+        component = self.createComponent(name, self._lazy.pop(name), lazy=True)
+        self.components[name] = component
+
+        if name in self.docks:
+            placeholder = self.docks[name].widget()
+            self.docks[name].setWidget(component)
+            placeholder.deleteLater()
+
+        self._restorePreferences(component)
+        component.restoreComponentState(self.settings)
+
+        self.componentLoaded(name, component)
+
+        return component
+
+    def loadComponents(self, exclude=()):
+        """
+        Create all pending lazy components except the excluded ones.
+        """
+
+        for name in list(self._lazy):
+            if name not in exclude:
+                self.components[name]
+
+    def connectComponent(self, signal, name, slot):
+        """
+        Connect signal to a slot of a component. A lazy component is created
+        when the signal is first emitted.
+        """
+
+        if name in self.components:
+            signal.connect(getattr(self.components[name], slot))
+        else:
+            signal.connect(lambda *args: getattr(self.components[name], slot)(*args))
+
+    def componentLoaded(self, name, component):
+        """
+        Called after a lazy component was created.
+        """
+
+        pass
+
+    def startupReport(self):
+        """
+        Import and construction times of the components as a text table.
+        """
+
+        lines = [f"{'Component':<24}{'Import [ms]':>12}{'Build [ms]':>12}  Loaded"]
+
+        for name, t in self.timings.items():
+            lines.append(
+                f"{name:<24}{1000 * t.import_time:>12.1f}"
+                f"{1000 * t.construction_time:>12.1f}  "
+                f"{'on demand' if t.lazy else 'at startup'}"
+            )
+
+        lines.extend(f"{name:<24}{'':>24}  not yet" for name in self._lazy)
+
+        return "\n".join(lines)
+
     def saveWindow(self):
 
         self.settings.setValue("geometry", self.saveGeometry())
@@ -64,11 +210,17 @@ class MainMixin(object):
                 settings.value("General"), removeChildren=False
             )
 
-        for comp in (c for c in self.components.values() if c.preferences):
-            if settings.value(comp.name):
-                comp.preferences.restoreState(
-                    settings.value(comp.name), removeChildren=False
-                )
+        for comp in self.components.values():
+            self._restorePreferences(comp)
+
+    def _restorePreferences(self, comp):
+
+        settings = self.settings
+
+        if comp.preferences and settings.value(comp.name):
+            comp.preferences.restoreState(
+                settings.value(comp.name), removeChildren=False
+            )
 
     def saveComponentState(self):
 
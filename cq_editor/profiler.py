@@ -0,0 +1,151 @@
+"""
+Lightweight render profiler.
+
+While a RenderProfile is active, the instrumented parts of the render pipeline
+(compilation, top-level statements, Workplane methods, make_AIS, tessellation
+and display) record nested timing spans. Outside of profiling span() is a
+no-op.
+"""
+
+from collections import namedtuple, defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from inspect import isfunction
+from time import perf_counter
+
+import cadquery as cq
+
+Span = namedtuple("Span", "category name lineno start end depth self_time")
+
+CATEGORIES = ("compile", "line", "workplane", "make_AIS", "tessellate", "display")
+
+_active = None
+
+
+class RenderProfile(object):
+    """
+    Nested timing spans of a single render. Times are in seconds relative to
+    the creation of the profile.
+    """
+
+    def __init__(self):
+
+        self.spans = []
+        self.lineno = None
+
+        self._t0 = perf_counter()
+        self._stack = []
+
+    @contextmanager
+    def span(self, category, name, lineno=None):
+
+        children = [0.0]
+        self._stack.append(children)
+
+        # nested spans are attributed to the same line
+        previous_line = self.lineno
+        if lineno is not None:
+            self.lineno = lineno
+
+        start = perf_counter()
+
+        try:
+            yield
+        finally:
+            end = perf_counter()
+            self._stack.pop()
+            self.lineno = previous_line
+
+            duration = end - start
+            if self._stack:
+                self._stack[-1][0] += duration
+
+            self.spans.append(
+                Span(
+                    category,
+                    name,
+                    previous_line if lineno is None else lineno,
+                    start - self._t0,
+                    end - self._t0,
+                    len(self._stack),
+                    duration - children[0],
+                )
+            )
+
+    @property
+    def total(self):
+
+        return max((s.end for s in self.spans), default=0.0)
+
+    def summary(self):
+        """
+        Aggregate the spans by category, name and line. Returns a list of
+        (category, name, lineno, calls, total, self) tuples sorted by total.
+        """
+
+        rows = defaultdict(lambda: [0, 0.0, 0.0])
+
+        for s in self.spans:
+            row = rows[s.category, s.name, s.lineno]
+            row[0] += 1
+            row[1] += s.end - s.start
+            row[2] += s.self_time
+
+        return sorted(
+            ((*key, *values) for key, values in rows.items()),
+            key=lambda row: row[4],
+            reverse=True,
+        )
+
+
+def span(category, name, lineno=None):
+    """
+    Record a span in the active profile, if any.
+    """
+
+    if _active is None:
+        return nullcontext()
+
+    return _active.span(category, name, lineno)
+
+
+def _timed(name, method):
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        with span("workplane", name):
+            return method(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def profiling(profile):
+    """
+    Make profile the active profile and time the public Workplane methods.
+    Does nothing if profile is None.
+    """
+
+    global _active
+
+    if profile is None:
+        yield
+        return
+
+    originals = {
+        name: attr
+        for name, attr in vars(cq.Workplane).items()
+        if isfunction(attr) and not name.startswith("_")
+    }
+
+    previous, _active = _active, profile
+
+    for name, method in originals.items():
+        setattr(cq.Workplane, name, _timed(name, method))
+
+    try:
+        yield
+    finally:
+        for name, method in originals.items():
+            setattr(cq.Workplane, name, method)
+
+        _active = previous
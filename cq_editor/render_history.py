@@ -0,0 +1,197 @@
+"""
+Persistent history of render timings.
+
+The last renders of every file are kept in a small SQLite database in the
+user cache directory, so that an edit making the render much slower can be
+spotted long after it was made.
+"""
+
+import os
+import sqlite3
+import sys
+from collections import namedtuple
+from hashlib import sha1
+from statistics import median
+from time import time
+
+from .import_cache import default_cache_dir
+
+RenderRecord = namedtuple(
+    "RenderRecord", "timestamp script_hash wall_time peak_memory objects triangles"
+)
+
+# a render this many times slower than the recent ones is a regression
+REGRESSION_FACTOR = 2.0
+
+# number of previous renders the baseline is computed from
+BASELINE_WINDOW = 5
+
+# renders faster than this [s] are never flagged, they are mostly noise
+MIN_REGRESSION_TIME = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS renders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    script_hash TEXT NOT NULL,
+    wall_time REAL NOT NULL,
+    peak_memory INTEGER,
+    objects INTEGER NOT NULL,
+    triangles INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS renders_path ON renders (path, id);
+"""
+
+
+def default_db_path():
+
+    return default_cache_dir().parent / "render_history.sqlite"
+
+
+def script_hash(script):
+
+    return sha1(script.encode()).hexdigest()
+
+
+def reset_peak_memory():
+    """
+    Reset the peak resident memory of the process, where the OS allows it.
+    """
+
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_memory():
+    """
+    Peak resident memory of the process in bytes or None if unknown.
+    """
+
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:  # windows
+        return None
+
+    rv = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return rv if sys.platform == "darwin" else rv * 1024
+
+
+def baseline(records, i, window=BASELINE_WINDOW):
+    """
+    Median wall time of the window records preceding record i.
+    """
+
+    return median(r.wall_time for r in records[max(0, i - window) : i])
+
+
+def regressions(records, factor=REGRESSION_FACTOR, window=BASELINE_WINDOW):
+    """
+    Indices of the records at least factor times slower than their baseline.
+    """
+
+    return [
+        i
+        for i in range(1, len(records))
+        if records[i].wall_time >= MIN_REGRESSION_TIME
+        and records[i].wall_time >= factor * baseline(records, i, window)
+    ]
+
+
+class RenderHistory(object):
+    """
+    Ring buffer of the last size renders of each file.
+    """
+
+    def __init__(self, db_path=None, size=50):
+
+        self.db_path = db_path or default_db_path()
+        self.size = size
+
+        self._db = None
+
+    def _connect(self):
+
+        if self._db is None:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+            self._db = sqlite3.connect(self.db_path)
+            self._db.executescript(SCHEMA)
+
+        return self._db
+
+    @staticmethod
+    def _key(path):
+
+        return str(path) if path else "<untitled>"
+
+    def add(self, path, record):
+        """
+        Store a record and drop the ones beyond the size of the buffer.
+        Returns the records of the file, oldest first.
+        """
+
+        db = self._connect()
+        key = self._key(path)
+
+        with db:
+            db.execute(
+                "INSERT INTO renders (path, timestamp, script_hash, wall_time,"
+                " peak_memory, objects, triangles) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, *record),
+            )
+            db.execute(
+                "DELETE FROM renders WHERE path = ? AND id NOT IN"
+                " (SELECT id FROM renders WHERE path = ? ORDER BY id DESC LIMIT ?)",
+                (key, key, self.size),
+            )
+
+        return self.records(path)
+
+    def record(self, path, script, wall_time, peak_memory, objects, triangles):
+
+        return self.add(
+            path,
+            RenderRecord(
+                time(), script_hash(script), wall_time, peak_memory, objects, triangles
+            ),
+        )
+
+    def records(self, path):
+
+        rows = self._connect().execute(
+            "SELECT timestamp, script_hash, wall_time, peak_memory, objects,"
+            " triangles FROM renders WHERE path = ? ORDER BY id",
+            (self._key(path),),
+        )
+
+        return [RenderRecord(*row) for row in rows]
+
+    def clear(self, path=None):
+
+        db = self._connect()
+
+        with db:
+            if path is None:
+                db.execute("DELETE FROM renders")
+            else:
+                db.execute("DELETE FROM renders WHERE path = ?", (self._key(path),))
+
+    def close(self):
+
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,235 @@
+"""
+Out-of-process rendering and export.
+
+The worker runs in a separate (spawned) process, executes the script with the
+same semantics as Debugger.render and sends back the shown objects serialized
+as BREP, so that the GUI thread never blocks on heavy models.
+"""
+
+import sys
+import pickle
+from io import BytesIO
+from random import seed
+from traceback import extract_tb
+from types import SimpleNamespace
+
+import cadquery as cq
+from OCP.gp import gp_Trsf
+from logbook import Logger
+from path import Path
+
+from .cq_utils import to_compound, is_obj_empty, reload_cq, export, object_state
+from .script_runner import run_script, RANDOM_SEED
+
+_logger = Logger("Render worker")
+
+
+def serialize_shape(obj):
+    """
+    Convert a CQ object into BREP bytes. Assemblies are converted into a tree
+    of (name, shape index, location, color, children) nodes that keeps their
+    structure and colors, together with the BREP bytes of the shapes.
+    """
+
+    if isinstance(obj, cq.Assembly):
+        shapes = {}
+        tree = _serialize_assembly(obj, shapes)
+
+        return [brep for _, brep in shapes.values()], tree
+
+    buf = BytesIO()
+    to_compound(obj).exportBrep(buf)
+
+    return buf.getvalue()
+
+
+def _serialize_assembly(assy, shapes):
+
+    index = None
+
+    if assy.obj is not None and not is_obj_empty(assy.obj):
+        # parts used many times are sent once
+        if id(assy.obj) not in shapes:
+            shapes[id(assy.obj)] = (len(shapes), serialize_shape(assy.obj))
+        index = shapes[id(assy.obj)][0]
+
+    trsf = assy.loc.wrapped.Transformation()
+    loc = [trsf.Value(i, j) for i in (1, 2, 3) for j in (1, 2, 3, 4)]
+    color = assy.color.toTuple() if assy.color else None
+
+    return (
+        assy.name,
+        index,
+        loc,
+        color,
+        [_serialize_assembly(child, shapes) for child in assy.children],
+    )
+
+
+def deserialize_shape(data):
+    """Convert the serialized data back into a CQ shape or assembly."""
+
+    if isinstance(data, bytes):
+        return cq.Shape.importBrep(BytesIO(data))
+
+    breps, tree = data
+
+    return _deserialize_assembly(tree, [deserialize_shape(b) for b in breps])
+
+
+def _deserialize_assembly(node, shapes):
+
+    name, index, loc, color, children = node
+
+    trsf = gp_Trsf()
+    trsf.SetValues(*loc)
+
+    rv = cq.Assembly(
+        shapes[index] if index is not None else None,
+        loc=cq.Location(trsf),
+        name=name,
+        color=cq.Color(*color) if color else None,
+    )
+
+    for child in children:
+        rv.add(_deserialize_assembly(child, shapes))
+
+    return rv
+
+
+def serialize_objects(cq_objects):
+    """
+    Convert a {name: SimpleNamespace(shape, options)} dict into a picklable
+    {name: (data, options)} dict. Objects that cannot cross the process
+    boundary (e.g. AIS objects) are skipped.
+    """
+
+    rv = {}
+
+    for name, obj in cq_objects.items():
+        if is_obj_empty(obj.shape):
+            continue
+        try:
+            rv[name] = (serialize_shape(obj.shape), dict(obj.options))
+        except ValueError:
+            _logger.warning(f"cannot transfer {name} of type {type(obj.shape)}")
+
+    return rv
+
+
+def deserialize_objects(data):
+
+    return {
+        name: SimpleNamespace(shape=deserialize_shape(shape), options=options)
+        for name, (shape, options) in data.items()
+    }
+
+
+def _serialize_exception(exc_info):
+
+    t, exc, tb = exc_info
+
+    try:
+        pickle.dumps(exc)
+    except Exception:
+        exc = None
+
+    return t.__name__, str(exc_info[1]), extract_tb(tb), exc
+
+
+def deserialize_exception(data):
+    """
+    Rebuild an exc_info-like tuple; the traceback is replaced by a list of
+    FrameSummary objects that TracebackPane understands.
+    """
+
+    name, msg, frames, exc = data
+
+    if exc is None:
+        exc = type(name, (Exception,), {})(msg)
+
+    return type(exc), exc, frames
+
+
+def _unchanged(shape, sent, state):
+
+    return shape is sent and state is not None and object_state(shape) == state
+
+
+def run_job(job, send=None):
+    """
+    Execute a single render job. Returns ("ok", objects) or ("error", exc_data).
+
+    If the job has the stream flag set, every shown object is passed to send
+    as ("object", objects) right away and the final result contains only the
+    objects that were not sent yet or were changed after they were sent.
+    """
+
+    seed(RANDOM_SEED)
+
+    streamed = {}
+    on_show = None
+
+    if job.get("stream") and send is not None:
+
+        def on_show(name, obj):
+
+            data = serialize_objects({name: obj})
+            if data:
+                streamed[name] = (obj.shape, object_state(obj.shape))
+                send(("object", data))
+
+    try:
+        if job.get("reload_cq"):
+            reload_cq()
+
+        path = job.get("path")
+
+        cq_objects, _ = run_script(
+            job["script"],
+            Path(path) if path else None,
+            on_show=on_show,
+            add_to_path=job.get("add_to_path", True),
+            change_dir=job.get("change_dir", True),
+            reload_modules=job.get("reload_modules", True),
+            cache_imports=job.get("cache_imports", True),
+        )
+
+        return "ok", serialize_objects(
+            {
+                name: obj
+                for name, obj in cq_objects.items()
+                if not _unchanged(obj.shape, *streamed.get(name, (None, None)))
+            }
+        )
+    except Exception:
+        return "error", _serialize_exception(sys.exc_info())
+
+
+def export_job(data, export_type, fname, precision=None):
+    """
+    Export BREP serialized shapes into a single file. Runs in a process pool.
+    """
+
+    shapes = [deserialize_shape(d) for d in data]
+    comp = cq.Compound.makeCompound(
+        [s.toCompound() if isinstance(s, cq.Assembly) else s for s in shapes]
+    )
+    export(comp, export_type, fname, precision)
+
+    return fname
+
+
+def worker_main(conn):
+    """Entry point of the persistent worker process."""
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+
+        if job is None:
+            break
+
+        conn.send(run_job(job, conn.send))
@@ -0,0 +1,458 @@
+"""
+Qt-free script execution semantics shared by the GUI debugger, the render
+worker process and the headless batch mode.
+"""
+
+import ast
+import random
+import sys
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from inspect import currentframe
+from random import randrange as rrr
+from hashlib import sha1
+from types import SimpleNamespace, ModuleType
+
+import cadquery as cq
+from logbook import info
+from path import Path
+
+from .cq_utils import find_cq_objects, object_state
+from .dxf_data import load_dxf
+from .import_cache import cached_imports
+from .profiler import span
+
+DUMMY_FILE = "<cq_editor-string>"
+RANDOM_SEED = 59798267586177
+
+
+def rand_color(alpha=0.0, cfloat=False):
+    # helper function to generate a random color dict
+    # for CQ-editor's show_object function
+    lower = 10
+    upper = 100  # not too high to keep color brightness in check
+    if cfloat:  # for two output types depending on need
+        return (
+            (rrr(lower, upper) / 255),
+            (rrr(lower, upper) / 255),
+            (rrr(lower, upper) / 255),
+            alpha,
+        )
+    return {
+        "alpha": alpha,
+        "color": (
+            rrr(lower, upper),
+            rrr(lower, upper),
+            rrr(lower, upper),
+        ),
+    }
+
+
+def compile_script(cq_script, cq_script_path=None):
+    """
+    Compile a script into a code object and an empty module to execute it in.
+    Raises on syntax errors.
+    """
+
+    module = ModuleType("__cq_main__")
+    if cq_script_path:
+        module.__dict__["__file__"] = cq_script_path
+    cq_code = compile(cq_script, DUMMY_FILE, "exec")
+
+    return cq_code, module
+
+
+def inject_locals(module, on_show=None):
+    """
+    Inject show_object, debug, rand_color, log, load_dxf and cq into the module
+    namespace. on_show(name, obj) is called on every show_object call.
+    Returns the dict collecting shown objects and the names to remove afterwards.
+    """
+
+    cq_objects = {}
+
+    def _show_object(obj, name=None, options={}):
+
+        if name:
+            cq_objects.update({name: SimpleNamespace(shape=obj, options=options)})
+        else:
+            # get locals of the enclosing scope
+            d = currentframe().f_back.f_locals
+
+            # try to find the name
+            try:
+                name = list(d.keys())[list(d.values()).index(obj)]
+            except ValueError:
+                # use id if not found
+                name = str(id(obj))
+
+            cq_objects.update({name: SimpleNamespace(shape=obj, options=options)})
+
+        if on_show is not None:
+            on_show(name, cq_objects[name])
+
+    def _debug(obj, name=None):
+
+        _show_object(obj, name, options=dict(color="red", alpha=0.2))
+
+    module.__dict__["show_object"] = _show_object
+    module.__dict__["debug"] = _debug
+    module.__dict__["rand_color"] = rand_color
+    module.__dict__["log"] = lambda x: info(str(x))
+    module.__dict__["load_dxf"] = load_dxf
+    module.__dict__["cq"] = cq
+
+    return cq_objects, set(module.__dict__) - {"cq"}
+
+
+def cleanup_locals(module, injected_names):
+
+    for name in injected_names:
+        module.__dict__.pop(name)
+
+
+@contextmanager
+def script_context(
+    script_path=None,
+    add_to_path=True,
+    change_dir=True,
+    reload_modules=True,
+    cache_imports=True,
+):
+    """
+    Honour the debugger preferences for sys.path, working directory, module
+    reloading and STEP import caching while the script is executed.
+    """
+
+    with ExitStack() as stack:
+        p = (script_path or Path("")).absolute().dirname()
+
+        if add_to_path and p.exists():
+            sys.path.insert(0, p)
+            stack.callback(sys.path.remove, p)
+        if change_dir and p.exists():
+            stack.enter_context(p)
+        if reload_modules:
+            stack.enter_context(module_manager())
+        if cache_imports:
+            stack.enter_context(cached_imports())
+
+        yield
+
+
+def exec_script(code, namespace, script_path=None, **kwargs):
+    """
+    Execute compiled code in the given namespace.
+    """
+
+    with script_context(script_path, **kwargs):
+        exec(code, namespace, namespace)
+
+
+class StatementCache(object):
+    """
+    Bounded LRU cache of the values assigned by top-level statements, keyed
+    by the statement fingerprint.
+    """
+
+    def __init__(self, size=64):
+
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+
+        return len(self._data)
+
+    def get(self, key):
+
+        rv = self._data.get(key)
+
+        if rv is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._data.move_to_end(key)
+
+        return rv
+
+    def put(self, key, values):
+
+        self._data[key] = values
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.size:
+            self._data.popitem(last=False)
+
+    def discard(self, key):
+
+        self._data.pop(key, None)
+
+    def clear(self):
+
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def _value_fingerprint(name, namespace):
+    """
+    Fingerprint of a value that was not produced by the script itself.
+    Returns None if the value cannot be fingerprinted.
+    """
+
+    if name not in namespace:
+        # builtins and names local to nested scopes
+        return name
+
+    value = namespace[name]
+
+    if isinstance(value, (int, float, complex, str, bytes, bool, type(None))):
+        return repr(value)
+
+    if isinstance(value, ModuleType):
+        module = value
+    elif callable(value) and hasattr(value, "__qualname__"):
+        module = sys.modules.get(getattr(value, "__module__", None))
+    else:
+        return None
+
+    path = getattr(module, "__file__", None)
+    mtime = Path(path).mtime if path and Path(path).exists() else None
+
+    return getattr(value, "__qualname__", value.__name__), module.__name__, mtime
+
+
+def _statement_names(stmt):
+    """
+    Names read and bound by a top-level statement.
+    """
+
+    loads = set()
+    stores = set()
+
+    for node in ast.walk(stmt):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load):
+                loads.add(node.id)
+            else:
+                stores.add(node.id)
+        elif isinstance(node, ast.alias):
+            stores.add((node.asname or node.name).split(".")[0])
+
+    if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        stores.add(stmt.name)
+
+    return loads, stores
+
+
+def _assigned_names(stmt):
+    """
+    Names bound by a cacheable statement (an assignment to plain names) or
+    None if the statement cannot be cached.
+    """
+
+    if isinstance(stmt, ast.Assign):
+        targets = stmt.targets
+    elif isinstance(stmt, ast.AnnAssign) and stmt.value is not None:
+        targets = [stmt.target]
+    else:
+        return None
+
+    rv = []
+
+    for target in targets:
+        elts = target.elts if isinstance(target, (ast.Tuple, ast.List)) else [target]
+        if not all(isinstance(el, ast.Name) for el in elts):
+            return None
+        rv.extend(el.id for el in elts)
+
+    return rv
+
+
+def exec_incremental(cq_script, namespace, cache, script_path=None, **kwargs):
+    """
+    Execute the script statement by statement, reusing the cached values of
+    top-level assignments whose source and inputs did not change.
+
+    Every name gets a fingerprint that is derived from the statements that
+    produced or used it, so the fingerprints (and the cache keys) are the same
+    on every run unless the script or the imported modules change. The state
+    of the random generator is part of the keys and is restored on a hit, so
+    that rand_color draws the same colors as an uncached run.
+
+    The cached values are the live objects, so an entry is dropped when a
+    statement that is executed changes one of its values in place, or, for
+    values whose state cannot be captured, just uses it.
+
+    A statement using a function or class defined by the script also depends
+    on the current fingerprints of the globals read by its body, which might
+    have been reassigned after the definition.
+
+    Returns the number of cache hits and misses.
+    """
+
+    tree = ast.parse(cq_script, DUMMY_FILE)
+    lines = cq_script.splitlines()
+    fingerprints = {}
+    hits = misses = 0
+
+    # id of a cached value -> [value, state, keys of the entries holding it]
+    tracked = {}
+
+    # globals read by the functions and classes defined by the script
+    free_names = {}
+
+    def expand(names):
+
+        rv = set(names)
+        todo = list(names)
+
+        while todo:
+            for name in free_names.get(todo.pop(), ()):
+                if name not in rv:
+                    rv.add(name)
+                    todo.append(name)
+
+        return rv
+
+    def track(key, values):
+
+        for value in values.values():
+            entry = tracked.setdefault(id(value), [value, object_state(value), set()])
+            entry[2].add(key)
+
+    with script_context(script_path, **kwargs):
+        for stmt in tree.body:
+            loads, stores = _statement_names(stmt)
+            loads = expand(loads)
+
+            inputs = []
+            for name in sorted(loads):
+                if name in fingerprints:
+                    inputs.append((name, fingerprints[name]))
+                else:
+                    inputs.append((name, _value_fingerprint(name, namespace)))
+
+            if any(fp is None for _, fp in inputs):
+                key = None
+            else:
+                key = sha1(
+                    repr((ast.dump(stmt), inputs, hash(random.getstate()))).encode()
+                ).hexdigest()
+
+            assigned = _assigned_names(stmt) if key is not None else None
+
+            entry = None
+            if assigned is not None:
+                entry = cache.get(key)
+                if entry is None:
+                    misses += 1
+                else:
+                    hits += 1
+
+            if entry is None:
+                used = {id(namespace[name]) for name in loads if name in namespace}
+
+                code = compile(ast.Module([stmt], type_ignores=[]), DUMMY_FILE, "exec")
+                with span("line", lines[stmt.lineno - 1].strip(), stmt.lineno):
+                    exec(code, namespace, namespace)
+
+                # drop the entries whose values were changed in place
+                for value_id, (value, state, keys) in list(tracked.items()):
+                    if state is None:
+                        changed = value_id in used
+                    else:
+                        changed = object_state(value) != state
+
+                    if changed:
+                        for k in keys:
+                            cache.discard(k)
+                        del tracked[value_id]
+
+                if assigned is not None:
+                    values = {name: namespace[name] for name in assigned}
+
+                    # functions of the script would run with the globals of
+                    # this run on a later hit
+                    if not any(
+                        getattr(value, "__globals__", None) is namespace
+                        for value in values.values()
+                    ):
+                        cache.put(key, (values, random.getstate()))
+                        track(key, values)
+            else:
+                values, random_state = entry
+                namespace.update(values)
+                random.setstate(random_state)
+                track(key, values)
+
+            for name in stores:
+                free_names.pop(name, None)
+
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                free_names[stmt.name] = loads
+            elif isinstance(getattr(stmt, "value", None), ast.Lambda):
+                for name in stores:
+                    free_names[name] = loads
+
+            # names used by a statement may have been mutated by it
+            for name in loads & fingerprints.keys() | stores:
+                if key is None:
+                    fingerprints[name] = None
+                elif isinstance(stmt, (ast.Import, ast.ImportFrom)):
+                    fingerprints[name] = _value_fingerprint(name, namespace)
+                else:
+                    fingerprints[name] = sha1(f"{key}{name}".encode()).hexdigest()
+
+    return hits, misses
+
+
+def exec_profiled(cq_script, namespace, script_path=None, **kwargs):
+    """
+    Execute the script statement by statement, recording a profiler span for
+    every top-level statement.
+    """
+
+    tree = ast.parse(cq_script, DUMMY_FILE)
+    lines = cq_script.splitlines()
+
+    with script_context(script_path, **kwargs):
+        for stmt in tree.body:
+            code = compile(ast.Module([stmt], type_ignores=[]), DUMMY_FILE, "exec")
+            with span("line", lines[stmt.lineno - 1].strip(), stmt.lineno):
+                exec(code, namespace, namespace)
+
+
+def run_script(cq_script, cq_script_path=None, on_show=None, **kwargs):
+    """
+    Compile and execute a script the same way Debugger.render does and return
+    the shown (or discovered) CQ objects together with the module namespace.
+    """
+
+    cq_code, module = compile_script(cq_script, cq_script_path)
+    cq_objects, injected_names = inject_locals(module, on_show)
+
+    exec_script(cq_code, module.__dict__, cq_script_path, **kwargs)
+    cleanup_locals(module, injected_names)
+
+    # collect all CQ objects if no explicit show_object was called
+    if len(cq_objects) == 0:
+        cq_objects = find_cq_objects(module.__dict__)
+
+    return cq_objects, module
+
+
+@contextmanager
+def module_manager():
+    """unloads any modules loaded while the context manager is active"""
+    loaded_modules = set(sys.modules.keys())
+
+    try:
+        yield
+    finally:
+        new_modules = set(sys.modules.keys()) - loaded_modules
+        for module_name in new_modules:
+            del sys.modules[module_name]
@@ -1,21 +1,63 @@
 # Much of this code was adapted from https://github.com/leixingyu/codeEditor which is under
 # an MIT license
 import os
+import re
+from bisect import bisect_left
+from itertools import islice
+
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtGui import QPalette, QColor
 
 DARK_BLUE = QtGui.QColor(118, 150, 185)
 
+# Characters outside of the Basic Multilingual Plane, two UTF-16 code units each
+ASTRAL = re.compile("[\U00010000-\U0010ffff]")
+
 
 class SearchWidget(QtWidgets.QWidget):
+    """
+    Incremental search over the editor text.
+
+    The matches are kept as sorted (start, end) offsets and are found in
+    batches of SEARCH_BATCH matches from a timer, so that typing is not
+    blocked by large documents. Only the matches in the viewport are
+    highlighted and the total count is shown with a "+" until the whole
+    document was searched.
+    """
+
+    # matches found per step of the background search
+    SEARCH_BATCH = 5000
+
+    # delay [ms] before searching again after an edit of the document
+    EDIT_DELAY = 200
+
+    MATCH_COLOR = QtGui.QColor(255, 255, 0, 100)
+    CURRENT_MATCH_COLOR = QtGui.QColor(255, 165, 0)
+
     def __init__(self, editor):
         super(SearchWidget, self).__init__(editor)
         self.editor = editor
         self.current_match = 0
         self.total_matches = 0
+        self.matches = []
+
+        self._scan = None
+        self._astral = []
+        self._move_cursor = True
+        self._search_timer = QtCore.QTimer(self)
+        self._search_timer.timeout.connect(self._search_step)
+
+        self._edit_timer = QtCore.QTimer(self)
+        self._edit_timer.setSingleShot(True)
+        self._edit_timer.setInterval(self.EDIT_DELAY)
+        self._edit_timer.timeout.connect(self._search_again)
 
         self.setup_ui()
 
+        # Highlight the matches scrolled into view and follow the edits
+        self.editor.verticalScrollBar().valueChanged.connect(self.highlight_matches)
+        self.editor.textChanged.connect(self._text_changed)
+
         # This widget should initially be hidden
         self.hide()
 
@@ -31,6 +73,19 @@ class SearchWidget(QtWidgets.QWidget):
         self.search_input.textChanged.connect(self.on_search_text_changed)
         self.search_input.returnPressed.connect(self.find_next)
 
+        # Regular expression and whole word toggles
+        self.regex_button = QtWidgets.QPushButton(".*")
+        self.regex_button.setToolTip("Regular expression")
+        self.regex_button.setCheckable(True)
+        self.regex_button.setMaximumSize(30, 20)
+        self.regex_button.toggled.connect(self._options_changed)
+
+        self.word_button = QtWidgets.QPushButton("W")
+        self.word_button.setToolTip("Whole words")
+        self.word_button.setCheckable(True)
+        self.word_button.setMaximumSize(30, 20)
+        self.word_button.toggled.connect(self._options_changed)
+
         # Previous button
         self.prev_button = QtWidgets.QPushButton("Prev")
         self.prev_button.clicked.connect(self.find_previous)
@@ -51,12 +106,21 @@ class SearchWidget(QtWidgets.QWidget):
 
         # Add widgets to layout
         layout.addWidget(self.search_input)
+        layout.addWidget(self.regex_button)
+        layout.addWidget(self.word_button)
         layout.addWidget(self.prev_button)
         layout.addWidget(self.next_button)
         layout.addWidget(self.match_label)
         layout.addWidget(self.close_button)
         self.setLayout(layout)
 
+    @property
+    def searching(self):
+        """
+        True while the background search has not reached the end of the text.
+        """
+        return self._scan is not None
+
     def on_search_text_changed(self, text):
         """
         Called as the user types text into the search field.
@@ -70,39 +134,109 @@ class SearchWidget(QtWidgets.QWidget):
 
         self.find_all_matches(text)
 
-    def find_all_matches(self, search_text):
+    def compile_pattern(self, search_text):
+        """
+        Regular expression of the search text for the current options, or
+        None if the text is not a valid regular expression. Like
+        QTextDocument.find the search is case insensitive.
+        """
+        if self.regex_button.isChecked():
+            pattern = search_text
+        else:
+            pattern = re.escape(search_text)
+
+        if self.word_button.isChecked():
+            pattern = rf"(?<!\w)(?:{pattern})(?!\w)"
+
+        try:
+            return re.compile(pattern, re.IGNORECASE)
+        except re.error:
+            return None
+
+    def find_all_matches(self, search_text, move_cursor=True):
         """
-        Finds all the matches within the search text.
+        Starts searching the document for the search text. The first batch of
+        matches is found right away, the rest in the background. If
+        move_cursor is False the current match is the first one after the
+        text cursor and the cursor stays where it is.
         """
         if not search_text:
             return
 
-        # Clear any previous highlights
+        # Clear any previous highlights and stop the previous search
         self.clear_highlights()
 
-        # Find all matches
-        document = self.editor.document()
-        cursor = QtGui.QTextCursor(document)
-        self.matches = []
+        pattern = self.compile_pattern(search_text)
+        if pattern is None:
+            self.prev_button.setEnabled(False)
+            self.next_button.setEnabled(False)
+            self.match_label.setText("Invalid regex")
+            return
 
-        # Find all occurrences
-        while True:
-            # Look for a match
-            cursor = document.find(search_text, cursor)
-            if cursor.isNull():
-                break
-            self.matches.append(cursor)
+        text = self.editor.toPlainText()
+        self._scan = pattern.finditer(text)
+
+        # QTextCursor positions count UTF-16 code units, not characters
+        self._astral = [m.start() for m in ASTRAL.finditer(text)]
+        self._move_cursor = move_cursor
+        self.current_match = 0
+
+        self._search_step()
+
+        if self.searching:
+            self._search_timer.start(0)
+
+    def _search_step(self):
+        """
+        Finds the next batch of matches of the running search.
+        """
+        if self._scan is None:
+            self._search_timer.stop()
+            return
+
+        first = len(self.matches)
+        found = 0
+
+        for found, m in enumerate(islice(self._scan, self.SEARCH_BATCH), 1):
+            start, end = m.span()
+
+            # Empty matches of a regular expression cannot be highlighted
+            if end == start:
+                continue
+
+            if self._astral:
+                start += bisect_left(self._astral, start)
+                end += bisect_left(self._astral, end)
+
+            self.matches.append((start, end))
+
+        # The end of the document was reached
+        if found < self.SEARCH_BATCH:
+            self._scan = None
+            self._search_timer.stop()
 
         self.total_matches = len(self.matches)
 
-        # If there are matches make them visible to the user
-        if self.total_matches > 0:
-            self.current_match = 0
-            self.highlight_matches()
-            self.highlight_current_match()
+        # The first matches were found
+        if first == 0 and self.matches:
             self.prev_button.setEnabled(True)
             self.next_button.setEnabled(True)
-        else:
+
+            if self._move_cursor:
+                self.highlight_current_match()
+            else:
+                position = self.editor.textCursor().selectionStart()
+                self.current_match = bisect_left(self.matches, (position,))
+                # Past the last match found so far
+                if self.current_match == len(self.matches):
+                    self.current_match = len(self.matches) - 1 if self.searching else 0
+
+        if self.matches and first < len(self.matches):
+            start, end = self.visible_range()
+            if self.matches[first][0] < end:
+                self.highlight_matches()
+
+        if not self.matches and not self.searching:
             self.prev_button.setEnabled(False)
             self.next_button.setEnabled(False)
 
@@ -110,48 +244,95 @@ class SearchWidget(QtWidgets.QWidget):
             self.current_match + 1 if self.total_matches > 0 else 0, self.total_matches
         )
 
-    def highlight_matches(self):
+    def _finish_search(self):
         """
-        Highlights all matches to make them visible.
+        Finds the remaining matches of the running search.
         """
-        extra_selections = []
+        while self.searching:
+            self._search_step()
 
-        for cursor in self.matches:
-            selection = QtWidgets.QTextEdit.ExtraSelection()
-            selection.format.setBackground(QtGui.QColor(255, 255, 0, 100))
-            selection.cursor = cursor
-            extra_selections.append(selection)
+    def _search_again(self):
+        """
+        Searches the edited document without moving the text cursor.
+        """
+        if self.isVisible() and self.search_input.text():
+            self.find_all_matches(self.search_input.text(), move_cursor=False)
 
-        self.editor.setExtraSelections(extra_selections)
+    def _text_changed(self):
+        """
+        The offsets of the matches are invalid once the text is edited.
+        """
+        if self.isVisible() and self.search_input.text():
+            self._edit_timer.start()
 
-    def highlight_current_match(self):
+    def _options_changed(self):
         """
-        Makes the current match stand out from the others.
+        Searches again when regex or whole word mode is toggled.
         """
+        self.on_search_text_changed(self.search_input.text())
 
-        # If there are no matches to highlight, then skip this step
-        if not self.matches or self.current_match >= len(self.matches):
+    def visible_range(self):
+        """
+        Document positions of the start of the first and of the end of the
+        last block in the viewport.
+        """
+        first = self.editor.firstVisibleBlock()
+        bottom = QtCore.QPoint(0, self.editor.viewport().height())
+        last = self.editor.cursorForPosition(bottom).block()
+
+        return first.position(), last.position() + last.length()
+
+    def highlight_matches(self):
+        """
+        Highlights the matches in the viewport to make them visible.
+        """
+        if not self.matches:
             return
 
-        # Highlight current match more than others and scroll to it
+        document = self.editor.document()
+        start, end = self.visible_range()
         extra_selections = []
 
-        for i, cursor in enumerate(self.matches):
+        for i in range(bisect_left(self.matches, (start,)), len(self.matches)):
+            match_start, match_end = self.matches[i]
+            if match_start >= end:
+                break
+
+            cursor = QtGui.QTextCursor(document)
+            cursor.setPosition(match_start)
+            cursor.setPosition(match_end, QtGui.QTextCursor.KeepAnchor)
+
             selection = QtWidgets.QTextEdit.ExtraSelection()
             # The current match should stand out
             if i == self.current_match:
-                selection.format.setBackground(QtGui.QColor(255, 165, 0))
+                selection.format.setBackground(self.CURRENT_MATCH_COLOR)
             else:
-                selection.format.setBackground(QtGui.QColor(255, 255, 0, 100))
+                selection.format.setBackground(self.MATCH_COLOR)
             selection.cursor = cursor
             extra_selections.append(selection)
 
         self.editor.setExtraSelections(extra_selections)
 
+    def highlight_current_match(self):
+        """
+        Makes the current match stand out from the others.
+        """
+
+        # If there are no matches to highlight, then skip this step
+        if not self.matches or self.current_match >= len(self.matches):
+            return
+
         # Scroll to the current match
-        self.editor.setTextCursor(self.matches[self.current_match])
+        match_start, match_end = self.matches[self.current_match]
+        cursor = QtGui.QTextCursor(self.editor.document())
+        cursor.setPosition(match_start)
+        cursor.setPosition(match_end, QtGui.QTextCursor.KeepAnchor)
+        self.editor.setTextCursor(cursor)
         self.editor.ensureCursorVisible()
 
+        # Highlight current match more than others
+        self.highlight_matches()
+
     def find_next(self):
         """
         Finds the next match.
@@ -161,6 +342,10 @@ class SearchWidget(QtWidgets.QWidget):
         if not self.matches:
             return
 
+        # Do not wrap around before the end of the document was searched
+        if self.current_match + 1 >= len(self.matches):
+            self._finish_search()
+
         self.current_match = (self.current_match + 1) % len(self.matches)
         self.highlight_current_match()
         self.update_match_count(self.current_match + 1, self.total_matches)
@@ -174,6 +359,10 @@ class SearchWidget(QtWidgets.QWidget):
         if not self.matches:
             return
 
+        # Wrapping around needs the last match of the document
+        if self.current_match == 0:
+            self._finish_search()
+
         self.current_match = (self.current_match - 1) % len(self.matches)
         self.highlight_current_match()
         self.update_match_count(self.current_match + 1, self.total_matches)
@@ -182,17 +371,25 @@ class SearchWidget(QtWidgets.QWidget):
         """
         Updates the match count for the user.
         """
+        # The total is a lower bound until the search is done
+        more = "+" if self.searching else ""
+
         if total == 0:
-            self.match_label.setText("0 matches")
+            self.match_label.setText("Searching..." if more else "0 matches")
         else:
-            self.match_label.setText(f"{current} of {total}")
+            self.match_label.setText(f"{current} of {total}{more}")
 
     def clear_highlights(self):
         """
-        Clears all of the find highlights.
+        Clears all of the find highlights and stops the running search.
         """
+        self._search_timer.stop()
+        self._edit_timer.stop()
+        self._scan = None
+
         self.editor.setExtraSelections([])
         self.matches = []
+        self.total_matches = 0
 
     def show_search(self):
         """
@@ -226,7 +423,7 @@ class SearchWidget(QtWidgets.QWidget):
 
         # Top-right corner of the editor
         editor_rect = self.editor.geometry()
-        widget_width = 400
+        widget_width = 460
         widget_height = 40
         x = editor_rect.width() - widget_width - 20
         y = 10
@@ -747,6 +944,10 @@ class CodeEditor(CodeTextEdit):
         rect = QtCore.QRect(cr.left(), cr.top(), width, cr.height())
         self.line_number_area.setGeometry(rect)
 
+        # More matches of the search may fit in the viewport
+        if self.search_widget.isVisible():
+            self.search_widget.highlight_matches()
+
     def lineNumberAreaPaintEvent(self, event):
         painter = QtGui.QPainter(self.line_number_area)
         try:
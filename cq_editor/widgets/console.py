@@ -1,8 +1,12 @@
+from threading import Thread
+from time import perf_counter
+
 from PyQt5.QtWidgets import QApplication, QAction
-from PyQt5.QtCore import pyqtSlot
+from PyQt5.QtCore import pyqtSlot, pyqtSignal
 
 from qtconsole.rich_jupyter_widget import RichJupyterWidget
 from qtconsole.inprocess import QtInProcessKernelManager
+from traitlets.config import Config
 
 from ..mixins import ComponentMixin
 
@@ -13,6 +17,8 @@ class ConsoleWidget(RichJupyterWidget, ComponentMixin):
 
     name = "Console"
 
+    sigKernelStarted = pyqtSignal()
+
     def __init__(self, customBanner=None, namespace=dict(), *args, **kwargs):
         super(ConsoleWidget, self).__init__(*args, **kwargs)
 
@@ -47,12 +53,57 @@ class ConsoleWidget(RichJupyterWidget, ComponentMixin):
                             """
         self.syntax_style = "zenburn"
 
-        self.kernel_manager = kernel_manager = QtInProcessKernelManager()
-        kernel_manager.start_kernel(show_banner=False)
+        # the kernel is created in a background thread and the history
+        # database is then written from the GUI thread
+        config = Config()
+        config.HistoryManager.connection_options = {"check_same_thread": False}
+
+        self.kernel_manager = QtInProcessKernelManager(config=config)
+        self.kernel_ready = False
+        self.startup_time = None
+
+        self._pending_vars = {}
+        self._t0 = perf_counter()
+
+        self._control.setPlainText("Starting the IPython kernel...")
+
+        self.sigKernelStarted.connect(self.wait_for_kernel)
+        self._thread = Thread(target=self._start_kernel, daemon=True)
+        self._thread.start()
+
+        self.push_vars(namespace)
+
+    def _start_kernel(self):
+
+        try:
+            self.kernel_manager.start_kernel(show_banner=False)
+        finally:
+            try:
+                self.sigKernelStarted.emit()
+            except RuntimeError:  # the console was deleted in the meantime
+                pass
+
+    @pyqtSlot()
+    def wait_for_kernel(self):
+        """
+        Block until the kernel is started and connect the console to it.
+        """
+
+        if self.kernel_ready:
+            return
+
+        self._thread.join()
+
+        kernel_manager = self.kernel_manager
+
+        if kernel_manager.kernel is None:
+            self._control.setPlainText("The IPython kernel failed to start")
+            return
+
         kernel_manager.kernel.gui = "qt"
         kernel_manager.kernel.shell.banner1 = ""
 
-        self.kernel_client = kernel_client = self._kernel_manager.client()
+        self.kernel_client = kernel_client = kernel_manager.client()
         kernel_client.start_channels()
 
         def stop():
@@ -62,17 +113,31 @@ class ConsoleWidget(RichJupyterWidget, ComponentMixin):
 
         self.exit_requested.connect(stop)
 
+        self.kernel_ready = True
+        self.startup_time = perf_counter() - self._t0
+
         self.clear()
 
-        self.push_vars(namespace)
+        self.push_vars(self._pending_vars)
+        self._pending_vars = {}
 
     @pyqtSlot(dict)
     def push_vars(self, variableDict):
         """
         Given a dictionary containing name / value pairs, push those variables
-        to the Jupyter console widget
+        to the Jupyter console widget. The variables are queued until the
+        kernel is started.
         """
-        self.kernel_manager.kernel.shell.push(variableDict)
+        if self.kernel_ready:
+            self.kernel_manager.kernel.shell.push(variableDict)
+        else:
+            self._pending_vars.update(variableDict)
+
+    def execute(self, *args, **kwargs):
+
+        self.wait_for_kernel()
+
+        return super(ConsoleWidget, self).execute(*args, **kwargs)
 
     def clear(self):
         """
@@ -84,6 +149,7 @@ class ConsoleWidget(RichJupyterWidget, ComponentMixin):
         """
         Resets the terminal, which clears it back to a single prompt.
         """
+        self.wait_for_kernel()
         self.reset(clear=True)
 
     def print_text(self, text):
@@ -96,6 +162,7 @@ class ConsoleWidget(RichJupyterWidget, ComponentMixin):
         """
         Execute a command in the frame of the console widget
         """
+        self.wait_for_kernel()
         self._execute(command, False)
 
     def _banner_default(self):
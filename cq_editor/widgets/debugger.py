@@ -1,16 +1,17 @@
 import sys
-from contextlib import ExitStack, contextmanager
+import sqlite3
+import multiprocessing
 from enum import Enum, auto
-from types import SimpleNamespace, FrameType, ModuleType
+from types import FrameType, CodeType
 from typing import List
 from bdb import BdbQuit
-from inspect import currentframe
+from time import perf_counter
 
-import cadquery as cq
 from PyQt5 import QtCore
 from PyQt5.QtCore import (
     Qt,
     QObject,
+    QTimer,
     pyqtSlot,
     pyqtSignal,
     QEventLoop,
@@ -18,16 +19,45 @@ from PyQt5.QtCore import (
 )
 from PyQt5.QtWidgets import QAction, QTableView
 
-from logbook import info
 from path import Path
 from pyqtgraph.parametertree import Parameter
 from ..icons import icon
-from random import randrange as rrr, seed
-
-from ..cq_utils import find_cq_objects, reload_cq
+from random import seed
+
+from ..cq_utils import (
+    find_cq_objects,
+    reload_cq,
+    to_compound,
+    triangle_count,
+    object_hash,
+    MESH_CACHE,
+)
 from ..mixins import ComponentMixin
+from ..render_worker import worker_main, deserialize_objects, deserialize_exception
+from ..profiler import RenderProfile, profiling, span
+from ..render_history import (
+    RenderHistory,
+    baseline,
+    regressions,
+    peak_memory,
+    reset_peak_memory,
+)
+from ..script_runner import (
+    DUMMY_FILE,
+    RANDOM_SEED,
+    rand_color,
+    compile_script,
+    inject_locals,
+    cleanup_locals,
+    exec_script,
+    exec_incremental,
+    exec_profiled,
+    module_manager,
+    StatementCache,
+)
 
-DUMMY_FILE = "<cq_editor-string>"
+# low overhead tracing backend (PEP 669)
+MONITORING = hasattr(sys, "monitoring")
 
 
 class DbgState(Enum):
@@ -111,6 +141,116 @@ class LocalsView(QTableView, ComponentMixin):
         self.setModel(model)
 
 
+class RenderWorker(QObject):
+    """
+    Client side of the persistent render worker process.
+    """
+
+    POLL_INTERVAL = 50  # ms
+
+    sigFinished = pyqtSignal(object)
+    sigObjects = pyqtSignal(dict)
+    sigBusy = pyqtSignal(bool)
+
+    def __init__(self, parent=None):
+
+        super(RenderWorker, self).__init__(parent)
+
+        self._process = None
+        self._conn = None
+        self.busy = False
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.POLL_INTERVAL)
+        self._timer.timeout.connect(self._poll)
+
+    def _start(self):
+
+        ctx = multiprocessing.get_context("spawn")
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(target=worker_main, args=(child_conn,), daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    def submit(self, job):
+
+        # a new job supersedes the one in progress
+        if self.busy:
+            self.cancel()
+
+        if self._process is None or not self._process.is_alive():
+            self._start()
+
+        self._conn.send(job)
+        self._set_busy(True)
+        self._timer.start()
+
+    @pyqtSlot()
+    def cancel(self):
+
+        self._timer.stop()
+
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._conn.close()
+            self._process = None
+            self._conn = None
+
+        self._set_busy(False)
+
+    def shutdown(self):
+
+        if self._process is not None and not self.busy:
+            self._conn.send(None)
+            self._process.join(1)
+
+        self.cancel()
+
+    def _set_busy(self, value):
+
+        self.busy = value
+        self.sigBusy.emit(value)
+
+    def _poll(self):
+
+        result = None
+        objects = {}
+
+        # objects streamed since the last poll are delivered in one batch
+        try:
+            while result is None and self._conn.poll():
+                msg = self._conn.recv()
+                if msg[0] == "object":
+                    objects.update(msg[1])
+                else:
+                    result = msg
+        except (OSError, EOFError):
+            pass
+
+        if objects:
+            self.sigObjects.emit(objects)
+
+        if result is not None:
+            self._timer.stop()
+            self._set_busy(False)
+            self.sigFinished.emit(result)
+        elif not self._process.is_alive():
+            exitcode = self._process.exitcode
+            self.cancel()
+            self.sigFinished.emit(
+                (
+                    "error",
+                    (
+                        "WorkerCrash",
+                        f"Render worker exited unexpectedly (exit code {exitcode})",
+                        [],
+                        None,
+                    ),
+                )
+            )
+
+
 class Debugger(QObject, ComponentMixin):
 
     name = "Debugger"
@@ -122,10 +262,19 @@ class Debugger(QObject, ComponentMixin):
             {"name": "Add script dir to path", "type": "bool", "value": True},
             {"name": "Change working dir to script dir", "type": "bool", "value": True},
             {"name": "Reload imported modules", "type": "bool", "value": True},
+            {"name": "Render in worker process", "type": "bool", "value": False},
+            {"name": "Stream shown objects", "type": "bool", "value": True},
+            {"name": "Cache statement results", "type": "bool", "value": False},
+            {"name": "Statement cache size", "type": "int", "value": 64},
+            {"name": "Cache STEP imports", "type": "bool", "value": True},
+            {"name": "Profile renders", "type": "bool", "value": False},
+            {"name": "Render history size", "type": "int", "value": 50},
         ],
     )
 
     sigRendered = pyqtSignal(dict)
+    sigObjectsStreamed = pyqtSignal(dict)
+    sigStreamAborted = pyqtSignal()
     sigLocals = pyqtSignal(dict)
     sigTraceback = pyqtSignal(object, str)
 
@@ -134,6 +283,10 @@ class Debugger(QObject, ComponentMixin):
     sigLocalsChanged = pyqtSignal(dict)
     sigCQChanged = pyqtSignal(dict, bool)
     sigDebugging = pyqtSignal(bool)
+    sigRendering = pyqtSignal(bool)
+    statusChanged = pyqtSignal(str)
+    sigProfile = pyqtSignal(object)
+    sigHistory = pyqtSignal(list)
 
     _frames: List[FrameType]
     _stop_debugging: bool
@@ -182,8 +335,40 @@ class Debugger(QObject, ComponentMixin):
             ]
         }
 
+        self._cancel_action = QAction(
+            icon("stop"),
+            "Cancel render",
+            self,
+            enabled=False,
+            triggered=self.cancel_render,
+        )
+
+        self._worker = RenderWorker(self)
+        self._worker.sigFinished.connect(self._handle_worker_result)
+        self._worker.sigObjects.connect(self._handle_worker_objects)
+        self._worker.sigBusy.connect(self._cancel_action.setEnabled)
+        self._worker.sigBusy.connect(self.sigRendering)
+        self._worker_script = ""
+        self._worker_start = 0.0
+        self._streamed = {}
+
+        self._statement_cache = StatementCache()
+        self._history = RenderHistory()
+
         self._frames = []
         self._stop_debugging = False
+        self._breakpoints = set()
+        self._conditions = {}
+        self._codes = []
+        self._step_frame = None
+
+    def menuActions(self):
+
+        return {"Run": self._actions["Run"] + [self._cancel_action]}
+
+    def toolbarActions(self):
+
+        return self._actions["Run"] + [self._cancel_action]
 
     def get_current_script(self):
 
@@ -205,100 +390,103 @@ class Debugger(QObject, ComponentMixin):
     def compile_code(self, cq_script, cq_script_path=None):
 
         try:
-            module = ModuleType("__cq_main__")
-            if cq_script_path:
-                module.__dict__["__file__"] = cq_script_path
-            cq_code = compile(cq_script, DUMMY_FILE, "exec")
-            return cq_code, module
+            return compile_script(cq_script, cq_script_path)
         except Exception:
             self.sigTraceback.emit(sys.exc_info(), cq_script)
             return None, None
 
     def _exec(self, code, locals_dict, globals_dict):
 
-        with ExitStack() as stack:
-            p = (self.get_current_script_path() or Path("")).absolute().dirname()
-
-            if self.preferences["Add script dir to path"] and p.exists():
-                sys.path.insert(0, p)
-                stack.callback(sys.path.remove, p)
-            if self.preferences["Change working dir to script dir"] and p.exists():
-                stack.enter_context(p)
-            if self.preferences["Reload imported modules"]:
-                stack.enter_context(module_manager())
-
-            exec(code, locals_dict, globals_dict)
-
-    @staticmethod
-    def _rand_color(alpha=0.0, cfloat=False):
-        # helper function to generate a random color dict
-        # for CQ-editor's show_object function
-        lower = 10
-        upper = 100  # not too high to keep color brightness in check
-        if cfloat:  # for two output types depending on need
-            return (
-                (rrr(lower, upper) / 255),
-                (rrr(lower, upper) / 255),
-                (rrr(lower, upper) / 255),
-                alpha,
-            )
-        return {
-            "alpha": alpha,
-            "color": (
-                rrr(lower, upper),
-                rrr(lower, upper),
-                rrr(lower, upper),
-            ),
-        }
+        exec_script(
+            code,
+            locals_dict,
+            self.get_current_script_path(),
+            add_to_path=self.preferences["Add script dir to path"],
+            change_dir=self.preferences["Change working dir to script dir"],
+            reload_modules=self.preferences["Reload imported modules"],
+            cache_imports=self.preferences["Cache STEP imports"],
+        )
+
+    def _exec_profiled(self, cq_script, namespace):
+
+        exec_profiled(
+            cq_script,
+            namespace,
+            self.get_current_script_path(),
+            add_to_path=self.preferences["Add script dir to path"],
+            change_dir=self.preferences["Change working dir to script dir"],
+            reload_modules=self.preferences["Reload imported modules"],
+            cache_imports=self.preferences["Cache STEP imports"],
+        )
+
+    def _exec_incremental(self, cq_script, namespace):
+
+        self._statement_cache.size = self.preferences["Statement cache size"]
+
+        hits, misses = exec_incremental(
+            cq_script,
+            namespace,
+            self._statement_cache,
+            self.get_current_script_path(),
+            add_to_path=self.preferences["Add script dir to path"],
+            change_dir=self.preferences["Change working dir to script dir"],
+            reload_modules=self.preferences["Reload imported modules"],
+            cache_imports=self.preferences["Cache STEP imports"],
+        )
+
+        self.statusChanged.emit(f"Statement cache: {hits} hits, {misses} misses")
+
+    _rand_color = staticmethod(rand_color)
 
     def _inject_locals(self, module):
 
-        cq_objects = {}
-
-        def _show_object(obj, name=None, options={}):
+        return inject_locals(module)
 
-            if name:
-                cq_objects.update({name: SimpleNamespace(shape=obj, options=options)})
-            else:
-                # get locals of the enclosing scope
-                d = currentframe().f_back.f_locals
+    def _cleanup_locals(self, module, injected_names):
 
-                # try to find the name
-                try:
-                    name = list(d.keys())[list(d.values()).index(obj)]
-                except ValueError:
-                    # use id if not found
-                    name = str(id(obj))
+        cleanup_locals(module, injected_names)
 
-                cq_objects.update({name: SimpleNamespace(shape=obj, options=options)})
+    @pyqtSlot(bool)
+    def render(self):
 
-        def _debug(obj, name=None):
+        if self.preferences["Render in worker process"]:
+            self.render_in_worker()
+            return
 
-            _show_object(obj, name, options=dict(color="red", alpha=0.2))
+        reset_peak_memory()
+        start = perf_counter()
 
-        module.__dict__["show_object"] = _show_object
-        module.__dict__["debug"] = _debug
-        module.__dict__["rand_color"] = self._rand_color
-        module.__dict__["log"] = lambda x: info(str(x))
-        module.__dict__["cq"] = cq
+        seed(RANDOM_SEED)
+        if self.preferences["Reload CQ"]:
+            reload_cq()
 
-        return cq_objects, set(module.__dict__) - {"cq"}
+        profile = RenderProfile() if self.preferences["Profile renders"] else None
 
-    def _cleanup_locals(self, module, injected_names):
+        with profiling(profile):
+            cq_objects = self._render(profile)
 
-        for name in injected_names:
-            module.__dict__.pop(name)
+        if profile is not None:
+            self.sigProfile.emit(profile)
 
-    @pyqtSlot(bool)
-    def render(self):
+        if cq_objects is not None:
+            self._record_render(
+                self.get_current_script(),
+                cq_objects,
+                perf_counter() - start,
+                peak_memory(),
+            )
 
-        seed(59798267586177)
-        if self.preferences["Reload CQ"]:
-            reload_cq()
+    def _render(self, profile=None):
+        """
+        Execute the current script in process. Returns the rendered objects or
+        None on failure.
+        """
 
         cq_script = self.get_current_script()
         cq_script_path = self.get_current_script_path()
-        cq_code, module = self.compile_code(cq_script, cq_script_path)
+
+        with span("compile", "script"):
+            cq_code, module = self.compile_code(cq_script, cq_script_path)
 
         if cq_code is None:
             return
@@ -306,7 +494,12 @@ class Debugger(QObject, ComponentMixin):
         cq_objects, injected_names = self._inject_locals(module)
 
         try:
-            self._exec(cq_code, module.__dict__, module.__dict__)
+            if self.preferences["Cache statement results"]:
+                self._exec_incremental(cq_script, module.__dict__)
+            elif profile is not None:
+                self._exec_profiled(cq_script, module.__dict__)
+            else:
+                self._exec(cq_code, module.__dict__, module.__dict__)
 
             # remove the special methods
             self._cleanup_locals(module, injected_names)
@@ -321,10 +514,200 @@ class Debugger(QObject, ComponentMixin):
             exc_info = sys.exc_info()
             sys.last_traceback = exc_info[-1]
             self.sigTraceback.emit(exc_info, cq_script)
+            return None
+
+        return cq_objects
+
+    @staticmethod
+    def _triangles(cq_objects):
+
+        rv = 0
+
+        for obj in cq_objects.values():
+            try:
+                shape = to_compound(obj.shape).wrapped
+            except Exception:
+                # assemblies and other objects without a single shape
+                continue
+
+            # the meshed counterpart of the shape is displayed on a cache hit
+            if MESH_CACHE.enabled:
+                shape = MESH_CACHE.lookup(shape, object_hash(obj.shape)) or shape
+
+            rv += triangle_count(shape)
+
+        return rv
+
+    def _record_render(self, cq_script, cq_objects, wall_time, peak):
+        """
+        Add a successful render to the history of the current file and warn
+        if it is much slower than the previous ones.
+        """
+
+        size = self.preferences["Render history size"]
+        if size <= 0:
+            return
+
+        self._history.size = size
+
+        try:
+            records = self._history.record(
+                self.get_current_script_path(),
+                cq_script,
+                wall_time,
+                peak,
+                len(cq_objects),
+                self._triangles(cq_objects),
+            )
+        except sqlite3.Error as e:
+            self._logger.warning(f"Cannot store the render history: {e}")
+            return
+
+        last = len(records) - 1
+        if last in regressions(records):
+            self._logger.warning(
+                f"Render took {wall_time:.2f} s, "
+                f"{wall_time / baseline(records, last):.1f}x slower than before"
+            )
+
+        self.sigHistory.emit(records)
+
+    def history(self):
+        """
+        Render history of the current file, empty if it cannot be read.
+        """
+
+        try:
+            return self._history.records(self.get_current_script_path())
+        except sqlite3.Error as e:
+            self._logger.warning(f"Cannot read the render history: {e}")
+            return []
+
+    def render_in_worker(self):
+        """
+        Execute the current script in the persistent worker process. The GUI
+        stays responsive and results are delivered asynchronously.
+        """
+
+        # the new render supersedes the one in progress
+        if self._worker.busy:
+            self._abort_stream()
+
+        self._worker_script = self.get_current_script()
+        self._worker_start = perf_counter()
+        self._streamed = {}
+        cq_script_path = self.get_current_script_path()
+
+        self._worker.submit(
+            dict(
+                script=self._worker_script,
+                path=str(cq_script_path) if cq_script_path else None,
+                reload_cq=self.preferences["Reload CQ"],
+                add_to_path=self.preferences["Add script dir to path"],
+                change_dir=self.preferences["Change working dir to script dir"],
+                reload_modules=self.preferences["Reload imported modules"],
+                cache_imports=self.preferences["Cache STEP imports"],
+                stream=self.preferences["Stream shown objects"],
+            )
+        )
+
+    @pyqtSlot()
+    def cancel_render(self):
+
+        if self._worker.busy:
+            self._worker.cancel()
+            self._abort_stream()
+            self._logger.info("Render cancelled")
+
+    def shutdown(self):
+        """
+        Stop the render worker process, e.g. when the window is closed.
+        """
+
+        self._worker.shutdown()
+
+    def _abort_stream(self):
+        """
+        End the stream of objects of a render that failed or was cancelled.
+        """
+
+        self._streamed = {}
+        self.sigStreamAborted.emit()
+
+    @pyqtSlot(dict)
+    def _handle_worker_objects(self, data):
+
+        cq_objects = deserialize_objects(data)
+        self._streamed.update(cq_objects)
+
+        self.sigObjectsStreamed.emit(cq_objects)
+
+    @pyqtSlot(object)
+    def _handle_worker_result(self, result):
+
+        status, payload = result
+
+        if status == "ok":
+            # objects not streamed during the render come with the result
+            cq_objects = {**self._streamed, **deserialize_objects(payload)}
+            self._streamed = {}
+
+            self.sigRendered.emit(cq_objects)
+            self.sigTraceback.emit(None, self._worker_script)
+            self.sigLocals.emit({k: v.shape for k, v in cq_objects.items()})
+
+            # the memory of the worker process is not tracked
+            self._record_render(
+                self._worker_script,
+                cq_objects,
+                perf_counter() - self._worker_start,
+                None,
+            )
+        else:
+            self._abort_stream()
+            self.sigTraceback.emit(deserialize_exception(payload), self._worker_script)
 
     @property
     def breakpoints(self):
-        return [el[0] for el in self.get_breakpoints()]
+        return sorted(self._breakpoint_set())
+
+    def _breakpoint_set(self):
+        """
+        Line numbers of the breakpoints; entries are either plain line numbers
+        or (line, condition) tuples.
+        """
+
+        return {
+            bp[0] if isinstance(bp, (tuple, list)) else bp
+            for bp in self.get_breakpoints()
+        }
+
+    def _load_breakpoints(self):
+
+        self._breakpoints = self._breakpoint_set()
+        self._conditions = {
+            bp[0]: bp[1]
+            for bp in self.get_breakpoints()
+            if isinstance(bp, (tuple, list)) and len(bp) > 1 and bp[1]
+        }
+
+    def _break_at(self, frame, lineno):
+        """
+        True if a breakpoint is set on the line and its condition, if any,
+        holds in the frame. Like pdb, conditions raising an error break.
+        """
+
+        if lineno not in self._breakpoints:
+            return False
+
+        condition = self._conditions.get(lineno)
+        if condition is None:
+            return True
+
+        try:
+            return bool(eval(condition, frame.f_globals, frame.f_locals))
+        except Exception:
+            return True
 
     @pyqtSlot(bool)
     def debug(self, value):
@@ -352,9 +735,17 @@ class Debugger(QObject, ComponentMixin):
             # clear possible traceback
             self.sigTraceback.emit(None, self.script)
 
+            self._load_breakpoints()
+
             try:
-                sys.settrace(self.trace_callback)
-                exec(code, module.__dict__, module.__dict__)
+                if (
+                    MONITORING
+                    and sys.monitoring.get_tool(sys.monitoring.DEBUGGER_ID) is None
+                ):
+                    self._exec_monitored(code, module.__dict__)
+                else:
+                    sys.settrace(self.trace_callback)
+                    exec(code, module.__dict__, module.__dict__)
             except BdbQuit:
                 pass
             except Exception:
@@ -397,25 +788,34 @@ class Debugger(QObject, ComponentMixin):
         else:
             return None
 
+    def _pause(self, frame, lineno):
+
+        self.sigLineChanged.emit(lineno)
+        self.sigFrameChanged.emit(frame)
+        self.sigLocalsChanged.emit(frame.f_locals)
+        self.sigCQChanged.emit(find_cq_objects(frame.f_locals), True)
+
+        self.inner_event_loop.exec_()
+
+        # breakpoints might have been edited while paused
+        self._load_breakpoints()
+
     def trace_local(self, frame, event, arg):
 
         lineno = frame.f_lineno
 
         if event in (DbgEevent.LINE,):
+            hit = self._break_at(frame, lineno)
+
             if (
                 self.state in (DbgState.STEP, DbgState.STEP_IN)
                 and frame is self._frames[-1]
-            ) or (lineno in self.get_breakpoints()):
+            ) or hit:
 
-                if lineno in self.get_breakpoints():
+                if hit:
                     self._frames.append(frame)
 
-                self.sigLineChanged.emit(lineno)
-                self.sigFrameChanged.emit(frame)
-                self.sigLocalsChanged.emit(frame.f_locals)
-                self.sigCQChanged.emit(find_cq_objects(frame.f_locals), True)
-
-                self.inner_event_loop.exec_()
+                self._pause(frame, lineno)
 
         elif event in (DbgEevent.RETURN):
             self.sigLocalsChanged.emit(frame.f_locals)
@@ -432,15 +832,129 @@ class Debugger(QObject, ComponentMixin):
         if self._stop_debugging:
             raise BdbQuit  # stop debugging if requested
 
+    def _exec_monitored(self, code, namespace):
+        """
+        Execute the code using PEP 669 monitoring. Only the code objects of
+        the script are instrumented and LINE events are enabled only where
+        they are needed: code objects with breakpoints and, while stepping,
+        the code object of the current frame.
+        """
+
+        mon = sys.monitoring
+        tool = mon.DEBUGGER_ID
+
+        mon.use_tool_id(tool, "CQ-editor")
+
+        self._codes = _code_objects(code)
+        self._step_frame = None
+
+        try:
+            mon.register_callback(tool, mon.events.LINE, self._monitor_line)
+            mon.register_callback(tool, mon.events.PY_RETURN, self._monitor_return)
+            self._monitor_configure()
+
+            exec(code, namespace, namespace)
+        finally:
+            for c in self._codes:
+                mon.set_local_events(tool, c.code, 0)
+
+            mon.register_callback(tool, mon.events.LINE, None)
+            mon.register_callback(tool, mon.events.PY_RETURN, None)
+            mon.free_tool_id(tool)
+
+            self._codes = []
+            self._step_frame = None
+
+    def _monitor_configure(self):
+
+        mon = sys.monitoring
+        E = mon.events
+
+        step_code = self._step_frame.f_code if self._step_frame else None
+
+        for c in self._codes:
+            events = E.NO_EVENTS
+
+            if self.state == DbgState.STEP_IN:
+                events |= E.LINE
+            elif self.state == DbgState.STEP and (
+                step_code is None or c.code is step_code
+            ):
+                events |= E.LINE | E.PY_RETURN
+
+            if self._breakpoints & c.lines:
+                events |= E.LINE
+
+            mon.set_local_events(mon.DEBUGGER_ID, c.code, events)
+
+        # re-enable the locations disabled by returning DISABLE
+        mon.restart_events()
+
+    def _monitor_line(self, code, lineno):
+
+        frame = sys._getframe(1)
+
+        stop = (
+            self._break_at(frame, lineno)
+            or self.state == DbgState.STEP_IN
+            or (
+                self.state == DbgState.STEP
+                and (self._step_frame is None or frame is self._step_frame)
+            )
+        )
+
+        if not stop:
+            # silence this location until the next pause, the condition of a
+            # breakpoint may hold on a later execution
+            if self.state == DbgState.CONT and lineno not in self._breakpoints:
+                return sys.monitoring.DISABLE
+
+            return None
+
+        if not self._frames:
+            self._frames.append(frame)
+
+        self._pause(frame, lineno)
+
+        if self._stop_debugging:
+            raise BdbQuit  # stop debugging if requested
+
+        self._step_frame = frame
+        self._monitor_configure()
+
+    def _monitor_return(self, code, offset, retval):
+
+        frame = sys._getframe(1)
+
+        if frame is self._step_frame:
+            self.sigLocalsChanged.emit(frame.f_locals)
+
+            # continue stepping in the caller
+            caller = frame.f_back
+            if caller is not None and caller.f_code.co_filename == DUMMY_FILE:
+                self._step_frame = caller
+                self._monitor_configure()
+
+
+class _CodeInfo(object):
+
+    __slots__ = ("code", "lines")
+
+    def __init__(self, code):
+
+        self.code = code
+        self.lines = {line for _, _, line in code.co_lines() if line is not None}
+
+
+def _code_objects(code):
+    """
+    Collect the code object of a module and all nested ones.
+    """
+
+    rv = [_CodeInfo(code)]
 
-@contextmanager
-def module_manager():
-    """unloads any modules loaded while the context manager is active"""
-    loaded_modules = set(sys.modules.keys())
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            rv.extend(_code_objects(const))
 
-    try:
-        yield
-    finally:
-        new_modules = set(sys.modules.keys()) - loaded_modules
-        for module_name in new_modules:
-            del sys.modules[module_name]
+    return rv
@@ -11,7 +11,6 @@ from PyQt5.QtWidgets import (
     QFileDialog,
     QApplication,
     QListWidget,
-    QListWidgetItem,
     QShortcut,
 )
 from PyQt5.QtGui import (
@@ -23,11 +22,10 @@ from path import Path
 
 import sys
 
-import jedi
-
 from pyqtgraph.parametertree import Parameter
 
 from ..mixins import ComponentMixin
+from ..completion import COMPLETER
 from ..utils import get_save_filename, get_open_filename, confirm
 from .pyhighlight import PythonHighlighter
 
@@ -36,17 +34,13 @@ from PyQt5.QtWidgets import QAction, QFileDialog, QMessageBox
 
 import os
 import sys
-import ezdxf
 import math
+from collections import defaultdict
 from PyQt5.QtWidgets import QAction, QFileDialog, QMessageBox, QApplication, QMenu
 from .wire_walker import generate_wire_code
-TOLERANCE = 1e-4  
-ROUND_DIGITS = 4  
-
-def clean(val):
-    if abs(val) < 1e-9:
-        return 0.0
-    return round(val, ROUND_DIGITS)
+from ..dxf_data import write_dxf_data
+from ..dxf_geometry import (TOLERANCE, ROUND_DIGITS, clean, arc_midpoint,
+                            arc_points, flatten_splines)
 
 class WalkerEntity:
     def __init__(self, ent_type, original_entity, start=None, end=None):
@@ -74,166 +68,282 @@ def vec_eq(v1, v2):
     return math.dist(v1, v2) < TOLERANCE
 
 def get_arc_midpoint(center, radius, start_angle, end_angle):
-    if end_angle < start_angle:
-        end_angle += 360
-    mid_angle_deg = (start_angle + end_angle) / 2
-    mid_rad = math.radians(mid_angle_deg)
-    
-    mx = center[0] + radius * math.cos(mid_rad)
-    my = center[1] + radius * math.sin(mid_rad)
-    return (clean(mx), clean(my))
+    return arc_midpoint(center, radius, start_angle, end_angle)
 
 def sample_spline(spline_entity):
-    construction = spline_entity.construction_tool()
-    points = list(construction.flattening(distance=0.1))
-    return [(clean(p[0]), clean(p[1])) for p in points]
+    return flatten_splines([spline_entity])[0]
+
+DXF_TYPES = 'LINE ARC SPLINE LWPOLYLINE CIRCLE ELLIPSE'
+
+def iter_dxf_entities(filepath):
+    """
+    Stream the modelspace entities without loading the whole document. Files
+    that iterdxf cannot handle (e.g. pre R2000) are read with ezdxf.readfile.
+    """
+    # ezdxf is slow to import, load it only when a DXF file is opened
+    import ezdxf
+    from ezdxf.addons import iterdxf
+
+    try:
+        entities = iterdxf.modelspace(filepath, types=DXF_TYPES.split())
+        first = next(entities, None)
+    except Exception:
+        yield from ezdxf.readfile(filepath).modelspace().query(DXF_TYPES)
+        return
+
+    if first is not None:
+        yield first
+        yield from entities
 
 def parse_dxf(filepath):
+    entities = []
+
     try:
-        doc = ezdxf.readfile(filepath)
+        for e in iter_dxf_entities(filepath):
+            _append_walker_entities(e, entities)
+        _evaluate_curves(entities)
     except Exception as e:
         print(f"Error reading DXF: {e}")
         return None
 
-    msp = doc.modelspace()
-    entities = []
+    return entities
+
+def _evaluate_curves(entities):
+    """
+    Evaluate the points of all arcs and splines in batched arrays.
+    """
+    arcs = [ent for ent in entities if ent.type == 'ARC']
+    starts, ends, mids = arc_points(
+        [ent.obj.dxf.center for ent in arcs],
+        [ent.obj.dxf.radius for ent in arcs],
+        [ent.obj.dxf.start_angle for ent in arcs],
+        [ent.obj.dxf.end_angle for ent in arcs],
+    )
+    for ent, start, end, mid in zip(arcs, starts, ends, mids):
+        ent.start, ent.end, ent.mid = start, end, mid
 
+    splines = [ent for ent in entities if ent.type == 'SPLINE']
+    for ent, points in zip(splines, flatten_splines([ent.obj for ent in splines])):
+        ent.points = points
+
+def _append_walker_entities(e, entities):
     
-    for e in msp.query('LINE ARC SPLINE LWPOLYLINE CIRCLE ELLIPSE'):
-        
-        if e.dxftype() == 'LWPOLYLINE':
-            sub_ents = e.virtual_entities()
-        else:
-            sub_ents = [e]
+    if e.dxftype() == 'LWPOLYLINE':
+        sub_ents = e.virtual_entities()
+    else:
+        sub_ents = [e]
 
-        for sub in sub_ents:
-            dtype = sub.dxftype()
-            
-            if dtype == 'LINE':
-                entities.append(WalkerEntity('LINE', sub, sub.dxf.start, sub.dxf.end))
-            
-            elif dtype == 'ARC':
-                c = sub.dxf.center
-                r = sub.dxf.radius
-                s_rad = math.radians(sub.dxf.start_angle)
-                e_rad = math.radians(sub.dxf.end_angle)
-                class Point:
-                    def __init__(self, x, y): self.x, self.y = x, y
-                start_pt = Point(c[0] + r * math.cos(s_rad), c[1] + r * math.sin(s_rad))
-                end_pt = Point(c[0] + r * math.cos(e_rad), c[1] + r * math.sin(e_rad))
-                entities.append(WalkerEntity('ARC', sub, start_pt, end_pt))
-                
-            elif dtype == 'SPLINE':
-                tool = sub.construction_tool()
-                knots = tool.knots()
-                start_pt = tool.point(knots[0])
-                end_pt = tool.point(knots[-1])
-                entities.append(WalkerEntity('SPLINE', sub, start_pt, end_pt))
-            
-            elif dtype == 'CIRCLE':
-                entities.append(WalkerEntity('CIRCLE', sub))
+    for sub in sub_ents:
+        dtype = sub.dxftype()
+        
+        if dtype == 'LINE':
+            entities.append(WalkerEntity('LINE', sub, sub.dxf.start, sub.dxf.end))
+        
+        elif dtype == 'ARC':
+            # the end points are set by _evaluate_curves
+            entities.append(WalkerEntity('ARC', sub))
             
-            elif dtype == 'ELLIPSE':
-                entities.append(WalkerEntity('ELLIPSE', sub))
+        elif dtype == 'SPLINE':
+            tool = sub.construction_tool()
+            knots = tool.knots()
+            start_pt = tool.point(knots[0])
+            end_pt = tool.point(knots[-1])
+            entities.append(WalkerEntity('SPLINE', sub, start_pt, end_pt))
+        
+        elif dtype == 'CIRCLE':
+            entities.append(WalkerEntity('CIRCLE', sub))
+        
+        elif dtype == 'ELLIPSE':
+            entities.append(WalkerEntity('ELLIPSE', sub))
+
+class EndpointIndex:
+    """
+    Uniform grid of the chainable entity endpoints with a cell size of
+    TOLERANCE. Finding the entities touching a point only looks at the 3x3
+    neighbouring cells instead of scanning the whole pool.
+    """
+
+    def __init__(self, entities):
+        self.entities = entities
+        self.alive = [True] * len(entities)
+        self.grid = defaultdict(list)
+
+        for i, ent in enumerate(entities):
+            # closed primitives (circles, ellipses) are never chained
+            if ent.start is None:
+                continue
+            self.grid[self._cell(ent.start)].append(i)
+            self.grid[self._cell(ent.end)].append(i)
+
+    @staticmethod
+    def _cell(pt):
+        return (math.floor(pt[0] / TOLERANCE), math.floor(pt[1] / TOLERANCE))
+
+    def remove(self, i):
+        self.alive[i] = False
+
+    def find(self, pt):
+        """
+        Return (index, reverse) of the first remaining entity (in pool order)
+        that starts or ends at pt, or None.
+        """
+        cx, cy = self._cell(pt)
+        best = None
 
-    return entities
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                cell = self.grid.get((cx + dx, cy + dy))
+                if not cell:
+                    continue
+
+                # drop the consumed entities
+                cell[:] = [i for i in cell if self.alive[i]]
+
+                for i in cell:
+                    if best is not None and i >= best:
+                        continue
+                    ent = self.entities[i]
+                    if vec_eq(ent.start, pt) or vec_eq(ent.end, pt):
+                        best = i
+
+        if best is None:
+            return None
+
+        return best, not vec_eq(self.entities[best].start, pt)
+
+def segment_code(ent, reverse=False):
+    end = ent.start if reverse else ent.end
+
+    if ent.type == 'LINE':
+        return f".lineTo({end[0]}, {end[1]})"
+    elif ent.type == 'ARC':
+        mid = ent.mid
+        return f".threePointArc({mid}, {end})"
+    elif ent.type == 'SPLINE':
+        pts = list(ent.points)
+        if reverse:
+            pts.reverse()
+        pts_str = ", ".join([str(p) for p in pts[0:]])
+        return f".spline([{pts_str}])"
+
+    return ""
+
+def segment_data(ent, reverse=False):
+    end = ent.start if reverse else ent.end
+
+    if ent.type == 'LINE':
+        return ["L", *end]
+    elif ent.type == 'ARC':
+        mid = ent.mid
+        return ["A", *mid, *end]
+    elif ent.type == 'SPLINE':
+        pts = list(ent.points)
+        if reverse:
+            pts.reverse()
+        return ["S", [c for p in pts for c in p]]
+
+    return None
+
+def ellipse_size(ent):
+    major = ent.obj.dxf.major_axis 
+    ratio = ent.obj.dxf.ratio
+    
+    major_len = math.hypot(major[0], major[1])
+    minor_len = major_len * ratio
+    
+    width = major_len
+    height = minor_len
+
+    if abs(major[0]) < abs(major[1]):
+        width, height = height, width
+
+    return clean(width), clean(height)
+
+def walk_chains(pool):
+    """
+    Group the entities into chains. Yields (ent, None) for circles and
+    ellipses and (first, [(ent, reverse), ...]) for chains.
+    """
+    index = EndpointIndex(pool)
+
+    for i, current_ent in enumerate(pool):
+        if not index.alive[i]:
+            continue
+        index.remove(i)
+
+        if current_ent.type in ('CIRCLE', 'ELLIPSE'):
+            yield current_ent, None
+            continue
+
+        segments = [(current_ent, False)]
+        current_pos = current_ent.end
+
+        # Walk the chain
+        found = index.find(current_pos)
+        while found is not None:
+            j, reverse = found
+            ent = pool[j]
+            index.remove(j)
+
+            segments.append((ent, reverse))
+            current_pos = ent.start if reverse else ent.end
+
+            found = index.find(current_pos)
+
+        yield current_ent, segments
 
 def generate_cq_code(filepath):
     pool = parse_dxf(filepath)
     if not pool: 
         return "print('Error: No valid geometry found in DXF')"
 
-    chain = "cq.Workplane('XY')"
-    
-    while pool:
-        current_ent = pool.pop(0)
-        
-        if current_ent.type == 'CIRCLE':
-            c = current_ent.obj.dxf.center
-            r = current_ent.obj.dxf.radius
-            chain += f".moveTo({clean(c[0])}, {clean(c[1])}).circle({clean(r)})"
-            continue 
-
-        elif current_ent.type == 'ELLIPSE':
-            c = current_ent.obj.dxf.center
-            major = current_ent.obj.dxf.major_axis 
-            ratio = current_ent.obj.dxf.ratio
-            
-            major_len = math.hypot(major[0], major[1])
-            minor_len = major_len * ratio
-            
-            width = major_len
-            height = minor_len
-            
+    chain = ["cq.Workplane('XY')"]
 
-            if abs(major[0]) < abs(major[1]):
-                width, height = height, width
+    for ent, segments in walk_chains(pool):
+        if ent.type == 'CIRCLE':
+            c = ent.obj.dxf.center
+            r = ent.obj.dxf.radius
+            chain.append(f".moveTo({clean(c[0])}, {clean(c[1])}).circle({clean(r)})")
 
-            chain += f".moveTo({clean(c[0])}, {clean(c[1])}).ellipse({clean(width)}, {clean(height)})"
-            continue 
+        elif ent.type == 'ELLIPSE':
+            c = ent.obj.dxf.center
+            width, height = ellipse_size(ent)
+            chain.append(f".moveTo({clean(c[0])}, {clean(c[1])}).ellipse({width}, {height})")
 
+        else:
+            chain.append(f".moveTo({ent.start[0]}, {ent.start[1]})")
+            chain.extend(segment_code(e, reverse) for e, reverse in segments)
+            chain.append(".close()")
 
-        chain += f".moveTo({current_ent.start[0]}, {current_ent.start[1]})"
-        current_pos = current_ent.end
-        
-        # Process first entity
-        if current_ent.type == 'LINE':
-            chain += f".lineTo({current_ent.end[0]}, {current_ent.end[1]})"
-        elif current_ent.type == 'ARC':
-            mid = get_arc_midpoint(current_ent.obj.dxf.center, current_ent.obj.dxf.radius, current_ent.obj.dxf.start_angle, current_ent.obj.dxf.end_angle)
-            chain += f".threePointArc({mid}, {current_ent.end})"
-        elif current_ent.type == 'SPLINE':
-            pts = sample_spline(current_ent.obj)
-            pts_str = ", ".join([str(p) for p in pts[0:]])
-            chain += f".spline([{pts_str}])"
+    return "".join(chain)
 
-        # Walk the chain
-        found_next = True
-        while found_next:
-            found_next = False
-            for i, ent in enumerate(pool):
-                # Skip closed primitives if they somehow got into the neighbor search
-                if ent.type in ['CIRCLE', 'ELLIPSE']: 
-                    continue
+def _dxf_items(pool):
+    for ent, segments in walk_chains(pool):
+        if ent.type == 'CIRCLE':
+            c = ent.obj.dxf.center
+            yield ["C", clean(c[0]), clean(c[1]), clean(ent.obj.dxf.radius)]
 
-                # CHECK FORWARD
-                if vec_eq(ent.start, current_pos):
-                    if ent.type == 'LINE':
-                        chain += f".lineTo({ent.end[0]}, {ent.end[1]})"
-                    elif ent.type == 'ARC':
-                        mid = get_arc_midpoint(ent.obj.dxf.center, ent.obj.dxf.radius, ent.obj.dxf.start_angle, ent.obj.dxf.end_angle)
-                        chain += f".threePointArc({mid}, {ent.end})"
-                    elif ent.type == 'SPLINE':
-                        pts = sample_spline(ent.obj)
-                        pts_str = ", ".join([str(p) for p in pts[0:]])
-                        chain += f".spline([{pts_str}])"
-                    
-                    current_pos = ent.end
-                    pool.pop(i)
-                    found_next = True
-                    break
-                
-                # CHECK REVERSE
-                elif vec_eq(ent.end, current_pos):
-                    if ent.type == 'LINE':
-                        chain += f".lineTo({ent.start[0]}, {ent.start[1]})"
-                    elif ent.type == 'ARC':
-                        mid = get_arc_midpoint(ent.obj.dxf.center, ent.obj.dxf.radius, ent.obj.dxf.start_angle, ent.obj.dxf.end_angle)
-                        chain += f".threePointArc({mid}, {ent.start})"
-                    elif ent.type == 'SPLINE':
-                        pts = sample_spline(ent.obj)
-                        pts.reverse()
-                        pts_str = ", ".join([str(p) for p in pts[0:]])
-                        chain += f".spline([{pts_str}])"
-                    
-                    current_pos = ent.start
-                    pool.pop(i)
-                    found_next = True
-                    break
-            
-        chain += ".close()"
+        elif ent.type == 'ELLIPSE':
+            c = ent.obj.dxf.center
+            yield ["E", clean(c[0]), clean(c[1]), *ellipse_size(ent)]
+
+        else:
+            data = [segment_data(e, reverse) for e, reverse in segments]
+            yield ["P", *ent.start, [d for d in data if d is not None]]
+
+def generate_dxf_data(filepath, out_path=None):
+    """
+    Write the chained DXF geometry into a data file next to the DXF and
+    return the one-line loader call.
+    """
+    pool = parse_dxf(filepath)
+    if not pool: 
+        return "print('Error: No valid geometry found in DXF')"
+
+    out_path = out_path or filepath + ".json"
+    write_dxf_data(_dxf_items(pool), out_path)
 
-    return chain
+    return f"load_dxf(r\"{out_path}\")"
 
 class EditorDebugger:
     def __init__(self):
@@ -276,11 +386,16 @@ class Editor(CodeEditor, ComponentMixin):
                 "value": "Light",
             },
             {"name": "Maximum line length", "type": "int", "value": 79},
+            {"name": "Path import deflection", "type": "float", "value": 0.1},
         ],
     )
 
     EXTENSIONS = "py"
 
+    # delay [ms] coalescing repeated completion requests
+    COMPLETION_DELAY = 50
+    COMPLETION_POLL_INTERVAL = 20  # ms
+
     # Tracks whether or not the document was saved from the internal editor vs an external editor
     was_modified_by_self = False
 
@@ -343,6 +458,12 @@ class Editor(CodeEditor, ComponentMixin):
                     shortcut="Ctrl+Shift+I",
                     triggered=self.insert_dxf_logic # We will define this next
                 ),
+                QAction(
+                    icon("arrow-continue"),
+                    "Insert DXF Face as Data File...",
+                    self,
+                    triggered=self.insert_dxf_data_logic
+                ),
                 QAction(
                     icon("arrow-continue"),
                     "Insert Path from File (STEP)...",
@@ -385,6 +506,22 @@ class Editor(CodeEditor, ComponentMixin):
 
         self.highlighter = PythonHighlighter(self.document())
 
+        # completions are computed in a separate process
+        self._completion_id = None
+        self._completion_request = None
+
+        self._completion_timer = QTimer(self)
+        self._completion_timer.setInterval(self.COMPLETION_DELAY)
+        self._completion_timer.setSingleShot(True)
+        self._completion_timer.timeout.connect(self._submit_completion_request)
+
+        self._completion_poll_timer = QTimer(self)
+        self._completion_poll_timer.setInterval(self.COMPLETION_POLL_INTERVAL)
+        self._completion_poll_timer.timeout.connect(self._poll_completions)
+
+        # start inferring cadquery before the first request
+        COMPLETER.start()
+
     def insert_dxf_logic(self):
         filename, _ = QFileDialog.getOpenFileName(
             self, "Select DXF", "", "DXF Files (*.dxf)"
@@ -401,6 +538,21 @@ class Editor(CodeEditor, ComponentMixin):
             except Exception as e:
                 QMessageBox.critical(self, "DXF Import Error", str(e))
 
+    def insert_dxf_data_logic(self):
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Select DXF", "", "DXF Files (*.dxf)"
+        )
+        if filename:
+            try:
+                # the geometry goes into a sidecar file, the editor only gets the loader call
+                code = generate_dxf_data(filename)
+
+                self.textCursor().insertText(code)
+                self.statusChanged.emit(f"Imported: {filename}")
+
+            except Exception as e:
+                QMessageBox.critical(self, "DXF Import Error", str(e))
+
     def insert_path_logic(self):
         filename, _ = QFileDialog.getOpenFileName(
             self, 
@@ -410,7 +562,9 @@ class Editor(CodeEditor, ComponentMixin):
         )
         if filename:
             try:
-                code = generate_wire_code(filename)
+                code = generate_wire_code(
+                    filename, deflection=self.preferences["Path import deflection"]
+                )
                 self.textCursor().insertText(code)
             except Exception as e:
                 QMessageBox.critical(self, "Import Error", str(e))
@@ -585,77 +739,63 @@ class Editor(CodeEditor, ComponentMixin):
 
     def _trigger_autocomplete(self):
         """
-        Allows the user to ask for autocomplete suggestions.
+        Allows the user to ask for autocomplete suggestions. The completions
+        are computed in the background and shown by _show_completions.
         """
 
         # Clear the status bar
         self.statusChanged.emit("")
 
-        # Track whether or not there are any completions to show
-        completions_present = False
-
-        script = jedi.Script(self.toPlainText(), path=self.filename)
-
-        # Clear the completion list
-        self.completion_list.clear()
-
         # Check to see if the character before the cursor is an open parenthesis
         cursor_pos = self.textCursor().position()
         text_before_cursor = self.toPlainText()[:cursor_pos]
         text_after_cursor = self.toPlainText()[cursor_pos:]
-        if text_before_cursor.endswith("("):
-            # If there is a trailing close parentheis after the cursor, remove it
-            if text_after_cursor.startswith(")"):
-                self.textCursor().deleteChar()
-
-                # Update the script with the modified text
-                script = jedi.Script(self.toPlainText(), path=self.filename)
-
-            # Check if there are any function signatures
-            signatures = script.get_signatures()
-            if signatures:
-                # Let the rest of the code know that there was a completion
-                completions_present = True
-
-                # Load the signatures into the completion list
-                for signature in signatures:
-                    # Build a human-readable signature
-                    i = 0
-                    cur_signature = f"{signature.name}("
-                    for param in signature.params:
-                        # Prevent trailing comma in parameter list
-                        param_ending = ","
-                        if i == len(signature.params) - 1:
-                            param_ending = ""
-
-                        # If the parameter is optional, do not overload the user with it
-                        if "Optional" in param.description:
-                            i += 1
-                            continue
-
-                        if "=" in param.description:
-                            cur_signature += f"{param.name}={param.description.split('=')[1].strip()}{param_ending}"
-                        else:
-                            cur_signature += f"{param.name}{param_ending}"
-                        i += 1
-                    cur_signature += ")"
-
-                    # Add the current signature to the list
-                    item = QListWidgetItem(cur_signature)
-                    self.completion_list.addItem(item)
-        else:
-            completions = script.complete()
-            if completions:
-                # Let the rest of the code know that there was a completion
-                completions_present = True
+        signatures = text_before_cursor.endswith("(")
+
+        # If there is a trailing close parentheis after the cursor, remove it
+        if signatures and text_after_cursor.startswith(")"):
+            self.textCursor().deleteChar()
+
+        cursor = self.textCursor()
+
+        self._completion_request = (
+            self.toPlainText(),
+            self.filename,
+            cursor.blockNumber() + 1,
+            cursor.positionInBlock(),
+            signatures,
+        )
 
-                # Add completions to the list
-                for completion in completions:
-                    item = QListWidgetItem(completion.name)
-                    self.completion_list.addItem(item)
+        # quickly repeated requests are sent only once
+        self._completion_timer.start()
+
+    def _submit_completion_request(self):
+
+        self._completion_id = COMPLETER.submit(
+            *self._completion_request, self._show_completions
+        )
+        self._completion_poll_timer.start()
+
+    def _poll_completions(self):
+
+        if not COMPLETER.poll():
+            self._completion_poll_timer.stop()
+
+    def _show_completions(self, request_id, completions):
+
+        # drop the answers to stale requests
+        if (
+            request_id != self._completion_id
+            or self._completion_request[0] != self.toPlainText()
+        ):
+            return
+
+        # Clear the completion list
+        self.completion_list.clear()
+        self.completion_list.addItems(completions)
 
         # Only show the completions list if there were any
-        if completions_present:
+        if completions:
             # Position the list near the cursor
             cursor_rect = self.cursorRect()
             global_pos = self.mapToGlobal(cursor_rect.bottomLeft())
@@ -1,3 +1,6 @@
+import multiprocessing
+from collections import defaultdict
+
 from PyQt5.QtWidgets import (
     QTreeWidget,
     QTreeWidgetItem,
@@ -5,12 +8,17 @@ from PyQt5.QtWidgets import (
     QMenu,
     QWidget,
     QAbstractItemView,
+    QProgressDialog,
 )
-from PyQt5.QtCore import Qt, pyqtSlot, pyqtSignal
+from PyQt5.QtCore import Qt, QObject, QTimer, QSignalBlocker, pyqtSlot, pyqtSignal
+
+from path import Path
 
 from pyqtgraph.parametertree import Parameter, ParameterTree
 
-from OCP.AIS import AIS_Line
+import cadquery as cq
+
+from OCP.AIS import AIS_Line, AIS_InteractiveObject, AIS_Shape
 from OCP.Geom import Geom_Line
 from OCP.gp import gp_Dir, gp_Pnt, gp_Ax1
 
@@ -18,12 +26,19 @@ from ..mixins import ComponentMixin
 from ..icons import icon
 from ..cq_utils import (
     make_AIS,
-    export,
+    face_count,
+    to_compound,
+    geometry_hash,
+    object_state,
     to_occ_color,
     is_obj_empty,
     get_occ_color,
     set_color,
+    safe_name,
+    unique_names,
 )
+from ..render_worker import serialize_shape, export_job
+from ..profiler import span
 from .viewer import DEFAULT_FACE_COLOR
 from ..utils import splitter, layout, get_save_filename
 
@@ -53,6 +68,9 @@ class ObjectTreeItem(QTreeWidgetItem):
         sig=None,
         alpha=0.0,
         color="#f4a824",
+        options=None,
+        fingerprint=None,
+        state=None,
         **kwargs,
     ):
 
@@ -64,6 +82,9 @@ class ObjectTreeItem(QTreeWidgetItem):
         self.shape = shape
         self.shape_display = shape_display
         self.sig = sig
+        self.options = options or {}
+        self.fingerprint = fingerprint
+        self.state = state
 
         self.properties = Parameter.create(name="Properties", children=self.props)
 
@@ -101,6 +122,61 @@ class ObjectTreeItem(QTreeWidgetItem):
             self.sig.emit()
 
 
+class SelectionIndex(object):
+    """
+    Lookup of tree items by their displayed shape. TopoDS_Shape hashes are
+    consistent with IsEqual but the wrappers compare by identity, so the
+    shapes of a hash bucket are compared with IsEqual.
+    """
+
+    def __init__(self):
+
+        self._buckets = defaultdict(list)
+        self._items = {}
+
+    def __len__(self):
+
+        return len(self._items)
+
+    def add(self, item):
+
+        self.discard(item)
+
+        if not isinstance(item.ais, AIS_Shape):
+            return
+
+        shape = item.ais.Shape()
+        self._items[id(item)] = (shape, item)
+        self._buckets[hash(shape)].append((shape, item))
+
+    def discard(self, item):
+
+        shape, _ = self._items.pop(id(item), (None, None))
+        if shape is None:
+            return
+
+        key = hash(shape)
+        bucket = [entry for entry in self._buckets[key] if entry[1] is not item]
+
+        if bucket:
+            self._buckets[key] = bucket
+        else:
+            del self._buckets[key]
+
+    def clear(self):
+
+        self._buckets.clear()
+        self._items.clear()
+
+    def get(self, shape):
+
+        for indexed, item in self._buckets.get(hash(shape), ()):
+            if indexed.IsEqual(shape):
+                return item
+
+        return None
+
+
 class CQRootItem(TopTreeItem):
 
     def __init__(self, *args, **kwargs):
@@ -115,22 +191,101 @@ class HelpersRootItem(TopTreeItem):
         super(HelpersRootItem, self).__init__(["Helpers"], *args, **kwargs)
 
 
+class ExportWorker(QObject):
+    """
+    Runs export jobs in a pool of worker processes so that the GUI stays
+    responsive. The pool is terminated on cancel.
+    """
+
+    POLL_INTERVAL = 50  # ms
+
+    sigProgress = pyqtSignal(int, int)
+    sigFinished = pyqtSignal(list)
+    sigError = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+
+        super(ExportWorker, self).__init__(parent)
+
+        self._pool = None
+        self._results = []
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.POLL_INTERVAL)
+        self._timer.timeout.connect(self._poll)
+
+    @property
+    def busy(self):
+
+        return self._pool is not None
+
+    def start(self, jobs):
+
+        self.cancel()
+
+        ctx = multiprocessing.get_context("spawn")
+        self._pool = ctx.Pool(min(len(jobs), multiprocessing.cpu_count()))
+        self._results = [self._pool.apply_async(export_job, job) for job in jobs]
+        self._timer.start()
+
+    @pyqtSlot()
+    def cancel(self):
+
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._stop()
+
+    def _stop(self):
+
+        self._timer.stop()
+        self._pool = None
+        self._results = []
+
+    def _poll(self):
+
+        done = sum(r.ready() for r in self._results)
+        self.sigProgress.emit(done, len(self._results))
+
+        if done < len(self._results):
+            return
+
+        fnames = []
+        for r in self._results:
+            try:
+                fnames.append(r.get())
+            except Exception as e:
+                self.sigError.emit(str(e))
+
+        self._pool.close()
+        self._stop()
+        self.sigFinished.emit(fnames)
+
+
 class ObjectTree(QWidget, ComponentMixin):
 
     name = "Object Tree"
     _stash = []
 
+    # objects of a render in progress are being streamed
+    _streaming = False
+    _stream_fit = False
+
     preferences = Parameter.create(
         name="Preferences",
         children=[
             {"name": "Preserve properties on reload", "type": "bool", "value": False},
             {"name": "Clear all before each run", "type": "bool", "value": True},
+            {"name": "Redisplay changed objects only", "type": "bool", "value": False},
             {"name": "STL precision", "type": "float", "value": 0.1},
+            {"name": "One file per object", "type": "bool", "value": False},
+            {"name": "Lazy display threshold (faces)", "type": "int", "value": 1000},
         ],
     )
 
     sigObjectsAdded = pyqtSignal([list], [list, bool])
     sigObjectsRemoved = pyqtSignal(list)
+    sigExportFinished = pyqtSignal(list)
     sigCQObjectSelected = pyqtSignal(object)
     sigAISObjectsSelected = pyqtSignal(list)
     sigItemChanged = pyqtSignal(QTreeWidgetItem, int)
@@ -151,13 +306,16 @@ class ObjectTree(QWidget, ComponentMixin):
         tree.setContextMenuPolicy(Qt.ActionsContextMenu)
 
         # forward itemChanged singal
-        tree.itemChanged.connect(lambda item, col: self.sigItemChanged.emit(item, col))
+        tree.itemChanged.connect(self._forward_item_changed)
         # handle visibility changes form tree
         tree.itemChanged.connect(self.handleChecked)
 
         self.CQ = CQRootItem()
         self.Helpers = HelpersRootItem()
 
+        # displayed shape -> item of the CQ models
+        self._index = SelectionIndex()
+
         root = tree.invisibleRootItem()
         root.addChild(self.CQ)
         root.addChild(self.Helpers)
@@ -175,6 +333,18 @@ class ObjectTree(QWidget, ComponentMixin):
             "Export as STEP", self, enabled=False, triggered=lambda: self.export("step")
         )
 
+        self._exporter = ExportWorker(self)
+        self._export_progress = QProgressDialog(
+            "Exporting...", "Cancel", 0, 0, self, minimumDuration=500
+        )
+        self._export_progress.setWindowTitle("Export")
+        self._export_progress.reset()
+
+        self._exporter.sigProgress.connect(self._update_export_progress)
+        self._exporter.sigFinished.connect(self._handle_export_finished)
+        self._exporter.sigError.connect(self._logger.error)
+        self._export_progress.canceled.connect(self._exporter.cancel)
+
         self._clear_current_action = QAction(
             icon("delete"),
             "Clear current",
@@ -277,38 +447,219 @@ class ObjectTree(QWidget, ComponentMixin):
         if preserve_props:
             current_props = self._current_properties()
 
-        if clean or self.preferences["Clear all before each run"]:
-            self.removeObjects()
-
-        ais_list = []
-
         # remove empty objects
         objects_f = {k: v for k, v in objects.items() if not is_obj_empty(v.shape)}
 
-        for name, obj in objects_f.items():
-            ais, shape_display = make_AIS(obj.shape, obj.options)
-
-            child = ObjectTreeItem(
-                name,
-                shape=obj.shape,
-                shape_display=shape_display,
-                ais=ais,
-                sig=self.sigObjectPropertiesChanged,
+        if root is self.CQ and self._streaming:
+            # keep the streamed items, drop the ones of the previous run
+            ais_list = self._reconcile(
+                objects_f,
+                preserve_props,
+                partial=not self.preferences["Clear all before each run"],
             )
+            request_fit_view = self._stream_fit
+            self._end_stream()
+        elif root is self.CQ and (
+            clean
+            or (
+                self.preferences["Clear all before each run"]
+                and self.preferences["Redisplay changed objects only"]
+            )
+        ):
+            # clean is used while stepping in the debugger
+            ais_list = self._reconcile(objects_f, preserve_props, defer_heavy=clean)
+        else:
+            if clean or self.preferences["Clear all before each run"]:
+                self.removeObjects()
+
+            ais_list = []
+
+            for name, obj in objects_f.items():
+                child = self._make_item(name, obj)
 
-            if preserve_props and name in current_props:
-                self._restore_properties(child, current_props)
+                if preserve_props and name in current_props:
+                    self._restore_properties(child, current_props)
 
-            if child.properties["Visible"]:
-                ais_list.append(ais)
+                if child.properties["Visible"]:
+                    ais_list.append(child.ais)
 
-            root.addChild(child)
+                root.addChild(child)
+
+                if root is self.CQ:
+                    self._index.add(child)
 
         if request_fit_view:
             self.sigObjectsAdded[list, bool].emit(ais_list, True)
         else:
             self.sigObjectsAdded[list].emit(ais_list)
 
+    def _make_item(self, name, obj, fingerprint=None, defer=False):
+
+        if defer:
+            # the AIS object is created once the item is checked
+            item = ObjectTreeItem(
+                name,
+                shape=obj.shape,
+                options=obj.options,
+                sig=self.sigObjectPropertiesChanged,
+                fingerprint=fingerprint,
+            )
+            item.properties["Visible"] = False
+
+            return item
+
+        with span("make_AIS", name):
+            ais, shape_display = make_AIS(obj.shape, obj.options)
+
+        return ObjectTreeItem(
+            name,
+            shape=obj.shape,
+            shape_display=shape_display,
+            ais=ais,
+            options=obj.options,
+            sig=self.sigObjectPropertiesChanged,
+            fingerprint=fingerprint,
+        )
+
+    def _realize(self, item):
+
+        with span("make_AIS", item.properties["Name"]):
+            item.ais, item.shape_display = make_AIS(item.shape, item.options)
+
+        self._index.add(item)
+
+    def _is_heavy(self, obj):
+
+        threshold = self.preferences["Lazy display threshold (faces)"]
+
+        if threshold <= 0 or isinstance(
+            obj.shape, (cq.Assembly, AIS_InteractiveObject)
+        ):
+            return False
+
+        return face_count(to_compound(obj.shape).wrapped) > threshold
+
+    @pyqtSlot(dict)
+    def streamObjects(self, objects):
+        """
+        Add the objects shown so far by a render in progress. Items of the
+        previous run are replaced by name and removed once the render is done.
+        """
+
+        if not self._streaming:
+            self._streaming = True
+            self._stream_fit = self.CQ.childCount() == 0
+
+        objects_f = {k: v for k, v in objects.items() if not is_obj_empty(v.shape)}
+
+        ais_list = self._reconcile(
+            objects_f,
+            self.preferences["Preserve properties on reload"],
+            partial=True,
+        )
+
+        self.sigObjectsAdded[list, bool].emit(ais_list, self._stream_fit)
+
+    @pyqtSlot()
+    def abortStream(self):
+        """
+        End the stream of a render that failed or was cancelled. Like after a
+        failed render in the GUI process, the items of the previous run are
+        kept next to the objects streamed so far.
+        """
+
+        self._end_stream()
+
+    def _end_stream(self):
+
+        self._streaming = self._stream_fit = False
+
+    def _reconcile(self, objects, preserve_props, defer_heavy=False, partial=False):
+        """
+        Match new objects to the existing items by name and geometry hash.
+        Unchanged items (and their AIS objects) are kept, only added or
+        changed objects are rebuilt. Items not matched are removed, unless
+        partial is set. Returns the AIS objects to display.
+        """
+
+        current = {}
+        stale = []
+
+        for child in self.CQ.takeChildren():
+            name = child.properties["Name"]
+            if name in current:
+                stale.append(current[name])
+            current[name] = child
+
+        items = []
+        ais_list = []
+
+        for name, obj in objects.items():
+            item = current.pop(name, None)
+
+            # the same object needs no hashing unless it was changed in place,
+            # e.g. by Shape.move
+            state = object_state(obj.shape)
+
+            if (
+                item is not None
+                and item.shape is obj.shape
+                and state is not None
+                and item.state == state
+                and item.options == obj.options
+            ):
+                items.append(item)
+                continue
+
+            fingerprint = geometry_hash(obj.shape, obj.options)
+
+            if (
+                item is not None
+                and fingerprint is not None
+                and item.fingerprint == fingerprint
+            ):
+                item.shape = obj.shape
+                item.state = state
+            else:
+                defer = (
+                    defer_heavy
+                    and (item is None or not item.properties["Visible"])
+                    and self._is_heavy(obj)
+                )
+                new_item = self._make_item(name, obj, fingerprint, defer)
+                new_item.state = state
+
+                if item is not None:
+                    if preserve_props:
+                        self._restore_properties(new_item, {name: item.properties})
+                    stale.append(item)
+
+                item = new_item
+
+                if item.properties["Visible"]:
+                    ais_list.append(item.ais)
+
+            items.append(item)
+
+        if partial:
+            items = list(current.values()) + items
+            current = {}
+
+        self.CQ.addChildren(items)
+
+        stale.extend(current.values())
+
+        for item in stale:
+            self._index.discard(item)
+        for item in items:
+            self._index.add(item)
+        if stale:
+            self.sigObjectsRemoved.emit(
+                [item.ais for item in stale if item.ais is not None]
+            )
+
+        return ais_list
+
     @pyqtSlot(object, str, object)
     def addObject(self, obj, name="", options=None):
 
@@ -319,15 +670,15 @@ class ObjectTree(QWidget, ComponentMixin):
 
         ais, shape_display = make_AIS(obj, options)
 
-        root.addChild(
-            ObjectTreeItem(
-                name,
-                shape=obj,
-                shape_display=shape_display,
-                ais=ais,
-                sig=self.sigObjectPropertiesChanged,
-            )
+        item = ObjectTreeItem(
+            name,
+            shape=obj,
+            shape_display=shape_display,
+            ais=ais,
+            sig=self.sigObjectPropertiesChanged,
         )
+        root.addChild(item)
+        self._index.add(item)
 
         self.sigObjectsAdded.emit([ais])
 
@@ -336,9 +687,14 @@ class ObjectTree(QWidget, ComponentMixin):
     def removeObjects(self, objects=None):
 
         if objects:
-            removed_items_ais = [self.CQ.takeChild(i).ais for i in objects]
+            removed = [self.CQ.takeChild(i) for i in objects]
         else:
-            removed_items_ais = [ch.ais for ch in self.CQ.takeChildren()]
+            removed = self.CQ.takeChildren()
+
+        for item in removed:
+            self._index.discard(item)
+
+        removed_items_ais = [ch.ais for ch in removed if ch.ais is not None]
 
         self.sigObjectsRemoved.emit(removed_items_ais)
 
@@ -347,12 +703,15 @@ class ObjectTree(QWidget, ComponentMixin):
 
         if action:
             self._stash = self.CQ.takeChildren()
-            removed_items_ais = [ch.ais for ch in self._stash]
+            self._index.clear()
+            removed_items_ais = [ch.ais for ch in self._stash if ch.ais is not None]
             self.sigObjectsRemoved.emit(removed_items_ais)
         else:
             self.removeObjects()
             self.CQ.addChildren(self._stash)
-            ais_list = [el.ais for el in self._stash]
+            for item in self._stash:
+                self._index.add(item)
+            ais_list = [el.ais for el in self._stash if el.ais is not None]
             self.sigObjectsAdded.emit(ais_list)
 
     @pyqtSlot()
@@ -370,14 +729,65 @@ class ObjectTree(QWidget, ComponentMixin):
         # if CQ models is selected get all children
         if [item for item in items if item is self.CQ]:
             CQ = self.CQ
-            shapes = [CQ.child(i).shape for i in range(CQ.childCount())]
+            children = [CQ.child(i) for i in range(CQ.childCount())]
         # otherwise collect all selected children of CQ
         else:
-            shapes = [item.shape for item in items if item.parent() is self.CQ]
+            children = [item for item in items if item.parent() is self.CQ]
 
         fname = get_save_filename(export_type)
-        if fname != "":
-            export(shapes, export_type, fname, precision)
+        if fname == "":
+            return
+
+        if self.preferences["One file per object"] and len(children) > 1:
+            stem, suffix = Path(fname).stripext(), Path(fname).suffix
+            names = unique_names(
+                [safe_name(child.properties["Name"]) for child in children]
+            )
+            jobs = [
+                (
+                    [serialize_shape(child.shape)],
+                    export_type,
+                    f"{stem}-{name}{suffix}",
+                    precision,
+                )
+                for child, name in zip(children, names)
+            ]
+        else:
+            shapes = [serialize_shape(child.shape) for child in children]
+            jobs = [(shapes, export_type, fname, precision)]
+
+        self._export_progress.setRange(0, len(jobs) if len(jobs) > 1 else 0)
+        self._export_progress.setValue(0)
+        self._exporter.start(jobs)
+
+    @pyqtSlot(int, int)
+    def _update_export_progress(self, done, total):
+
+        if total > 1:
+            self._export_progress.setValue(done)
+        else:
+            # keep the busy indicator alive
+            self._export_progress.setValue(0)
+
+    @pyqtSlot(list)
+    def _handle_export_finished(self, fnames):
+
+        self._export_progress.reset()
+        self.sigExportFinished.emit(fnames)
+
+    @pyqtSlot(QTreeWidgetItem, int)
+    def _forward_item_changed(self, item, col):
+
+        if isinstance(item, ObjectTreeItem) and item.ais is None:
+            if not item.checkState(0):
+                return
+            self._realize(item)
+
+            # mesh and display the deferred object like the rendered ones
+            self.sigObjectsAdded[list, bool].emit([item.ais], False)
+            return
+
+        self.sigItemChanged.emit(item, col)
 
     @pyqtSlot()
     def handleSelection(self):
@@ -389,7 +799,11 @@ class ObjectTree(QWidget, ComponentMixin):
             return
 
         # emit list of all selected ais objects (might be empty)
-        ais_objects = [item.ais for item in items if item.parent() is self.CQ]
+        ais_objects = [
+            item.ais
+            for item in items
+            if item.parent() is self.CQ and item.ais is not None
+        ]
         self.sigAISObjectsSelected.emit(ais_objects)
 
         # handle context menu and emit last selected CQ  object (if present)
@@ -414,15 +828,18 @@ class ObjectTree(QWidget, ComponentMixin):
     @pyqtSlot(list)
     def handleGraphicalSelection(self, shapes):
 
-        self.tree.clearSelection()
+        items = [self._index.get(shape) for shape in shapes]
 
-        CQ = self.CQ
-        for i in range(CQ.childCount()):
-            item = CQ.child(i)
-            for shape in shapes:
-                if item.ais.Shape().IsEqual(shape):
+        # update the selection at once, handleSelection runs a single time
+        with QSignalBlocker(self.tree):
+            self.tree.clearSelection()
+
+            for item in items:
+                if item is not None:
                     item.setSelected(True)
 
+        self.tree.itemSelectionChanged.emit()
+
     @pyqtSlot(QTreeWidgetItem, int)
     def handleChecked(self, item, col):
 
@@ -10,7 +10,7 @@ from OCP.Aspect import Aspect_DisplayConnection, Aspect_TypeOfTriedronPosition
 from OCP.OpenGl import OpenGl_GraphicDriver
 from OCP.V3d import V3d_Viewer
 from OCP.gp import gp_Trsf, gp_Ax1, gp_Dir
-from OCP.AIS import AIS_InteractiveContext, AIS_DisplayMode
+from OCP.AIS import AIS_InteractiveContext, AIS_DisplayMode, AIS_Shape
 from OCP.Quantity import Quantity_Color
 
 ZOOM_STEP = 0.9
@@ -19,6 +19,7 @@ ZOOM_STEP = 0.9
 class OCCTWidget(QWidget):
 
     sigObjectSelected = pyqtSignal(list)
+    sigViewChanged = pyqtSignal()
 
     def __init__(self, parent=None):
 
@@ -93,6 +94,7 @@ class OCCTWidget(QWidget):
         factor = ZOOM_STEP if delta < 0 else 1 / ZOOM_STEP
 
         self.view.SetZoom(factor)
+        self.sigViewChanged.emit()
 
     def mousePressEvent(self, event):
 
@@ -146,6 +148,7 @@ class OCCTWidget(QWidget):
 
         elif event.buttons() == Qt.RightButton:
             self.view.ZoomAtPoint(self._previous_pos.x(), y, x, self._previous_pos.y())
+            self.sigViewChanged.emit()
 
         self._previous_pos = pos
 
@@ -162,12 +165,21 @@ class OCCTWidget(QWidget):
 
     def _handle_selection(self):
 
-        self.context.Select(True)
-        self.context.InitSelected()
+        ctx = self.context
+        ctx.Select(True)
+        ctx.InitSelected()
 
         selected = []
-        if self.context.HasSelectedShape():
-            selected.append(self.context.SelectedShape())
+        while ctx.MoreSelected():
+            owner = ctx.SelectedInteractive()
+
+            # whole shape of the object, also if a face or an edge is selected
+            if isinstance(owner, AIS_Shape):
+                selected.append(owner.Shape())
+            elif ctx.HasSelectedShape():
+                selected.append(ctx.SelectedShape())
+
+            ctx.NextSelected()
 
         self.sigObjectSelected.emit(selected)
 
@@ -191,6 +203,7 @@ class OCCTWidget(QWidget):
         super(OCCTWidget, self).resizeEvent(event)
 
         self.view.MustBeResized()
+        self.sigViewChanged.emit()
 
     def _initialize(self):
 
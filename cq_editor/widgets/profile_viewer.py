@@ -0,0 +1,274 @@
+from PyQt5.QtCore import Qt, QRectF, pyqtSlot, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter
+from PyQt5.QtWidgets import (
+    QWidget,
+    QLabel,
+    QTabWidget,
+    QTreeWidget,
+    QTreeWidgetItem,
+    QScrollArea,
+)
+
+import pyqtgraph as pg
+
+from ..mixins import ComponentMixin
+from ..render_history import regressions
+from ..utils import layout
+
+CATEGORY_COLORS = {
+    "compile": QColor(150, 150, 150),
+    "line": QColor(90, 140, 200),
+    "workplane": QColor(240, 170, 60),
+    "make_AIS": QColor(120, 190, 110),
+    "tessellate": QColor(200, 100, 90),
+    "display": QColor(160, 120, 190),
+}
+
+HISTORY_COLOR = QColor(90, 140, 200)
+REGRESSION_COLOR = QColor(220, 60, 50)
+
+
+class _SortableItem(QTreeWidgetItem):
+    """
+    Tree item sorting numeric columns by value instead of by text.
+    """
+
+    def __lt__(self, other):
+
+        col = self.treeWidget().sortColumn()
+        a, b = self.data(col, Qt.UserRole), other.data(col, Qt.UserRole)
+
+        if a is None or b is None:
+            return super(_SortableItem, self).__lt__(other)
+
+        return a < b
+
+
+class FlameChart(QWidget):
+    """
+    Nested spans of a profile drawn on a time axis, one row per nesting level.
+    """
+
+    ROW_HEIGHT = 18
+
+    sigSpanClicked = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+
+        super(FlameChart, self).__init__(parent)
+
+        self.spans = []
+        self.total = 0.0
+
+        self.setMouseTracking(True)
+
+    def setSpans(self, spans, total):
+
+        self.spans = spans
+        self.total = total
+
+        depth = max((s.depth for s in spans), default=0)
+        self.setMinimumHeight((depth + 1) * self.ROW_HEIGHT)
+        self.update()
+
+    def _rect(self, span):
+
+        scale = self.width() / self.total if self.total > 0 else 0
+
+        return QRectF(
+            span.start * scale,
+            span.depth * self.ROW_HEIGHT,
+            max((span.end - span.start) * scale, 1),
+            self.ROW_HEIGHT - 1,
+        )
+
+    def spanAt(self, pos):
+
+        for span in self.spans:
+            if self._rect(span).contains(pos):
+                return span
+
+        return None
+
+    def paintEvent(self, event):
+
+        painter = QPainter(self)
+
+        for span in self.spans:
+            rect = self._rect(span)
+            painter.fillRect(rect, CATEGORY_COLORS.get(span.category, Qt.gray))
+
+            if rect.width() > 30:
+                painter.drawText(
+                    rect.adjusted(2, 0, -2, 0),
+                    Qt.AlignVCenter | Qt.AlignLeft,
+                    painter.fontMetrics().elidedText(
+                        span.name, Qt.ElideRight, int(rect.width()) - 4
+                    ),
+                )
+
+    def mouseMoveEvent(self, event):
+
+        span = self.spanAt(event.pos())
+
+        if span:
+            self.setToolTip(
+                f"{span.category}: {span.name}\n"
+                f"line {span.lineno}, {1000 * (span.end - span.start):.1f} ms"
+            )
+        else:
+            self.setToolTip("")
+
+    def mousePressEvent(self, event):
+
+        span = self.spanAt(event.pos())
+
+        if span:
+            self.sigSpanClicked.emit(span)
+
+
+class HistoryChart(QWidget):
+    """
+    Wall times of the last renders of a file, regressions in red.
+    """
+
+    def __init__(self, parent=None):
+
+        super(HistoryChart, self).__init__(parent)
+
+        self.label = QLabel("")
+
+        self.plot = pg.PlotWidget(background=None)
+        self.plot.setLabel("left", "Render time", units="s")
+        self.plot.setLabel("bottom", "Render")
+        self.plot.setMouseEnabled(False, False)
+
+        self.bars = pg.BarGraphItem(x=[], height=[], width=0.8)
+        self.plot.addItem(self.bars)
+
+        layout(self, (self.label, self.plot), top_widget=self)
+
+    def setRecords(self, records):
+
+        flagged = set(regressions(records))
+
+        self.bars.setOpts(
+            x=list(range(len(records))),
+            height=[r.wall_time for r in records],
+            brushes=[
+                REGRESSION_COLOR if i in flagged else HISTORY_COLOR
+                for i in range(len(records))
+            ],
+        )
+
+        if records:
+            last = records[-1]
+            memory = (
+                f", peak memory {last.peak_memory / 2**20:.0f} MB"
+                if last.peak_memory
+                else ""
+            )
+
+            self.label.setText(
+                f"Last render: {1000 * last.wall_time:.1f} ms, "
+                f"{last.objects} objects, {last.triangles} triangles{memory}; "
+                f"{len(flagged)} of {len(records)} renders flagged as regressions"
+            )
+        else:
+            self.label.setText("")
+
+
+class ProfileViewer(QWidget, ComponentMixin):
+    """
+    Timings of the last profiled render as a sortable table and a flame chart,
+    and the render history of the current file.
+    """
+
+    name = "Profiler"
+
+    sigHighlightLine = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+
+        super(ProfileViewer, self).__init__(parent)
+        ComponentMixin.__init__(self)
+
+        self.label = QLabel("Enable 'Profile renders' in the preferences")
+
+        self.table = QTreeWidget()
+        self.table.setHeaderLabels(
+            ["Category", "Name", "Line", "Calls", "Total [ms]", "Self [ms]"]
+        )
+        self.table.setRootIsDecorated(False)
+        self.table.setSortingEnabled(True)
+        self.table.setColumnWidth(1, 250)
+        self.table.currentItemChanged.connect(self.handleSelection)
+
+        self.chart = FlameChart()
+        self.chart.sigSpanClicked.connect(self.handleSpanClicked)
+
+        scroll = QScrollArea()
+        scroll.setWidget(self.chart)
+        scroll.setWidgetResizable(True)
+
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.table, "Summary")
+        self.tabs.addTab(scroll, "Flame chart")
+
+        self.history = HistoryChart()
+        self.tabs.addTab(self.history, "History")
+
+        layout(self, (self.label, self.tabs), top_widget=self)
+
+    @pyqtSlot(object)
+    def addProfile(self, profile):
+
+        self.table.setSortingEnabled(False)
+        self.table.clear()
+
+        for category, name, lineno, calls, total, self_time in profile.summary():
+            item = _SortableItem(
+                [
+                    category,
+                    name,
+                    str(lineno or ""),
+                    str(calls),
+                    f"{1000 * total:.2f}",
+                    f"{1000 * self_time:.2f}",
+                ]
+            )
+
+            for col, value in enumerate((lineno or 0, calls, total, self_time), 2):
+                item.setData(col, Qt.UserRole, value)
+
+            self.table.addTopLevelItem(item)
+
+        self.table.setSortingEnabled(True)
+        self.table.sortItems(4, Qt.DescendingOrder)
+
+        self.chart.setSpans(profile.spans, profile.total)
+        self.label.setText(f"Render: {1000 * profile.total:.1f} ms")
+
+    @pyqtSlot(list)
+    def setHistory(self, records):
+
+        self.history.setRecords(records)
+
+    @pyqtSlot()
+    def clear(self):
+
+        self.table.clear()
+        self.chart.setSpans([], 0.0)
+        self.label.setText("")
+
+    @pyqtSlot(QTreeWidgetItem, QTreeWidgetItem)
+    def handleSelection(self, item, prev):
+
+        if item and item.data(2, Qt.UserRole):
+            self.sigHighlightLine.emit(item.data(2, Qt.UserRole))
+
+    @pyqtSlot(object)
+    def handleSpanClicked(self, span):
+
+        if span.lineno:
+            self.sigHighlightLine.emit(span.lineno)
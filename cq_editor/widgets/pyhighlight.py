@@ -1,4 +1,5 @@
-from PyQt5.QtCore import QRegExp
+import re
+
 from PyQt5.QtGui import QColor, QTextCharFormat, QFont, QSyntaxHighlighter
 
 
@@ -32,216 +33,155 @@ STYLES = {
     "numbers": format("magenta"),
 }
 
+# Block states, the multi-line string states carry over to the next block
+NORMAL = 0
+IN_TRIPLE_SINGLE = 1
+IN_TRIPLE_DOUBLE = 2
+
+TOKENS = re.compile(
+    r"""
+    (?P<comment>\#.*)
+    | (?P<string2>(?<!\w)[rRbBuUfF]{0,2}(?:'''|\"\"\"))
+    | (?P<string>(?<!\w)[rRbBuUfF]{0,2}
+        (?:"[^"\\]*(?:\\.[^"\\]*)*"?|'[^'\\]*(?:\\.[^'\\]*)*'?))
+    | (?P<numbers>\b(?:0[xXoObB][0-9A-Fa-f_]+
+        |(?:[0-9][0-9_]*(?:\.[0-9_]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]+)?[jJlL]?))
+    | (?P<identifier>[^\W\d]\w*)
+    | (?P<operator>[-+*/%=<>!^|&~]+)
+    | (?P<brace>[()\[\]{}])
+    """,
+    re.VERBOSE,
+)
+
+# end of a triple-quoted string, skipping escaped characters
+CLOSING = {
+    "'''": re.compile(r"(?:[^\\]|\\.)*?'''"),
+    '"""': re.compile(r'(?:[^\\]|\\.)*?"""'),
+}
+
+TRIPLE_STATES = {"'''": IN_TRIPLE_SINGLE, '"""': IN_TRIPLE_DOUBLE}
+TRIPLE_DELIMITERS = {v: k for k, v in TRIPLE_STATES.items()}
+
 
 class PythonHighlighter(QSyntaxHighlighter):
     """
     Syntax highlighter for the Python language.
+
+    Each block is lexed once from left to right. Whether a block ends inside
+    a triple-quoted string is stored as its block state, so that
+    QSyntaxHighlighter re-highlights only the edited blocks and the following
+    ones whose starting state changed.
     """
 
     # Python keywords
-    keywords = [
-        "and",
-        "assert",
-        "break",
-        "class",
-        "continue",
-        "def",
-        "del",
-        "elif",
-        "else",
-        "except",
-        "exec",
-        "finally",
-        "for",
-        "from",
-        "global",
-        "if",
-        "import",
-        "in",
-        "is",
-        "lambda",
-        "not",
-        "or",
-        "pass",
-        "print",
-        "raise",
-        "return",
-        "try",
-        "while",
-        "yield",
-        "None",
-        "True",
-        "False",
-    ]
-
-    # Python operators
-    operators = [
-        "=",
-        # Comparison
-        "==",
-        "!=",
-        "<",
-        "<=",
-        ">",
-        ">=",
-        # Arithmetic
-        r"\+",
-        "-",
-        r"\*",
-        "/",
-        "//",
-        r"\%",
-        r"\*\*",
-        # In-place
-        r"\+=",
-        "-=",
-        r"\*=",
-        "/=",
-        r"\%=",
-        # Bitwise
-        r"\^",
-        r"\|",
-        r"\&",
-        r"\~",
-        ">>",
-        "<<",
-    ]
-
-    # Python braces
-    braces = [
-        r"\{",
-        r"\}",
-        r"\(",
-        r"\)",
-        r"\[",
-        r"\]",
-    ]
-
-    def __init__(self, parent=None):
-        super(PythonHighlighter, self).__init__(parent)
-
-        # Multi-line strings (expression, flag, style)
-        self.tri_single = (QRegExp("'''"), 1, STYLES["string2"])
-        self.tri_double = (QRegExp('"""'), 2, STYLES["string2"])
-
-        rules = []
-
-        # Keyword, operator, and brace rules
-        rules += [
-            (r"\b%s\b" % w, 0, STYLES["keyword"]) for w in PythonHighlighter.keywords
-        ]
-        rules += [
-            (r"%s" % o, 0, STYLES["operator"]) for o in PythonHighlighter.operators
-        ]
-        rules += [(r"%s" % b, 0, STYLES["brace"]) for b in PythonHighlighter.braces]
-
-        # All other rules
-        rules += [
-            # 'self'
-            (r"\bself\b", 0, STYLES["self"]),
-            # 'def' followed by an identifier
-            (r"\bdef\b\s*(\w+)", 1, STYLES["defclass"]),
-            # 'class' followed by an identifier
-            (r"\bclass\b\s*(\w+)", 1, STYLES["defclass"]),
-            # Numeric literals
-            (r"\b[+-]?[0-9]+[lL]?\b", 0, STYLES["numbers"]),
-            (r"\b[+-]?0[xX][0-9A-Fa-f]+[lL]?\b", 0, STYLES["numbers"]),
-            (r"\b[+-]?[0-9]+(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?\b", 0, STYLES["numbers"]),
-            # Double-quoted string, possibly containing escape sequences
-            (r'"[^"\\]*(\\.[^"\\]*)*"', 0, STYLES["string"]),
-            # Single-quoted string, possibly containing escape sequences
-            (r"'[^'\\]*(\\.[^'\\]*)*'", 0, STYLES["string"]),
-            # From '#' until a newline
-            (r"#[^\n]*", 0, STYLES["comment"]),
+    keywords = frozenset(
+        [
+            "and",
+            "as",
+            "assert",
+            "async",
+            "await",
+            "break",
+            "class",
+            "continue",
+            "def",
+            "del",
+            "elif",
+            "else",
+            "except",
+            "exec",
+            "finally",
+            "for",
+            "from",
+            "global",
+            "if",
+            "import",
+            "in",
+            "is",
+            "lambda",
+            "nonlocal",
+            "not",
+            "or",
+            "pass",
+            "print",
+            "raise",
+            "return",
+            "try",
+            "while",
+            "with",
+            "yield",
+            "None",
+            "True",
+            "False",
         ]
-
-        # Build a QRegExp for each pattern
-        self.rules = [(QRegExp(pat), index, fmt) for (pat, index, fmt) in rules]
+    )
 
     def highlightBlock(self, text):
         """
         Apply syntax highlighting to the given block of text.
         """
-        self.tripleQuoutesWithinStrings = []
-        # Do other syntax formatting
-        for expression, nth, format in self.rules:
-            index = expression.indexIn(text, 0)
-            if index >= 0:
-                # if there is a string we check
-                # if there are some triple quotes within the string
-                # they will be ignored if they are matched again
-                if expression.pattern() in [
-                    r'"[^"\\]*(\\.[^"\\]*)*"',
-                    r"'[^'\\]*(\\.[^'\\]*)*'",
-                ]:
-                    innerIndex = self.tri_single[0].indexIn(text, index + 1)
-                    if innerIndex == -1:
-                        innerIndex = self.tri_double[0].indexIn(text, index + 1)
-
-                    if innerIndex != -1:
-                        tripleQuoteIndexes = range(innerIndex, innerIndex + 3)
-                        self.tripleQuoutesWithinStrings.extend(tripleQuoteIndexes)
-
-            while index >= 0:
-                # skipping triple quotes within strings
-                if index in self.tripleQuoutesWithinStrings:
-                    index += 1
-                    expression.indexIn(text, index)
-                    continue
-
-                # We actually want the index of the nth match
-                index = expression.pos(nth)
-                length = len(expression.cap(nth))
-                self.setFormat(index, length, format)
-                index = expression.indexIn(text, index + length)
-
-        self.setCurrentBlockState(0)
-
-        # Do multi-line strings
-        in_multiline = self.match_multiline(text, *self.tri_single)
-        if not in_multiline:
-            in_multiline = self.match_multiline(text, *self.tri_double)
-
-    def match_multiline(self, text, delimiter, in_state, style):
+
+        pos = 0
+        state = self.previousBlockState()
+
+        self.setCurrentBlockState(NORMAL)
+
+        # continuation of a multi-line string
+        if state in TRIPLE_DELIMITERS:
+            pos = self._string2(text, 0, TRIPLE_DELIMITERS[state])
+            if pos < 0:
+                return
+
+        after_defclass = False
+        search = TOKENS.search
+
+        while True:
+            match = search(text, pos)
+            if match is None:
+                break
+
+            kind = match.lastgroup
+            start, pos = match.span()
+
+            if kind == "identifier":
+                word = match.group()
+
+                if after_defclass:
+                    self.setFormat(start, pos - start, STYLES["defclass"])
+                elif word in self.keywords:
+                    self.setFormat(start, pos - start, STYLES["keyword"])
+                elif word == "self":
+                    self.setFormat(start, pos - start, STYLES["self"])
+
+                after_defclass = word in ("def", "class")
+                continue
+
+            after_defclass = False
+
+            if kind == "string2":
+                pos = self._string2(text, start, match.group()[-3:], pos)
+                if pos < 0:
+                    return
+            else:
+                self.setFormat(start, pos - start, STYLES[kind])
+
+    def _string2(self, text, start, delimiter, body=None):
         """
-        Do highlighting of multi-line strings. ``delimiter`` should be a
-        ``QRegExp`` for triple-single-quotes or triple-double-quotes, and
-        ``in_state`` should be a unique integer to represent the corresponding
-        state changes when inside those strings. Returns True if we're still
-        inside a multi-line string when this function is finished.
+        Highlight a triple-quoted string starting at start, its body starting
+        at body. Returns the position after the string or -1 if it continues
+        in the next block.
         """
-        # If inside triple-single quotes, start at 0
-        if self.previousBlockState() == in_state:
-            start = 0
-            add = 0
-        # Otherwise, look for the delimiter on this line
-        else:
-            start = delimiter.indexIn(text)
-            # skipping triple quotes within strings
-            if start in self.tripleQuoutesWithinStrings:
-                return False
-            # Move past this match
-            add = delimiter.matchedLength()
-
-        # As long as there's a delimiter match on this line...
-        while start >= 0:
-            # Look for the ending delimiter
-            end = delimiter.indexIn(text, start + add)
-            # Ending delimiter on this line?
-            if end >= add:
-                length = end - start + add + delimiter.matchedLength()
-                self.setCurrentBlockState(0)
-            # No; multi-line string
-            else:
-                self.setCurrentBlockState(in_state)
-                length = len(text) - start + add
-            # Apply formatting
-            self.setFormat(start, length, style)
-            # Look for the next match
-            start = delimiter.indexIn(text, start + length)
-
-        # Return True if still inside a multi-line string, False otherwise
-        if self.currentBlockState() == in_state:
-            return True
-        else:
-            return False
+
+        if body is None:
+            body = start
+
+        match = CLOSING[delimiter].match(text, body)
+
+        if match is None:
+            self.setFormat(start, len(text) - start, STYLES["string2"])
+            self.setCurrentBlockState(TRIPLE_STATES[delimiter])
+            return -1
+
+        self.setFormat(start, match.end() - start, STYLES["string2"])
+
+        return match.end()
@@ -61,8 +61,11 @@ class TracebackPane(QWidget, ComponentMixin):
 
             code_lines = code.splitlines()
 
+            # tracebacks coming from the render worker are already extracted
+            frames = tb if isinstance(tb, list) else extract_tb(tb)
+
             filtered_trace = dropwhile(
-                lambda el: "string>" not in el.filename, extract_tb(tb)
+                lambda el: "string>" not in el.filename, frames
             )
 
             for el in filtered_trace:
@@ -1,6 +1,6 @@
 from PyQt5.QtWidgets import QWidget, QDialog, QTreeWidgetItem, QApplication, QAction
 
-from PyQt5.QtCore import pyqtSlot, pyqtSignal
+from PyQt5.QtCore import QObject, QTimer, pyqtSlot, pyqtSignal
 from PyQt5.QtGui import QIcon
 
 from OCP.Graphic3d import (
@@ -8,9 +8,26 @@ from OCP.Graphic3d import (
     Graphic3d_StereoMode,
     Graphic3d_NOM_JADE,
     Graphic3d_MaterialAspect,
+    Graphic3d_RenderingParams,
+    Graphic3d_TransformPers,
+    Graphic3d_TMF_2d,
+    Graphic3d_Vec2i,
+    Graphic3d_ZLayerId_TopOSD,
 )
-from OCP.AIS import AIS_Shaded, AIS_WireFrame, AIS_ColoredShape, AIS_Axis
-from OCP.Aspect import Aspect_GDM_Lines, Aspect_GT_Rectangular
+from OCP.AIS import (
+    AIS_Shaded,
+    AIS_WireFrame,
+    AIS_ColoredShape,
+    AIS_Axis,
+    AIS_Shape,
+    AIS_TextLabel,
+)
+from OCP.Aspect import (
+    Aspect_GDM_Lines,
+    Aspect_GT_Rectangular,
+    Aspect_TOTP_LEFT_LOWER,
+)
+from OCP.TCollection import TCollection_ExtendedString
 from OCP.Quantity import (
     Quantity_NOC_BLACK as BLACK,
     Quantity_TOC_RGB as TOC_RGB,
@@ -18,11 +35,24 @@ from OCP.Quantity import (
 )
 from OCP.Geom import Geom_Axis1Placement
 from OCP.gp import gp_Ax3, gp_Dir, gp_Pnt, gp_Ax1
+from OCP.PrsMgr import PrsMgr_DisplayStatus
+
+from collections import deque
+from time import perf_counter
 
 from ..utils import layout, get_save_filename
 from ..mixins import ComponentMixin
 from ..icons import icon
-from ..cq_utils import to_occ_color, make_AIS, DEFAULT_FACE_COLOR
+from ..cq_utils import (
+    to_occ_color,
+    make_AIS,
+    tessellate_many,
+    shape_size,
+    lod_deviation,
+    DEFAULT_FACE_COLOR,
+    MESH_CACHE,
+)
+from ..profiler import span
 
 from .occt_widget import OCCTWidget
 
@@ -32,6 +62,217 @@ import qtawesome as qta
 DEFAULT_EDGE_COLOR = Quantity_Color(BLACK)
 DEFAULT_EDGE_WIDTH = 2
 
+# angular deviation of the first, coarse display
+COARSE_ANGLE = 0.5
+
+
+class RedrawScheduler(QObject):
+    """
+    Collects redraw requests and calls redraw at most once per frame. Requests
+    made while a frame is pending are coalesced into it.
+    """
+
+    def __init__(self, redraw, max_fps=60, parent=None):
+
+        super(RedrawScheduler, self).__init__(parent)
+
+        self.redraw = redraw
+        self.max_fps = max_fps
+
+        self.pending = 0
+        self.requests = 0
+        self.frames = 0
+        # requests served by the last frame
+        self.coalesced = 0
+
+        self._times = deque(maxlen=30)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+
+    @property
+    def fps(self):
+
+        if len(self._times) < 2 or self._times[-1] == self._times[0]:
+            return 0.0
+
+        return (len(self._times) - 1) / (self._times[-1] - self._times[0])
+
+    @pyqtSlot()
+    def request(self):
+
+        self.pending += 1
+        self.requests += 1
+
+        if not self.timer.isActive():
+            wait = 0.0
+            if self._times and self.max_fps > 0:
+                wait = self._times[-1] + 1 / self.max_fps - perf_counter()
+
+            self.timer.start(max(0, int(1000 * wait)))
+
+    @pyqtSlot()
+    def flush(self):
+
+        self.timer.stop()
+
+        if not self.pending:
+            return
+
+        self.coalesced, self.pending = self.pending, 0
+        self.frames += 1
+        self._times.append(perf_counter())
+
+        self.redraw()
+
+
+class LevelOfDetail(QObject):
+    """
+    Shapes are displayed with a coarse mesh first and refined once the camera
+    stops moving, so that the chordal error of every shape stays below a
+    number of pixels on screen. Refinement runs in time slices on the GUI
+    thread, the largest shapes first.
+    """
+
+    DELAY = 300  # ms after the last camera change
+    TIME_SLICE = 0.05  # s of meshing between processing events
+
+    def __init__(self, viewer):
+
+        super(LevelOfDetail, self).__init__(viewer)
+
+        self.viewer = viewer
+
+        # id of the AIS object -> [ais, size, deviation coefficient]
+        self.items = {}
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.refine)
+
+    @property
+    def coarsest(self):
+
+        prefs = self.viewer.preferences
+
+        return max(prefs["LOD coarse deviation"], prefs["Deviation"])
+
+    def add(self, ais_list):
+        """
+        Mesh the shapes coarsely for display and schedule their refinement.
+        """
+
+        prefs = self.viewer.preferences
+        coarsest = self.coarsest
+        angle = prefs["Angular deviation"]
+
+        if coarsest > prefs["Deviation"]:
+            angle = max(angle, COARSE_ANGLE)
+
+        shapes = []
+
+        for ais in ais_list:
+            # shapes displayed again keep their refined mesh
+            if not isinstance(ais, AIS_Shape) or id(ais) in self.items:
+                continue
+
+            shape = ais.Shape()
+            shapes.append(shape)
+
+            ais.SetOwnDeviationCoefficient(coarsest)
+            ais.SetOwnDeviationAngle(angle)
+            self.items[id(ais)] = [ais, shape_size(shape), coarsest]
+
+        tessellate_many(shapes, coarsest, angle)
+
+        self.schedule()
+
+    def remove(self, ais_list):
+
+        for ais in ais_list:
+            self.items.pop(id(ais), None)
+
+    def clear(self):
+
+        self.items = {}
+        self.timer.stop()
+
+    @pyqtSlot()
+    def schedule(self):
+
+        if self.items:
+            self.timer.start(self.DELAY)
+
+    def pixels_per_unit(self):
+
+        canvas = self.viewer.canvas
+        height = self.viewer._get_view().Camera().ViewDimensions().Y()
+
+        if height <= 0:
+            return 0.0
+
+        return canvas.height() * canvas.devicePixelRatioF() / height
+
+    @pyqtSlot()
+    def refine(self):
+
+        prefs = self.viewer.preferences
+        ctx = self.viewer._get_context()
+
+        finest = prefs["Deviation"]
+        angle = prefs["Angular deviation"]
+        pixel_error = prefs["LOD pixel error"]
+        coarsest = self.coarsest
+        ppu = self.pixels_per_unit()
+
+        # forget removed objects, hidden ones are refined once shown again
+        self.items = {
+            k: item
+            for k, item in self.items.items()
+            if ctx.DisplayStatus(item[0])
+            != PrsMgr_DisplayStatus.PrsMgr_DisplayStatus_None
+        }
+
+        pending = []
+
+        for item in self.items.values():
+            ais, size, current = item
+
+            if prefs["Level of detail"]:
+                target = lod_deviation(size, ppu, pixel_error, finest, coarsest)
+            else:
+                target = finest
+
+            # finer meshes are kept when zooming out
+            if target < current and ctx.IsDisplayed(ais):
+                pending.append((item, target))
+
+        pending.sort(key=lambda x: x[0][1], reverse=True)
+
+        start = perf_counter()
+
+        for item, target in pending:
+            ais = item[0]
+
+            tessellate_many([ais.Shape()], target, angle)
+            ais.SetOwnDeviationCoefficient(target)
+            ais.SetOwnDeviationAngle(angle)
+            ctx.Redisplay(ais, False)
+
+            item[2] = target
+
+            # the finer mesh takes more memory than the coarse one
+            MESH_CACHE.remeasure(ais.Shape())
+
+            if perf_counter() - start > self.TIME_SLICE:
+                # let the event loop run before continuing
+                self.timer.start(0)
+                break
+
+        if pending:
+            self.viewer.redraw()
+
 
 class OCCViewer(QWidget, ComponentMixin):
 
@@ -58,6 +299,18 @@ class OCCViewer(QWidget, ComponentMixin):
                 "dec": True,
                 "step": 1,
             },
+            {"name": "Mesh cache size (MB)", "type": "int", "value": 256},
+            {"name": "Max redraw rate (FPS)", "type": "int", "value": 60},
+            {"name": "Show redraw statistics", "type": "bool", "value": False},
+            {"name": "Level of detail", "type": "bool", "value": True},
+            {"name": "LOD pixel error", "type": "float", "value": 0.5, "step": 0.1},
+            {
+                "name": "LOD coarse deviation",
+                "type": "float",
+                "value": 1e-3,
+                "dec": True,
+                "step": 1,
+            },
             {
                 "name": "Projection Type",
                 "type": "list",
@@ -107,6 +360,12 @@ class OCCViewer(QWidget, ComponentMixin):
         self.canvas = OCCTWidget()
         self.canvas.sigObjectSelected.connect(self.handle_selection)
 
+        self.lod = LevelOfDetail(self)
+        self.canvas.sigViewChanged.connect(self.lod.schedule)
+
+        self.scheduler = RedrawScheduler(self._redraw, parent=self)
+        self.stats_label = None
+
         self.create_actions(self)
 
         self.layout_ = layout(
@@ -156,6 +415,18 @@ class OCCViewer(QWidget, ComponentMixin):
         ctx.SetDeviationCoefficient(self.preferences["Deviation"])
         ctx.SetDeviationAngle(self.preferences["Angular deviation"])
 
+        MESH_CACHE.configure(
+            self.preferences["Deviation"],
+            self.preferences["Angular deviation"],
+            self.preferences["Mesh cache size (MB)"],
+        )
+
+        # the deviation settings might have changed
+        self.lod.schedule()
+
+        self.scheduler.max_fps = self.preferences["Max redraw rate (FPS)"]
+        self._show_stats(self.preferences["Show redraw statistics"])
+
         v = self._get_view()
         camera = v.Camera()
         projection_type = self.preferences["Projection Type"]
@@ -269,6 +540,7 @@ class OCCViewer(QWidget, ComponentMixin):
 
         self.displayed_shapes = []
         self.displayed_ais = []
+        self.lod.clear()
         self.canvas.context.EraseAll(True)
         context = self._get_context()
         context.PurgeDisplay()
@@ -288,47 +560,136 @@ class OCCViewer(QWidget, ComponentMixin):
     def display(self, ais):
 
         context = self._get_context()
-        context.Display(ais, True)
+
+        self._tessellate([ais])
+        context.Display(ais, False)
 
         if self.preferences["Fit automatically"]:
             self.fit()
+        else:
+            self.redraw()
 
     @pyqtSlot(list)
     @pyqtSlot(list, bool)
     def display_many(self, ais_list, fit=None):
         context = self._get_context()
-        for ais in ais_list:
-            context.Display(ais, True)
 
-        if self.preferences["Fit automatically"] and fit is None:
-            self.fit()
-        elif fit:
-            self.fit()
+        with span("display", f"{len(ais_list)} objects"):
+            # mesh the whole batch up front instead of lazily per object
+            self._tessellate(ais_list)
+
+            for ais in ais_list:
+                context.Display(ais, False)
+
+            if self.preferences["Fit automatically"] and fit is None:
+                self.fit()
+            elif fit:
+                self.fit()
+            else:
+                self.redraw()
+
+    def _tessellate(self, ais_list):
+
+        if self.preferences["Level of detail"]:
+            self.lod.add(ais_list)
+        else:
+            shapes = [ais.Shape() for ais in ais_list if isinstance(ais, AIS_Shape)]
+
+            tessellate_many(
+                shapes,
+                self.preferences["Deviation"],
+                self.preferences["Angular deviation"],
+            )
+
+        MESH_CACHE.refresh()
 
     @pyqtSlot(QTreeWidgetItem, int)
     def update_item(self, item, col):
 
         ctx = self._get_context()
         if item.checkState(0):
-            ctx.Display(item.ais, True)
+            self._tessellate([item.ais])
+            ctx.Display(item.ais, False)
         else:
-            ctx.Erase(item.ais, True)
+            ctx.Erase(item.ais, False)
+
+        self.redraw()
 
     @pyqtSlot(list)
     def remove_items(self, ais_items):
 
         ctx = self._get_context()
         for ais in ais_items:
-            ctx.Erase(ais, True)
+            ctx.Erase(ais, False)
+
+        self.lod.remove(ais_items)
+        self.redraw()
 
     @pyqtSlot()
     def redraw(self):
+        """
+        Schedule a redraw, requests are coalesced into at most one per frame.
+        """
+
+        self.scheduler.request()
+
+    def _redraw(self):
+
+        if self.stats_label is not None:
+            self._update_stats()
 
         self._get_viewer().Redraw()
 
+    def _show_stats(self, value):
+        """
+        Toggle the overlay with the frame rate measured by OCCT and the
+        statistics of the redraw scheduler.
+        """
+
+        params = self._get_view().ChangeRenderingParams()
+        params.ToShowStats = value
+        params.CollectedStats = Graphic3d_RenderingParams.PerfCounters_FrameRate
+
+        ctx = self._get_context()
+
+        if value and self.stats_label is None:
+            label = AIS_TextLabel()
+            label.SetZLayer(Graphic3d_ZLayerId_TopOSD)
+            label.SetTransformPersistence(
+                Graphic3d_TransformPers(
+                    Graphic3d_TMF_2d, Aspect_TOTP_LEFT_LOWER, Graphic3d_Vec2i(10, 10)
+                )
+            )
+            self.stats_label = label
+            self._update_stats()
+        elif not value and self.stats_label is not None:
+            ctx.Remove(self.stats_label, False)
+            self.stats_label = None
+
+        self.redraw()
+
+    def _update_stats(self):
+
+        sched = self.scheduler
+        ctx = self._get_context()
+
+        self.stats_label.SetText(
+            TCollection_ExtendedString(
+                f"{sched.fps:.0f} redraws/s, {sched.coalesced} requests in the "
+                f"last redraw, {sched.requests} requests in {sched.frames} redraws"
+            )
+        )
+
+        if ctx.IsDisplayed(self.stats_label):
+            ctx.Redisplay(self.stats_label, False)
+        else:
+            # not selectable
+            ctx.Display(self.stats_label, 0, -1, False)
+
     def fit(self):
 
         self.canvas.view.FitAll()
+        self.lod.schedule()
 
     def iso_view(self):
 
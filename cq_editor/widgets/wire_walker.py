@@ -1,12 +1,38 @@
+import math
+import os
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
 import cadquery as cq
 
 # OCP Imports
 from OCP.BRepAdaptor import BRepAdaptor_Curve
 from OCP.GCPnts import GCPnts_QuasiUniformDeflection
+from OCP.gp import gp_Vec
+from OCP.BinTools import BinTools, BinTools_FormatVersion
+from OCP.TopoDS import TopoDS_Shape
+
+from ..import_cache import IMPORT_CACHE
+
+DEFLECTION = 0.1
+
+# below this many wires starting the pool costs more than it saves
+PARALLEL_MIN_WIRES = 64
+
+# shorter chains are cheaper to handle point by point than with NumPy
+VECTORIZE_MIN_POINTS = 32
+
+# tolerances of cq.Vector.__eq__
+LINEAR_TOLERANCE = 1e-5
+ANGULAR_TOLERANCE = 1e-5
 
-def generate_wire_code(filename):
+def generate_wire_code(filename, deflection=DEFLECTION, jobs=None):
     """
     Reads a STEP file, extracts Wires, and generates 3D Edge Assembly code.
+    Curved edges are discretized with the given deflection; many wires are
+    analyzed in a pool of jobs processes (all cores by default).
     """
     ext = filename.lower().split('.')[-1]
     if ext not in ['step', 'stp']:
@@ -17,23 +43,19 @@ def generate_wire_code(filename):
     if not wires:
         raise ValueError("No Wires found in STEP file. Ensure you exported a Wire/Path, not just loose edges.")
 
-    code_segments = []
-    
-    for i, wire in enumerate(wires):
+    jobs = jobs or os.cpu_count() or 1
 
-        edges = wire.Edges()
-        
-        commands = _analyze_chain(edges)
-        
-        block = _format_hybrid_code(commands)
-        code_segments.append(block)
+    if jobs == 1 or len(wires) < PARALLEL_MIN_WIRES:
+        code_segments = [_wire_code(wire, deflection) for wire in wires]
+    else:
+        code_segments = _wire_codes_parallel(wires, deflection, jobs)
 
     return "\n\n".join(code_segments)
 
 
 def _load_step_wires(filename):
     try:
-        model = cq.importers.importShape(fileName=filename, importType="STEP")
+        model = IMPORT_CACHE.import_step(filename)
         wires:cq.Workplane = model.wires()
         if (not wires or wires.size() == 0):
             print("No wires found in step file. Attempting to assemble edges into wires (not recommended, may produce incorrect results). Please export as a joined Wire/Curve in your CAD tool.")
@@ -42,7 +64,123 @@ def _load_step_wires(filename):
     except Exception as e:
         raise ValueError(f"STEP Load Error: {e}")
 
-def _analyze_chain(edges):
+def _wire_code(wire, deflection=DEFLECTION):
+    return _format_hybrid_code(_analyze_chain(wire.Edges(), deflection))
+
+def _serialize(shape):
+    # binary BREP, the text format does not round-trip all doubles exactly
+    buf = BytesIO()
+    BinTools.Write_s(shape.wrapped, buf, False, False, BinTools_FormatVersion.BinTools_FormatVersion_CURRENT)
+    return buf.getvalue()
+
+def _deserialize(data):
+    shape = TopoDS_Shape()
+    BinTools.Read_s(shape, BytesIO(data))
+    return cq.Shape.cast(shape)
+
+def _wire_chunk_code(data, deflection):
+    """
+    Code blocks of a serialized compound of wires. Runs in a process pool.
+    """
+    return [_wire_code(wire, deflection) for wire in _deserialize(data)]
+
+def _wire_codes_parallel(wires, deflection, jobs):
+    # a few chunks per process to balance the load
+    n_chunks = min(len(wires), jobs * 4)
+    bounds = np.linspace(0, len(wires), n_chunks + 1).astype(int)
+
+    data = [
+        _serialize(cq.Compound.makeCompound(wires[start:end]))
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+
+    with ProcessPoolExecutor(jobs, mp_context=get_context("spawn")) as executor:
+        chunks = executor.map(_wire_chunk_code, data, [deflection] * len(data))
+        return [code for chunk in chunks for code in chunk]
+
+def _length(v):
+    # same as gp_Vec.Magnitude
+    return math.sqrt(v[0] * v[0] + v[1] * v[1] + v[2] * v[2])
+
+def _lengths(v):
+    return np.sqrt(v[:, 0] * v[:, 0] + v[:, 1] * v[:, 1] + v[:, 2] * v[:, 2])
+
+def _is_equal(p1, p2):
+    return gp_Vec(*p1).IsEqual(gp_Vec(*p2), LINEAR_TOLERANCE, ANGULAR_TOLERANCE)
+
+def _dedupe(points):
+    """
+    Drop the points equal (in the cq.Vector sense) to the last kept point.
+    Returns a list of (x, y, z) tuples.
+    """
+    if len(points) < VECTORIZE_MIN_POINTS:
+        clean = []
+        for p in points:
+            if not clean or not _is_equal(clean[-1], p):
+                clean.append(p)
+        return clean
+
+    return [tuple(p) for p in _dedupe_array(np.array(points)).tolist()]
+
+def _dedupe_array(points):
+    """
+    Vectorized _dedupe of an (n, 3) array. Only the pairs that are not
+    clearly apart are compared one by one.
+    """
+    n = len(points)
+    if n < 2:
+        return points
+
+    mags = _lengths(points)
+    m1, m2 = mags[:-1], mags[1:]
+    dist = _lengths(points[1:] - points[:-1])
+    eps = 1e-9 * (1 + np.maximum(m1, m2))
+
+    maybe_equal = (np.abs(m1 - m2) <= LINEAR_TOLERANCE + eps) & (
+        (np.minimum(m1, m2) <= LINEAR_TOLERANCE + eps)
+        | (dist <= LINEAR_TOLERANCE + np.maximum(m1, m2) * ANGULAR_TOLERANCE + eps)
+    )
+    if not maybe_equal.any():
+        return points
+
+    keep = np.ones(n, dtype=bool)
+    pts = points.tolist()
+    last = 0
+    i = 1
+
+    for c in (np.flatnonzero(maybe_equal) + 1).tolist():
+        if c < i:
+            continue
+        if c > i:
+            # everything in between was kept
+            last = c - 1
+        i = c
+
+        while i < n:
+            if _is_equal(pts[last], pts[i]):
+                keep[i] = False
+            else:
+                last = i
+                if i + 1 >= n or not maybe_equal[i]:
+                    i += 1
+                    break
+            i += 1
+
+    return points[keep]
+
+def _edge_points(edge, is_line, deflection):
+    if is_line:
+        return [edge.startPoint().toTuple(), edge.endPoint().toTuple()]
+
+    adaptor = BRepAdaptor_Curve(edge.wrapped)
+    discretizer = GCPnts_QuasiUniformDeflection(adaptor, deflection)
+    if not discretizer.IsDone():
+        return []
+
+    value = discretizer.Value
+    return [value(i).Coord() for i in range(1, discretizer.NbPoints() + 1)]
+
+def _analyze_chain(edges, deflection=DEFLECTION):
     commands = []
     if not edges: return []
 
@@ -52,10 +190,7 @@ def _analyze_chain(edges):
     def flush():
         nonlocal current_points
         if current_points:
-            clean = []
-            for p in current_points:
-                if not clean or clean[-1] != p:
-                    clean.append(p)
+            clean = _dedupe(current_points)
             if len(clean) > 1:
                 commands.append((current_type, clean))
             current_points = []
@@ -64,17 +199,7 @@ def _analyze_chain(edges):
         is_line = (edge.geomType() == "LINE")
         seg_type = "polyline" if is_line else "spline"
         
-        pts = []
-        if is_line:
-            pts.append(edge.startPoint())
-            pts.append(edge.endPoint())
-        else:
-            adaptor = BRepAdaptor_Curve(edge.wrapped)
-            discretizer = GCPnts_QuasiUniformDeflection(adaptor, 0.1)
-            if discretizer.IsDone():
-                for i in range(1, discretizer.NbPoints() + 1):
-                    p = discretizer.Value(i)
-                    pts.append(cq.Vector(p.X(), p.Y(), p.Z()))
+        pts = _edge_points(edge, is_line, deflection)
 
         if seg_type != current_type:
             flush()
@@ -82,8 +207,8 @@ def _analyze_chain(edges):
             current_points = pts
         else:
             if current_points and pts:
-
-                if (current_points[-1] - pts[0]).Length < 1e-4:
+                last, first = current_points[-1], pts[0]
+                if _length((last[0] - first[0], last[1] - first[1], last[2] - first[2])) < 1e-4:
                     current_points.extend(pts[1:])
                 else:
                     flush()
@@ -95,12 +220,25 @@ def _analyze_chain(edges):
     flush()
     return commands
 
+def _line_segments(points):
+    """
+    Indices of the polyline points that start a segment longer than 1e-5.
+    """
+    if len(points) < VECTORIZE_MIN_POINTS:
+        return [
+            j for j, (p1, p2) in enumerate(zip(points, points[1:]))
+            if _length((p1[0] - p2[0], p1[1] - p2[1], p1[2] - p2[2])) > 1e-5
+        ]
+
+    arr = np.array(points)
+    return np.flatnonzero(_lengths(arr[:-1] - arr[1:]) > 1e-5).tolist()
+
 def _format_hybrid_code(commands):
     code_lines = []
     code_lines.append(f"cq.Workplane(cq.Wire.assembleEdges([")
 
     def vec_str(v):
-        return f"cq.Vector({v.x:.3f}, {v.y:.3f}, {v.z:.3f})"
+        return f"cq.Vector({v[0]:.3f}, {v[1]:.3f}, {v[2]:.3f})"
 
     def list_str(points):
         return "[" + ", ".join([vec_str(p) for p in points]) + "]"
@@ -109,15 +247,12 @@ def _format_hybrid_code(commands):
         if len(points) < 2: continue
 
         if cmd_type == "polyline":
-            for j in range(len(points) - 1):
-                p1 = points[j]
-                p2 = points[j+1]
-                if (p1 - p2).Length > 1e-5:
-                    code_lines.append(f"    cq.Edge.makeLine({vec_str(p1)}, {vec_str(p2)}),")
+            for j in _line_segments(points):
+                code_lines.append(f"    cq.Edge.makeLine({vec_str(points[j])}, {vec_str(points[j + 1])}),")
 
         elif cmd_type == "spline":
             code_lines.append(f"    cq.Edge.makeSpline({list_str(points)}),")
-    
+
     code_lines.append("]))")
-    
-    return "\n".join(code_lines)
\ No newline at end of file
+
+    return "\n".join(code_lines)
@@ -9,7 +9,7 @@ if "CASROOT" in os.environ:
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-from cq_editor.__main__ import main
+from cq_editor.cqe_run import main
 
 if __name__ == "__main__":
     main()
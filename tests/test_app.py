@@ -5,6 +5,7 @@ if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 from multiprocessing import Process
+from functools import partial
 
 import pytest
 import pytestqt
@@ -122,6 +123,19 @@ def get_rgba(ais):
     return color.redF(), color.greenF(), color.blueF(), alpha
 
 
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keeps the render history and the import cache out of the user cache"""
+
+    from cq_editor.import_cache import IMPORT_CACHE, default_cache_dir
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "cache"))
+    monkeypatch.setattr(IMPORT_CACHE, "cache_dir", default_cache_dir())
+
+    return tmp_path / "cache"
+
+
 @pytest.fixture
 def main(qtbot, mocker):
 
@@ -284,14 +298,33 @@ def test_export(main, mocker):
 
     # export STL
     mocker.patch.object(QFileDialog, "getSaveFileName", return_value=("out.stl", ""))
-    obj_tree_comp._export_STL_action.triggered.emit()
+    with qtbot.waitSignal(obj_tree_comp.sigExportFinished, timeout=30000):
+        obj_tree_comp._export_STL_action.triggered.emit()
     assert os.path.isfile("out.stl")
 
     # export STEP
     mocker.patch.object(QFileDialog, "getSaveFileName", return_value=("out.step", ""))
-    obj_tree_comp._export_STEP_action.triggered.emit()
+    with qtbot.waitSignal(obj_tree_comp.sigExportFinished, timeout=30000):
+        obj_tree_comp._export_STEP_action.triggered.emit()
     assert os.path.isfile("out.step")
 
+    # one file per object
+    obj_tree_comp.preferences["One file per object"] = True
+    obj_tree_comp.CQ.setSelected(True)
+    with qtbot.waitSignal(obj_tree_comp.sigExportFinished, timeout=30000) as blocker:
+        obj_tree_comp._export_STEP_action.triggered.emit()
+    for fname in blocker.args[0]:
+        assert os.path.isfile(fname)
+        os.remove(fname)
+
+    # cancel
+    obj_tree_comp._export_STEP_action.triggered.emit()
+    assert obj_tree_comp._exporter.busy
+    obj_tree_comp._export_progress.canceled.emit()
+    assert not obj_tree_comp._exporter.busy
+
+    obj_tree_comp.preferences["One file per object"] = False
+
     # clean
     os.remove("out.step")
     os.remove("out.stl")
@@ -544,6 +577,156 @@ def test_debug(main, mocker):
     sys.settrace(trace_function)
 
 
+code_debug_steps = """def f(x):
+    y = x + 1
+    return y
+
+a = f(1)
+for i in range(3):
+    b = f(i)
+c = 3
+"""
+
+
+@pytest.fixture(params=["monitoring", "settrace"])
+def debug_script(request, mocker):
+    """Runs a script in the debugger with the given commands at each pause"""
+
+    from types import SimpleNamespace
+    from cq_editor.widgets import debugger as debugger_module
+
+    if request.param == "monitoring":
+        if not debugger_module.MONITORING:
+            pytest.skip("sys.monitoring requires Python 3.12")
+    else:
+        mocker.patch.object(debugger_module, "MONITORING", False)
+
+    class ScriptDebugger(debugger_module.Debugger):
+        def __init__(self, script, breakpoints):
+            super().__init__(None)
+            self._script = script
+            self._script_breakpoints = breakpoints
+
+        def get_current_script(self):
+            return self._script
+
+        def get_current_script_path(self):
+            return None
+
+        def get_breakpoints(self):
+            return self._script_breakpoints
+
+    def run(commands, breakpoints=(), script=code_debug_steps):
+
+        debugger = ScriptDebugger(script, list(breakpoints))
+        result = SimpleNamespace(paused=[], traced=[], namespace={})
+
+        lines, frame_locals = [], []
+        debugger.sigLineChanged.connect(lines.append)
+        debugger.sigLocalsChanged.connect(frame_locals.append)
+        debugger.sigLocals.connect(result.namespace.update)
+
+        def pause(state):
+            result.paused.append((lines[-1], frame_locals[-1].get("x")))
+            result.traced.append(sys.gettrace() == debugger.trace_callback)
+            debugger.debug_cmd(state)
+
+        patch_debugger(debugger, event_loop([partial(pause, s) for s in commands]))
+
+        trace_function = sys.gettrace()
+        try:
+            debugger.debug(True)
+        finally:
+            sys.settrace(trace_function)
+
+        return result
+
+    run.backend = request.param
+
+    return run
+
+
+def test_debug_step(debug_script):
+
+    from cq_editor.widgets.debugger import DbgState
+
+    # stepping does not enter the calls
+    result = debug_script([DbgState.STEP] * 9 + [DbgState.CONT])
+
+    assert [line for line, _ in result.paused] == [1, 5, 6, 7, 6, 7, 6, 7, 6, 8]
+    assert result.namespace["c"] == 3
+    assert all(result.traced) == (debug_script.backend == "settrace")
+
+    # stepping into a call and back to the caller
+    result = debug_script(
+        [DbgState.STEP, DbgState.STEP_IN, DbgState.STEP, DbgState.STEP, DbgState.CONT]
+    )
+
+    assert result.paused == [(1, None), (5, None), (2, 1), (3, 1), (6, None)]
+    assert result.namespace["b"] == 3
+
+
+def test_debug_breakpoints(debug_script):
+
+    from cq_editor.widgets.debugger import DbgState
+
+    # continue without breakpoints runs the script to the end
+    result = debug_script([DbgState.CONT] * 2)
+
+    assert result.paused == [(1, None)]
+    assert result.namespace["c"] == 3
+
+    # every call stops at the breakpoint
+    result = debug_script([DbgState.CONT] * 6, [(2, None)])
+
+    assert result.paused == [(1, None), (2, 1), (2, 0), (2, 1), (2, 2)]
+    assert result.namespace["c"] == 3
+
+    # conditional breakpoints
+    result = debug_script([DbgState.CONT] * 3, [(2, "x == 2")])
+
+    assert result.paused == [(1, None), (2, 2)]
+
+    result = debug_script([DbgState.CONT] * 3, [(7, "i == 1"), (8, "i == 0")])
+
+    assert [line for line, _ in result.paused] == [1, 7]
+    assert result.namespace["i"] == 2
+
+    # a failing condition stops like a plain breakpoint
+    result = debug_script([DbgState.CONT] * 6, [(3, "undefined_name")])
+
+    assert [line for line, _ in result.paused] == [1, 3, 3, 3, 3]
+
+    # step after a breakpoint in a called function
+    result = debug_script(
+        [DbgState.CONT, DbgState.STEP, DbgState.STEP, DbgState.CONT], [(2, "x == 0")]
+    )
+
+    assert result.paused == [(1, None), (2, 0), (3, 0), (6, None)]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="requires sys.monitoring")
+def test_debug_monitoring_fallback(debug_script):
+
+    from cq_editor.widgets.debugger import DbgState
+
+    if debug_script.backend != "monitoring":
+        pytest.skip("settrace is already tested")
+
+    tool = sys.monitoring.DEBUGGER_ID
+    sys.monitoring.use_tool_id(tool, "other debugger")
+
+    try:
+        result = debug_script([DbgState.CONT] * 3, [(2, "x == 2")])
+
+        # the debugger falls back to settrace and leaves the tool id alone
+        assert result.paused == [(1, None), (2, 2)]
+        assert all(result.traced)
+        assert sys.monitoring.get_tool(tool) == "other debugger"
+    finally:
+        sys.monitoring.free_tool_id(tool)
+
+
 code_err1 = """import cadquery as cq
 (
 result = cq.Workplane("XY" ).box(3, 3, 0.5).edges("|Z").fillet(0.125)
@@ -924,6 +1107,82 @@ def test_search(editor):
     qtbot.keyClick(editor, Qt.Key_F3, modifier=Qt.AltModifier)
 
 
+def test_search_incremental(editor):
+
+    qtbot, editor = editor
+    search = editor.search_widget
+
+    n_lines = 3 * search.SEARCH_BATCH
+    editor.set_text(
+        "".join(f"box{i} = cq.Workplane().box({i}, 1, 1)\n" for i in range(n_lines))
+    )
+    search.show_search()
+
+    # the first batch is found right away, the rest in the background
+    search.on_search_text_changed("box")
+    assert search.searching
+    assert search.match_label.text() == f"1 of {search.SEARCH_BATCH}+"
+
+    # only the matches in the viewport are highlighted
+    selections = editor.extraSelections()
+    assert 0 < len(selections) < 100
+    assert selections[0].cursor.selectedText() == "box"
+
+    qtbot.waitUntil(lambda: not search.searching)
+    assert search.match_label.text() == f"1 of {2 * n_lines}"
+
+    editor.verticalScrollBar().setValue(editor.verticalScrollBar().maximum())
+    assert editor.extraSelections()[-1].cursor.blockNumber() >= n_lines - 1
+
+    # wrapping around finds the last match
+    search.on_search_text_changed("box")
+    search.find_previous()
+    assert not search.searching
+    assert search.match_label.text() == f"{2 * n_lines} of {2 * n_lines}"
+
+    # whole words and regular expressions
+    search.word_button.setChecked(True)
+    search.on_search_text_changed("box1")
+    assert search.match_label.text() == "1 of 1"
+
+    search.regex_button.setChecked(True)
+    search.on_search_text_changed(r"box\(1\d")
+    assert search.match_label.text() == "1 of 10"
+
+    search.on_search_text_changed(r"box\(1\d*")
+    qtbot.waitUntil(lambda: search.match_label.text() == "1 of 6111")
+
+    search.on_search_text_changed("box(")
+    assert search.match_label.text() == "Invalid regex"
+    assert not search.next_button.isEnabled()
+
+    # edits are searched again without moving the cursor
+    search.regex_button.setChecked(False)
+    search.word_button.setChecked(False)
+    editor.set_text("a = 1\nb = 2\n")
+    search.search_input.setText("= 2")
+    assert search.match_label.text() == "1 of 1"
+
+    cursor = editor.textCursor()
+    cursor.setPosition(0)
+    editor.setTextCursor(cursor)
+    cursor.insertText("c = 2\n")
+
+    qtbot.waitUntil(lambda: search.match_label.text() == "2 of 2")
+    assert editor.textCursor().position() == len("c = 2\n")
+
+    # characters outside of the BMP take two positions in the document
+    editor.set_text("# \U0001f642\U0001f642 box\nresult = box\n")
+    search.search_input.setText("")
+    search.search_input.setText("box")
+    assert search.match_label.text() == "1 of 2"
+    assert editor.textCursor().selectedText() == "box"
+
+    search.find_next()
+    assert editor.textCursor().selectedText() == "box"
+    assert all(s.cursor.selectedText() == "box" for s in editor.extraSelections())
+
+
 def test_line_number_area(editor):
     """
     Tests to make sure the line number area on the left of the editor is working correctly.
@@ -1071,6 +1330,42 @@ def test_preserve_properties(main):
     # assert props["Alpha"] == 0.5
 
 
+code_reconcile = """import cadquery as cq
+a = cq.Workplane().box(1, 1, 1)
+b = cq.Workplane().sphere({r})
+show_object(a, name="a")
+show_object(b, name="b")
+"""
+
+
+def test_redisplay_changed_only(main):
+    qtbot, win = main
+
+    editor = win.components["editor"]
+    debugger = win.components["debugger"]
+    object_tree = win.components["object_tree"]
+    object_tree.preferences["Redisplay changed objects only"] = True
+
+    editor.set_text(code_reconcile.format(r=1))
+    debugger._actions["Run"][0].triggered.emit()
+
+    assert object_tree.CQ.childCount() == 2
+    a, b = object_tree.CQ.child(0), object_tree.CQ.child(1)
+
+    editor.set_text(code_reconcile.format(r=2))
+    with qtbot.waitSignal(object_tree.sigObjectsRemoved) as blocker:
+        debugger._actions["Run"][0].triggered.emit()
+
+    # unchanged object is kept, changed one is replaced
+    assert blocker.args[0] == [b.ais]
+    assert object_tree.CQ.childCount() == 2
+    assert object_tree.CQ.child(0) is a
+    assert object_tree.CQ.child(1) is not b
+    assert object_tree.CQ.child(1).properties["Name"] == "b"
+
+    object_tree.preferences["Redisplay changed objects only"] = False
+
+
 def test_selection(main_multi, mocker):
 
     qtbot, win = main_multi
@@ -1086,14 +1381,16 @@ def test_selection(main_multi, mocker):
     obj1.setSelected(True)
     obj2.setSelected(True)
 
-    object_tree._export_STEP_action.triggered.emit()
+    with qtbot.waitSignal(object_tree.sigExportFinished, timeout=30000):
+        object_tree._export_STEP_action.triggered.emit()
     imported = cq.importers.importStep("out.step")
     assert len(imported.solids().vals()) == 2
 
     # export with one selected objects
     obj2.setSelected(False)
 
-    object_tree._export_STEP_action.triggered.emit()
+    with qtbot.waitSignal(object_tree.sigExportFinished, timeout=30000):
+        object_tree._export_STEP_action.triggered.emit()
     imported = cq.importers.importStep("out.step")
     assert len(imported.solids().vals()) == 1
 
@@ -1101,7 +1398,8 @@ def test_selection(main_multi, mocker):
     obj1.setSelected(False)
     CQ.setSelected(True)
 
-    object_tree._export_STEP_action.triggered.emit()
+    with qtbot.waitSignal(object_tree.sigExportFinished, timeout=30000):
+        object_tree._export_STEP_action.triggered.emit()
     imported = cq.importers.importStep("out.step")
     assert len(imported.solids().vals()) == 2
 
@@ -1152,10 +1450,15 @@ def test_closing(main_clean_do_not_close):
     win.close()
     assert win.isVisible()
 
-    # should quit
+    # should quit and stop the render worker
     editor.reset_modified()
     win.close()
     assert not win.isVisible()
+    assert win.components["debugger"]._worker._process is None
+
+    from cq_editor.completion import COMPLETER
+
+    assert COMPLETER._process is None
 
 
 def test_check_for_updates(main, mocker):
@@ -1888,9 +2191,9 @@ def test_autocomplete(main):
     # Set the cursor position to the end of the text
     editor.set_cursor_position(len(editor.get_text_with_eol()))
 
-    # Trigger auto-complete
+    # Trigger auto-complete, the completions are computed in the background
     editor._trigger_autocomplete()
-    qtbot.wait(100)
+    qtbot.waitUntil(lambda: len(editor.completion_list) > 0, timeout=10000)
 
     # Check that the completion list has two items
     assert len(editor.completion_list) == 2
@@ -1953,10 +2256,7 @@ def test_autocomplete_keystrokes(main):
 
     # Inject the Alt+/ key combo
     qtbot.keyClick(editor, Qt.Key_Slash, modifier=Qt.AltModifier)
-    qtbot.wait(250)
-
-    # Check that the completion list is visible
-    assert editor.completion_list.isVisible()
+    qtbot.waitUntil(editor.completion_list.isVisible, timeout=10000)
 
     # Select the first item in the completion list with the Return key
     qtbot.keyClick(editor.completion_list, Qt.Key_Return)
@@ -1972,10 +2272,7 @@ def test_autocomplete_keystrokes(main):
 
     # Inject the Alt+/ key combo
     qtbot.keyClick(editor, Qt.Key_Slash, modifier=Qt.AltModifier)
-    qtbot.wait(250)
-
-    # Check that the completion list is visible
-    assert editor.completion_list.isVisible()
+    qtbot.waitUntil(editor.completion_list.isVisible, timeout=10000)
 
     # Select the first item in the completion list with the Tab key
     qtbot.keyClick(editor.completion_list, Qt.Key_Tab)
@@ -1992,10 +2289,7 @@ def test_autocomplete_keystrokes(main):
 
     # Trigger autocomplete again
     qtbot.keyClick(editor, Qt.Key_Slash, modifier=Qt.AltModifier)
-    qtbot.wait(250)
-
-    # Check that the completion list is visible
-    assert editor.completion_list.isVisible()
+    qtbot.waitUntil(editor.completion_list.isVisible, timeout=10000)
 
     # Make sure the Escape key closes the completion list
     qtbot.keyClick(editor.completion_list, Qt.Key_Escape)
@@ -2004,7 +2298,7 @@ def test_autocomplete_keystrokes(main):
 
     # Trigger autocomplete again
     qtbot.keyClick(editor, Qt.Key_Slash, modifier=Qt.AltModifier)
-    qtbot.wait(250)
+    qtbot.waitUntil(editor.completion_list.isVisible, timeout=10000)
 
     # Trigger a key press that is not handled by the completion list
     qtbot.keyClick(editor.completion_list, Qt.Key_A)
@@ -2151,3 +2445,1401 @@ def test_editor_autoreload(editor):
 #     with qtbot.waitSignal(editor.triggerRerender, timeout=TIMEOUT):
 #         # modify file - NB: separate process is needed to avoid Windows quirks
 #         modify_file(code_nested_bottom, "test_nested_bottom.py")
+
+
+code_sleep = """import time
+time.sleep(60)
+"""
+
+
+def test_render_worker(main):
+
+    qtbot, win = main
+
+    obj_tree_comp = win.components["object_tree"]
+    editor = win.components["editor"]
+    debugger = win.components["debugger"]
+    traceback_view = win.components["traceback_viewer"]
+
+    debugger.preferences["Render in worker process"] = True
+
+    # results are transferred back from the worker
+    editor.set_text(code_show_Workplane_named)
+    with qtbot.waitSignal(debugger._worker.sigFinished, timeout=60000):
+        debugger._actions["Run"][0].triggered.emit()
+
+    assert obj_tree_comp.CQ.childCount() == 1
+    assert obj_tree_comp.CQ.child(0).text(0) == "test"
+
+    # errors are reported in the traceback viewer
+    editor.set_text(code_err2)
+    with qtbot.waitSignal(debugger._worker.sigFinished, timeout=60000):
+        debugger._actions["Run"][0].triggered.emit()
+
+    assert "NameError" in traceback_view.tree.topLevelItem(0).text(0)
+
+    # long renders can be cancelled
+    editor.set_text(code_sleep)
+    debugger._actions["Run"][0].triggered.emit()
+
+    assert debugger._cancel_action.isEnabled()
+    debugger._cancel_action.triggered.emit()
+    assert not debugger._cancel_action.isEnabled()
+
+    debugger.preferences["Render in worker process"] = False
+
+
+def test_render_worker_serialization():
+
+    from cq_editor.render_worker import run_job, deserialize_objects
+
+    status, payload = run_job(dict(script=code_show_Workplane_named))
+    assert status == "ok"
+
+    objects = deserialize_objects(payload)
+    assert list(objects) == ["test"]
+    assert objects["test"].shape.isValid()
+
+    status, payload = run_job(dict(script=code_err2))
+    assert status == "error"
+    assert payload[0] == "NameError"
+
+    # assemblies keep their structure, locations and colors
+    script = (
+        "import cadquery as cq\n"
+        "box = cq.Workplane().box(1, 1, 1)\n"
+        "sub = cq.Assembly(name='sub', loc=cq.Location((0, 0, 5)))\n"
+        "sub.add(box, name='b1', color=cq.Color('red'))\n"
+        "sub.add(box, name='b2', loc=cq.Location((2, 0, 0)))\n"
+        "assy = cq.Assembly(name='root', color=cq.Color('blue'))\n"
+        "assy.add(sub)\n"
+        "show_object(assy)\n"
+    )
+
+    status, payload = run_job(dict(script=script))
+    assert status == "ok"
+
+    assy = deserialize_objects(payload)["assy"].shape
+    assert isinstance(assy, cq.Assembly)
+    assert list(assy.objects) == ["root", "sub/b1", "sub/b2", "sub"]
+    assert assy.color.toTuple() == cq.Color("blue").toTuple()
+    assert assy.objects["sub/b1"].color.toTuple() == cq.Color("red").toTuple()
+    assert assy.objects["sub/b2"].color is None
+    assert assy.toCompound().Center().toTuple() == pytest.approx((1, 0, 5))
+
+    # the shared part is sent once
+    b1, b2 = assy.objects["sub/b1"].obj, assy.objects["sub/b2"].obj
+    assert b1.isSame(b2)
+
+
+def test_render_worker_shutdown(qtbot):
+
+    from cq_editor.widgets.debugger import RenderWorker
+
+    worker = RenderWorker()
+
+    with qtbot.waitSignal(worker.sigFinished, timeout=60000) as blocker:
+        worker.submit(dict(script=code))
+
+    assert blocker.args[0][0] == "ok"
+
+    process = worker._process
+    worker.shutdown()
+
+    # the idle worker exits on its own
+    assert process.exitcode == 0
+    assert worker._process is None and not worker.busy
+
+
+def test_mesh_cache():
+
+    from cq_editor.cq_utils import MeshCache, make_AIS, MESH_CACHE, tessellate_many
+
+    cache = MeshCache()
+
+    s1 = cq.Workplane().box(1, 1, 1).edges().fillet(0.1).val().wrapped
+    s2 = cq.Workplane().box(1, 1, 1).edges().fillet(0.1).val().wrapped
+
+    # identical geometry is meshed only once
+    assert cache.get(s1) is s1
+    assert cache.get(s2) is s1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # sizes are accounted once the shapes are meshed
+    cache.refresh()
+    assert cache.size == cache.NOMINAL_SIZE
+
+    tessellate_many([s1], 1e-2, 0.5)
+    cache.refresh()
+    assert cache.size > cache.NOMINAL_SIZE
+
+    # shapes without faces count with a nominal size
+    wire = cq.Workplane().rect(1, 1).val().wrapped
+    size = cache.size
+    cache.get(wire)
+    cache.refresh()
+    assert cache.size == size + cache.NOMINAL_SIZE
+
+    # finer meshes of a cached shape are accounted
+    size = cache.size
+    tessellate_many([s1], cache.deviation, cache.angular_deviation)
+    cache.remeasure(s1)
+    assert cache.size > size
+
+    # changing the deviation invalidates the key
+    cache.configure(1e-3, 0.1, 256)
+    assert cache.get(s2) is s2
+    assert len(cache) == 3
+
+    # budget enforces LRU eviction
+    cache.configure(1e-3, 0.1, 0)
+    assert len(cache) == 0 and not cache.enabled
+
+    # make_AIS returns a display shape consistent with the AIS object
+    ais, shape = make_AIS(cq.Workplane().box(3, 3, 3))
+    ais2, shape2 = make_AIS(cq.Workplane().box(3, 3, 3))
+    assert ais2.Shape().IsEqual(shape2.wrapped)
+    assert shape.wrapped.IsSame(shape2.wrapped) == MESH_CACHE.enabled
+
+
+def test_object_hash(mocker):
+
+    from cq_editor import cq_utils
+
+    spy = mocker.spy(cq_utils, "shape_hash")
+
+    box = cq.Workplane().box(1, 1, 1)
+    digest = cq_utils.object_hash(box)
+
+    # the hash is computed once for the fingerprint and the mesh cache key
+    assert cq_utils.geometry_hash(box)[0] == digest
+    cq_utils.make_AIS(box)
+    assert spy.call_count == 1
+
+    # objects changed in place are hashed again
+    box.val().move(cq.Location(cq.Vector(1, 0, 0)))
+    assert cq_utils.object_hash(box) != digest
+    assert spy.call_count == 2
+
+    assert cq_utils.object_hash(cq.Assembly()) is None
+
+
+def test_render_triangles():
+
+    from types import SimpleNamespace
+    from cq_editor.cq_utils import make_AIS, tessellate_many, MESH_CACHE
+    from cq_editor.widgets.debugger import Debugger
+
+    def render():
+        obj = cq.Workplane().box(1.5, 2.5, 3.5).edges().fillet(0.2)
+        ais, _ = make_AIS(obj)
+        tessellate_many([ais.Shape()], MESH_CACHE.deviation, 0.1)
+
+        return Debugger._triangles({"obj": SimpleNamespace(shape=obj, options={})})
+
+    # the triangles of the cached mesh are counted on a re-render
+    first = render()
+    assert first > 0
+    assert render() == first
+
+
+code_statements = """import cadquery as cq
+base = cq.Workplane().box({a}, 1, 1)
+tags = [f"t{{i}}" for i in range(3)]
+result = base.faces(">Z").workplane().hole({b})
+show_object(result)
+"""
+
+
+def test_statement_cache():
+
+    from random import seed
+    from cq_editor.script_runner import (
+        RANDOM_SEED,
+        StatementCache,
+        compile_script,
+        inject_locals,
+        exec_incremental,
+    )
+
+    cache = StatementCache(size=3)
+
+    def run(**kwargs):
+        seed(RANDOM_SEED)
+        _, module = compile_script(code_statements.format(**kwargs))
+        cq_objects, _ = inject_locals(module)
+        rv = exec_incremental(
+            code_statements.format(**kwargs),
+            module.__dict__,
+            cache,
+            reload_modules=False,
+        )
+
+        return rv, module.__dict__, cq_objects
+
+    (hits, misses), ns1, objs = run(a=1, b=0.1)
+    assert (hits, misses) == (0, 3)
+    assert "result" in objs
+
+    # only the tail is re-executed
+    (hits, misses), ns2, _ = run(a=1, b=0.2)
+    assert (hits, misses) == (2, 1)
+    assert ns2["base"] is ns1["base"]
+    assert ns2["result"] is not ns1["result"]
+
+    # changed inputs propagate
+    (hits, misses), ns3, _ = run(a=2, b=0.2)
+    assert (hits, misses) == (1, 2)
+    assert ns3["base"] is not ns1["base"]
+
+    assert len(cache) == 3
+
+
+code_mutating = """import cadquery as cq
+box = cq.Workplane().box(1, 1, 1)
+assy = cq.Assembly()
+assy.add(box, name="a")
+color = rand_color()
+moved = cq.Workplane().box(1, 1, 1).val()
+moved.move(cq.Location(cq.Vector(1, 0, 0)))
+other = rand_color()
+"""
+
+
+def test_statement_cache_mutation():
+
+    from random import seed
+    from cq_editor.script_runner import (
+        RANDOM_SEED,
+        StatementCache,
+        compile_script,
+        inject_locals,
+        exec_incremental,
+    )
+
+    cache = StatementCache()
+
+    def run():
+        seed(RANDOM_SEED)
+        _, module = compile_script(code_mutating)
+        inject_locals(module)
+        rv = exec_incremental(
+            code_mutating, module.__dict__, cache, reload_modules=False
+        )
+
+        return rv, module.__dict__
+
+    (hits, misses), ns1 = run()
+    assert (hits, misses) == (0, 5)
+
+    # objects changed in place are not reused
+    (hits, misses), ns2 = run()
+    assert (hits, misses) == (3, 2)
+    assert ns2["box"] is ns1["box"]
+    assert ns2["assy"] is not ns1["assy"]
+    assert [a.name for a in ns2["assy"].children] == ["a"]
+    assert ns2["moved"].Center().x == pytest.approx(1)
+
+    # the cached statements draw the same colors
+    assert ns2["color"] == ns1["color"]
+    assert ns2["other"] == ns1["other"]
+
+
+def test_statement_cache_functions():
+
+    from cq_editor.script_runner import StatementCache, exec_incremental
+
+    cache = StatementCache()
+
+    def run(script):
+        namespace = {}
+        rv = exec_incremental(script, namespace, cache, reload_modules=False)
+
+        return rv, namespace
+
+    script = "def make():\n    return L * 2\n\nL = 10\nr = make()\n"
+
+    (hits, misses), ns = run(script)
+    assert ns["r"] == 20
+
+    # the globals read by a function are inputs of the statements calling it
+    (hits, misses), ns = run(script.replace("L = 10", "L = 20"))
+    assert ns["r"] == 40
+    assert (hits, misses) == (0, 2)
+
+    (hits, misses), ns = run(script.replace("L = 10", "L = 20"))
+    assert ns["r"] == 40
+    assert (hits, misses) == (2, 0)
+
+    # also through other functions and lambdas
+    script = "f = lambda: g()\ndef g():\n    return L\n\nL = 1\nr = f()\n"
+
+    (hits, misses), ns = run(script)
+    assert ns["r"] == 1
+
+    (hits, misses), ns = run(script.replace("L = 1", "L = 2"))
+    assert ns["r"] == 2
+
+
+def test_batch(tmp_path):
+
+    from cq_editor.batch import main as batch_main
+
+    (tmp_path / "ok.py").write_text(code_show_Workplane_named)
+    (tmp_path / "err.py").write_text(code_err2)
+
+    out = tmp_path / "out"
+
+    rv = batch_main(
+        [str(tmp_path / "ok.py"), str(tmp_path / "err.py"), "-o", str(out), "-j", "1"]
+    )
+
+    assert rv == 1
+    assert (out / "ok.step").exists()
+
+    rv = batch_main(
+        [str(tmp_path / "ok.py"), "-o", str(out), "-j", "1", "-f", "stl", "--split"]
+    )
+
+    assert rv == 0
+    assert (out / "ok-test.stl").exists()
+
+    # inputs with the same name do not overwrite each other
+    for d in ("a", "b"):
+        (tmp_path / d).mkdir()
+        (tmp_path / d / "ok.py").write_text(code_show_Workplane_named)
+
+    out = tmp_path / "out_same_name"
+
+    rv = batch_main(
+        [
+            str(tmp_path / "a" / "ok.py"),
+            str(tmp_path / "b" / "ok.py"),
+            str(tmp_path / "ok.py"),
+        ]
+        + ["-o", str(out), "-j", "1"]
+    )
+
+    assert rv == 0
+    assert sorted(p.name for p in out.iterdir()) == [
+        "a_ok.step",
+        "b_ok.step",
+        "ok.step",
+    ]
+
+    # neither do objects with the same sanitized name
+    (tmp_path / "split.py").write_text(
+        "import cadquery as cq\n"
+        "show_object(cq.Workplane().box(1, 1, 1), name='a b')\n"
+        "show_object(cq.Workplane().sphere(1), name='a_b')\n"
+    )
+
+    rv = batch_main(
+        [str(tmp_path / "split.py"), "-o", str(out), "-j", "1", "-f", "brep", "--split"]
+    )
+
+    assert rv == 0
+    assert (out / "split-a_b.brep").exists()
+    assert (out / "split-a_b_2.brep").exists()
+
+
+def test_export_file_names(qtbot, mocker, tmp_path):
+
+    from types import SimpleNamespace
+    from PyQt5.QtWidgets import QWidget
+    from cq_editor.widgets.object_tree import ObjectTree
+
+    parent = QWidget()
+    qtbot.addWidget(parent)
+    object_tree = ObjectTree(parent)
+    object_tree.preferences["One file per object"] = True
+
+    box = cq.Workplane().box(1, 1, 1)
+    names = ["a/b", "a:b", "c"]
+    object_tree.addObjects(
+        {name: SimpleNamespace(shape=box, options={}) for name in names}
+    )
+    object_tree.CQ.setSelected(True)
+
+    mocker.patch(
+        "cq_editor.widgets.object_tree.get_save_filename",
+        return_value=str(tmp_path / "out.step"),
+    )
+    start = mocker.patch.object(object_tree._exporter, "start")
+
+    object_tree.export("step")
+
+    # object names are sanitized like the batch export file names
+    (jobs,) = start.call_args[0]
+    assert [Path(fname).name for _, _, fname, _ in jobs] == [
+        "out-a_b.step",
+        "out-a_b_2.step",
+        "out-c.step",
+    ]
+    assert all(Path(fname).parent == str(tmp_path) for _, _, fname, _ in jobs)
+
+
+def test_lazy_debug_display(qtbot):
+
+    from types import SimpleNamespace
+    from PyQt5.QtWidgets import QWidget
+    from cq_editor.widgets.object_tree import ObjectTree
+
+    parent = QWidget()
+    qtbot.addWidget(parent)
+    object_tree = ObjectTree(parent)
+    object_tree.preferences["Lazy display threshold (faces)"] = 50
+
+    box = cq.Workplane().box(1, 1, 1)
+    heavy = cq.Workplane().rarray(2, 2, 10, 10).box(1, 1, 1)
+
+    def objects(**kwargs):
+        return {k: SimpleNamespace(shape=v, options={}) for k, v in kwargs.items()}
+
+    # heavy objects are not displayed while stepping
+    with qtbot.waitSignal(object_tree.sigObjectsAdded[list, bool]) as blocker:
+        object_tree.addObjects(objects(a=box, h=heavy), True)
+
+    a, h = object_tree.CQ.child(0), object_tree.CQ.child(1)
+    assert blocker.args[0] == [a.ais]
+    assert h.ais is None and not h.checkState(0)
+
+    # unchanged objects are reused on the next step
+    with qtbot.waitSignal(object_tree.sigObjectsAdded[list]) as blocker:
+        object_tree.addObjects(objects(a=box, h=heavy, b=box.sphere(0.1)), True)
+
+    assert object_tree.CQ.child(0) is a
+    assert object_tree.CQ.child(1) is h
+    assert blocker.args[0] == [object_tree.CQ.child(2).ais]
+
+    # checking the item displays it with the batched display path
+    with qtbot.waitSignal(object_tree.sigObjectsAdded[list, bool]) as blocker:
+        h.setCheckState(0, Qt.Checked)
+
+    assert h.ais is not None
+    assert blocker.args == [[h.ais], False]
+
+    # an object moved in place is displayed again
+    moved = box.val().move(cq.Location(cq.Vector(1, 0, 0)))
+    objs = objects(a=moved, h=heavy)
+
+    with qtbot.waitSignal(object_tree.sigObjectsAdded[list]):
+        object_tree.addObjects(objs, True)
+
+    a = object_tree.CQ.child(0)
+
+    with qtbot.waitSignal(object_tree.sigObjectsAdded[list]) as blocker:
+        moved.move(cq.Location(cq.Vector(1, 0, 0)))
+        object_tree.addObjects(objs, True)
+
+    assert object_tree.CQ.child(0) is not a
+    assert blocker.args[0] == [object_tree.CQ.child(0).ais]
+
+
+def test_dxf_chain_walker(tmp_path):
+
+    import ezdxf
+    from cq_editor.widgets.editor import generate_cq_code
+
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+
+    # square written out of order and with one reversed edge
+    msp.add_line((0, 0), (1, 0))
+    msp.add_line((1, 1), (0, 1))
+    msp.add_line((1, 1), (1, 0))
+    msp.add_line((0, 1), (0, 0))
+    msp.add_circle((5, 5), 1)
+
+    fname = str(tmp_path / "square.dxf")
+    doc.saveas(fname)
+
+    assert generate_cq_code(fname) == (
+        "cq.Workplane('XY')"
+        ".moveTo(0.0, 0.0).lineTo(1.0, 0.0).lineTo(1.0, 1.0)"
+        ".lineTo(0.0, 1.0).lineTo(0.0, 0.0).close()"
+        ".moveTo(5.0, 5.0).circle(1.0)"
+    )
+
+
+def test_dxf_data_file(tmp_path):
+
+    import ezdxf
+    from cq_editor.widgets.editor import generate_cq_code, generate_dxf_data
+    from cq_editor.script_runner import run_script
+
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    msp.add_lwpolyline(
+        [(0, 0, 0, 0, 0.5), (10, 0, 0, 0, 0), (10, 10, 0, 0, 0), (0, 10)],
+        format="xyseb",
+        close=True,
+    )
+    msp.add_circle((5, 5), 1)
+
+    fname = str(tmp_path / "part.dxf")
+    doc.saveas(fname)
+
+    code = generate_dxf_data(fname)
+    assert code == f'load_dxf(r"{fname}.json")'
+
+    # same geometry as the inline code
+    objs, _ = run_script(f"show_object({code}.extrude(1), 'data')")
+    ref = eval(generate_cq_code(fname)).extrude(1)
+
+    assert objs["data"].shape.val().Volume() == pytest.approx(ref.val().Volume())
+
+
+def test_dxf_geometry_kernel(tmp_path):
+
+    import ezdxf
+    import numpy as np
+    from random import Random
+    from cq_editor.widgets.editor import generate_cq_code
+    from cq_editor.dxf_geometry import (
+        clean,
+        clean_array,
+        arc_midpoint,
+        arc_points,
+        flattening,
+        flatten_splines,
+        dedupe_points,
+    )
+
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    msp.add_arc((0, 0), 2, 0, 90)
+    msp.add_line((0, 2), (-2, 0))
+    spline = msp.add_spline([(-2, 0), (-1, -1.5), (1, -1), (2, 0)])
+
+    fname = str(tmp_path / "curves.dxf")
+    doc.saveas(fname)
+
+    # output of the scalar implementation
+    assert generate_cq_code(fname) == (
+        "cq.Workplane('XY').moveTo(2.0, 0.0)"
+        ".threePointArc((1.4142, 1.4142), (0.0, 2.0)).lineTo(-2.0, 0.0)"
+        ".spline([(-2.0, 0.0), (-1.8028, -0.4753), (-1.5845, -0.9104), "
+        "(-1.3239, -1.2654), (-1.0, -1.5), (-0.5385, -1.5862), "
+        "(-0.0174, -1.5041), (0.5124, -1.2949), (1.0, -1.0), "
+        "(1.2883, -0.7682), (1.5438, -0.5208), (1.7774, -0.263), "
+        "(2.0, 0.0)]).close()"
+    )
+
+    # rounding boundaries, signed zeros and the zero snapping
+    values = [0.00005, -0.00005, 1.00005, 2.675, -0.00004, 1e-10, -1e-10, 1e-9]
+    rng = Random(0)
+    values += [rng.uniform(-100, 100) for _ in range(1000)]
+    values += [round(rng.uniform(-100, 100), 5) for _ in range(1000)]
+
+    assert [str(v) for v in clean_array(values).tolist()] == [
+        str(clean(v)) for v in values
+    ]
+
+    # batched arcs against the scalar evaluation
+    arcs = [
+        (
+            (rng.uniform(-50, 50), rng.uniform(-50, 50)),
+            rng.uniform(0.1, 50),
+            rng.choice([0, 30, 45, 90, 180, rng.uniform(0, 360)]),
+            rng.choice([0, 60, 90, 270, rng.uniform(0, 360)]),
+        )
+        for _ in range(1000)
+    ]
+    starts, ends, mids = arc_points(*zip(*arcs))
+
+    for (c, r, a1, a2), start, end, mid in zip(arcs, starts, ends, mids):
+        assert mid == arc_midpoint(c, r, a1, a2)
+        assert start == arc_midpoint(c, r, a1, a1)
+        assert end == arc_midpoint(c, r, a2, a2)
+
+    # same points as ezdxf
+    tool = spline.construction_tool()
+    assert flattening(tool, 0.1) == list(tool.flattening(0.1))
+    assert flatten_splines([spline])[0] == [
+        (clean(p.x), clean(p.y)) for p in tool.flattening(0.1)
+    ]
+
+    # coincident points are dropped, the end point is kept
+    pts = np.array([(0, 0), (0, 0), (1, 0), (1, 1), (1, 1)], dtype=float)
+    assert dedupe_points(pts).tolist() == [[0, 0], [1, 0], [1, 1]]
+
+
+def test_wire_walker(tmp_path, monkeypatch):
+
+    import numpy as np
+    from cq_editor.widgets import wire_walker
+    from cq_editor.widgets.wire_walker import generate_wire_code
+
+    fname = str(tmp_path / "part.step")
+    cq.exporters.export(
+        cq.Workplane().box(10, 10, 2).faces(">Z").workplane().hole(4), fname
+    )
+
+    code = generate_wire_code(fname, jobs=1)
+    assert code.count("cq.Workplane(") == len(
+        cq.importers.importStep(fname).wires().vals()
+    )
+
+    # curves get more points with a smaller deflection
+    assert len(generate_wire_code(fname, deflection=0.01, jobs=1)) > len(code)
+
+    # the pool produces the same code in the same order
+    monkeypatch.setattr(wire_walker, "PARALLEL_MIN_WIRES", 0)
+    assert generate_wire_code(fname, jobs=2) == code
+
+    # vectorized dedupe against cq.Vector equality
+    rng = np.random.default_rng(0)
+    pts = rng.uniform(-100, 100, (200, 3))
+    pts[1::3] = pts[::3][: len(pts[1::3])] + rng.uniform(-2e-5, 2e-5, (67, 3))
+    pts[50:60] = 0
+    pts[100:110] = pts[100] * 1.000001
+
+    ref = []
+    for p in map(cq.Vector, pts.tolist()):
+        if not ref or ref[-1] != p:
+            ref.append(p)
+
+    assert wire_walker._dedupe(pts.tolist()) == [p.toTuple() for p in ref]
+
+
+def test_import_cache(tmp_path):
+
+    from cq_editor.import_cache import ImportCache, cached_imports
+
+    fname = tmp_path / "part.step"
+    box = cq.Workplane().box(1, 2, 3)
+    cq.exporters.export(box, str(fname))
+
+    cache = ImportCache(cache_dir=tmp_path / "cache")
+
+    wp = cache.import_step(fname)
+    assert wp.val().Volume() == pytest.approx(6)
+    assert cache.misses == 1
+
+    wp2 = cache.import_step(fname)
+    assert cache.hits == 1
+    assert wp2.val().wrapped.IsSame(wp.val().wrapped)
+    assert wp2.val() is not wp.val()
+
+    # the BREP on disk is shared between sessions
+    cache2 = ImportCache(cache_dir=tmp_path / "cache")
+    assert cache2.import_step(fname).val().Volume() == pytest.approx(6)
+    assert (cache2.disk_hits, cache2.misses) == (1, 0)
+
+    # modified files are parsed again
+    cq.exporters.export(cq.Workplane().box(2, 4, 6), str(fname))
+    assert cache2.import_step(fname).val().Volume() == pytest.approx(48)
+    assert cache2.misses == 1
+
+    # scripts use the cache through cq.importers
+    original = cq.importers.importStep
+
+    with cached_imports(cache2):
+        wp = cq.importers.importShape("STEP", str(fname))
+
+    assert cache2.hits == 1
+    assert cq.importers.importStep is original
+    assert wp.val().Volume() == pytest.approx(48)
+
+
+code_profile = """import cadquery as cq
+a = cq.Workplane().box(1, 1, 1)
+
+b = a.faces(">Z").workplane().hole(0.5)
+show_object(b)
+"""
+
+
+def test_render_profile():
+
+    from cq_editor.profiler import RenderProfile, profiling, span
+    from cq_editor.script_runner import exec_profiled
+
+    profile = RenderProfile()
+    namespace = {"show_object": lambda *args: None}
+
+    with profiling(profile):
+        exec_profiled(code_profile, namespace)
+
+    # Workplane is restored
+    assert not hasattr(cq.Workplane.box, "__wrapped__")
+
+    lines = {s.lineno: s.name for s in profile.spans if s.category == "line"}
+    assert lines == {
+        1: "import cadquery as cq",
+        2: "a = cq.Workplane().box(1, 1, 1)",
+        4: 'b = a.faces(">Z").workplane().hole(0.5)',
+        5: "show_object(b)",
+    }
+
+    ops = {(s.name, s.lineno) for s in profile.spans if s.category == "workplane"}
+    assert {("box", 2), ("faces", 4), ("workplane", 4), ("hole", 4)} <= ops
+
+    # nested spans are not counted twice in the self time
+    for s in profile.spans:
+        assert 0 <= s.self_time <= s.end - s.start
+
+    summary = profile.summary()
+    assert summary[0][4] == max(row[4] for row in summary)
+    assert sum(row[5] for row in summary) == pytest.approx(
+        sum(s.end - s.start for s in profile.spans if s.depth == 0)
+    )
+
+    # no-op outside of profiling
+    with span("line", "x", 1):
+        pass
+    assert len(profile.spans) == sum(row[3] for row in summary)
+
+
+def test_profile_viewer(qtbot):
+
+    from cq_editor.profiler import RenderProfile
+    from cq_editor.widgets.profile_viewer import ProfileViewer
+
+    profile = RenderProfile()
+
+    with profile.span("line", "a = slow()", 3):
+        with profile.span("workplane", "box"):
+            pass
+    with profile.span("line", "b = fast()", 4):
+        pass
+
+    viewer = ProfileViewer()
+    qtbot.addWidget(viewer)
+    viewer.addProfile(profile)
+
+    assert viewer.table.topLevelItemCount() == 3
+
+    # numeric sorting on the line column
+    viewer.table.sortItems(2, Qt.AscendingOrder)
+    assert [viewer.table.topLevelItem(i).text(2) for i in range(3)] == ["3", "3", "4"]
+
+    # rows and flame chart bars are linked to the editor
+    with qtbot.waitSignal(viewer.sigHighlightLine) as blocker:
+        viewer.table.setCurrentItem(viewer.table.topLevelItem(2))
+    assert blocker.args == [4]
+
+    with qtbot.waitSignal(viewer.sigHighlightLine) as blocker:
+        viewer.chart.sigSpanClicked.emit(profile.spans[0])
+    assert blocker.args == [3]
+
+    assert viewer.chart.minimumHeight() == 2 * viewer.chart.ROW_HEIGHT
+
+
+def test_profile_render(main):
+
+    qtbot, win = main
+
+    editor = win.components["editor"]
+    debugger = win.components["debugger"]
+    profiler = win.components["profiler"]
+
+    debugger.preferences["Profile renders"] = True
+    editor.set_text(code_profile)
+
+    with qtbot.waitSignal(debugger.sigProfile) as blocker:
+        debugger._actions["Run"][0].triggered.emit()
+
+    categories = {s.category for s in blocker.args[0].spans}
+    assert {"compile", "line", "workplane", "make_AIS", "display"} <= categories
+    assert profiler.table.topLevelItemCount() > 0
+
+    debugger.preferences["Profile renders"] = False
+
+
+def test_render_history(tmp_path, qtbot):
+
+    from cq_editor.render_history import (
+        RenderHistory,
+        RenderRecord,
+        regressions,
+        peak_memory,
+    )
+    from cq_editor.widgets.profile_viewer import HistoryChart
+
+    history = RenderHistory(tmp_path / "history.sqlite", size=4)
+
+    def record(wall_time, script="x"):
+        return history.record("a.py", script, wall_time, None, 1, 12)
+
+    for t in (0.1, 0.11, 0.09, 0.1, 0.25):
+        records = record(t)
+
+    # ring buffer per file
+    assert [r.wall_time for r in records] == [0.11, 0.09, 0.1, 0.25]
+    assert history.records("b.py") == []
+    assert records[-1].triangles == 12
+
+    # 2x slower than the median of the previous renders
+    assert regressions(records) == [3]
+
+    # fast renders are never flagged
+    fast = [RenderRecord(0, "", t, None, 0, 0) for t in (0.001, 0.01)]
+    assert regressions(fast) == []
+
+    # persisted
+    history.close()
+    assert len(RenderHistory(tmp_path / "history.sqlite").records("a.py")) == 4
+
+    # read by the debugger for a profiler created later
+    from cq_editor.widgets.debugger import Debugger
+
+    debugger = Debugger(None)
+    debugger._history = RenderHistory(tmp_path / "history.sqlite")
+    debugger.get_current_script_path = lambda: "a.py"
+
+    assert debugger.history() == records
+
+    assert peak_memory() is None or peak_memory() > 0
+
+    chart = HistoryChart()
+    qtbot.addWidget(chart)
+    chart.setRecords(records)
+
+    assert "1 of 4" in chart.label.text()
+
+
+def test_render_history_main(main, tmp_path):
+
+    from cq_editor.render_history import RenderHistory
+
+    qtbot, win = main
+
+    editor = win.components["editor"]
+    debugger = win.components["debugger"]
+
+    debugger._history = RenderHistory(tmp_path / "history.sqlite")
+    editor.set_text(code)
+
+    # recording the history does not create the profiler
+    pending = "profiler" in win._lazy
+
+    with qtbot.waitSignal(debugger.sigHistory) as blocker:
+        debugger._actions["Run"][0].triggered.emit()
+
+    assert ("profiler" in win._lazy) == pending
+
+    (record,) = blocker.args[0]
+    assert record.objects == 1
+    assert record.triangles > 0
+
+    # the profiler reads the history when it is created
+    profiler = win.components["profiler"]
+    assert "Last render" in profiler.history.label.text()
+
+    # failed renders are not recorded
+    editor.set_text(code_err1)
+    debugger._actions["Run"][0].triggered.emit()
+
+    assert len(debugger._history.records(None)) == 1
+
+
+def test_lod_deviation():
+
+    from math import log2
+
+    from cq_editor.cq_utils import lod_deviation, shape_size
+
+    box = cq.Workplane().box(1, 2, 4).val().wrapped
+    assert shape_size(box) == pytest.approx(4)
+
+    finest, coarsest = 1e-5, 1e-3
+
+    # far away: coarse mesh, close up: finest mesh
+    assert lod_deviation(4, 1, 0.5, finest, coarsest) == coarsest
+    assert lod_deviation(4, 1e6, 0.5, finest, coarsest) == finest
+
+    # in between: a power of 2 multiple of the finest deviation, keeping the
+    # chordal error below the threshold
+    d = lod_deviation(4, 100, 0.5, finest, coarsest)
+    assert finest < d < coarsest
+    assert (d / finest) == 2 ** round(log2(d / finest))
+    assert 4 * 4 * d * 100 <= 0.5
+
+    # small zoom changes give the same level
+    assert lod_deviation(4, 101, 0.5, finest, coarsest) == d
+
+    # bigger objects get finer meshes
+    assert lod_deviation(40, 100, 0.5, finest, coarsest) < d
+
+    # lod disabled by the settings
+    assert lod_deviation(4, 1, 0.5, coarsest, coarsest) == coarsest
+    assert lod_deviation(0, 1, 0.5, finest, coarsest) == finest
+
+
+def test_lod_items(qtbot):
+
+    from PyQt5.QtCore import QObject
+    from cq_editor.cq_utils import make_AIS
+    from cq_editor.widgets.viewer import LevelOfDetail, OCCViewer
+
+    class Viewer(QObject):
+        preferences = OCCViewer.preferences
+
+    viewer = Viewer()
+    lod = LevelOfDetail(viewer)
+
+    ais, _ = make_AIS(cq.Workplane().box(1, 2, 3))
+    ais2, _ = make_AIS(cq.Workplane().box(3, 2, 1))
+
+    # shapes displayed again are tracked once
+    lod.add([ais, ais2])
+    lod.add([ais])
+    assert len(lod.items) == 2
+
+    # removed shapes are not refined anymore
+    lod.remove([ais])
+    assert [item[0] for item in lod.items.values()] == [ais2]
+
+    lod.clear()
+    assert not lod.items
+
+
+def test_redraw_scheduler(qtbot):
+
+    from time import perf_counter
+
+    from cq_editor.widgets.viewer import RedrawScheduler
+
+    calls = []
+    scheduler = RedrawScheduler(lambda: calls.append(perf_counter()), max_fps=20)
+
+    # e.g. hiding 200 items
+    for _ in range(200):
+        scheduler.request()
+
+    assert calls == []
+    qtbot.waitUntil(lambda: len(calls) == 1)
+
+    assert scheduler.coalesced == 200
+    assert scheduler.frames == 1
+
+    # frame rate limit
+    scheduler.request()
+    scheduler.request()
+    qtbot.waitUntil(lambda: len(calls) == 2)
+
+    assert calls[1] - calls[0] >= 1 / 20 - 0.005
+    assert scheduler.coalesced == 2
+    assert scheduler.requests == 202
+    assert 0 < scheduler.fps <= 20 + 1
+
+    # nothing pending
+    scheduler.flush()
+    assert len(calls) == 2
+
+
+code_stream = """import cadquery as cq
+
+for i in range(3):
+    show_object(cq.Workplane().box(1, 1, 1).translate((2 * i, 0, 0)), name=f"b{i}")
+"""
+
+
+def test_stream_objects(qtbot):
+
+    from cq_editor.render_worker import run_job, deserialize_objects
+    from cq_editor.widgets.object_tree import ObjectTree
+
+    messages = []
+    status, payload = run_job(dict(script=code_stream, stream=True), messages.append)
+
+    # every show_object call is sent right away
+    assert status == "ok"
+    assert payload == {}
+    assert [msg[0] for msg in messages] == ["object"] * 3
+    assert [list(msg[1]) for msg in messages] == [["b0"], ["b1"], ["b2"]]
+
+    # without show_object everything comes with the result
+    previous = []
+    status, payload = run_job(dict(script=code, stream=True), previous.append)
+    assert previous == []
+    assert list(payload) == ["result"]
+
+    tree = ObjectTree(None)
+    qtbot.addWidget(tree)
+    tree.addObjects(deserialize_objects(payload))
+
+    streamed = {}
+    for _, data in messages:
+        streamed.update(deserialize_objects(data))
+
+    with qtbot.waitSignal(tree.sigObjectsAdded[list, bool]) as blocker:
+        tree.streamObjects(streamed)
+
+    # streamed objects are added next to the ones of the previous run
+    assert len(blocker.args[0]) == 3
+    assert tree.CQ.childCount() == 4
+
+    # the final result keeps the streamed items and removes the old ones
+    with qtbot.waitSignal(tree.sigObjectsRemoved) as removed:
+        with qtbot.waitSignal(tree.sigObjectsAdded[list]) as added:
+            tree.addObjects(streamed)
+
+    assert added.args[0] == []
+    assert len(removed.args[0]) == 1
+    assert not tree._streaming
+
+    names = [tree.CQ.child(i).properties["Name"] for i in range(3)]
+    assert names == ["b0", "b1", "b2"]
+
+    # objects changed after they were shown are sent again with the result
+    script = (
+        "import cadquery as cq\n"
+        "a = cq.Assembly()\n"
+        "a.add(cq.Workplane().box(1, 1, 1))\n"
+        "show_object(a, name='assy')\n"
+        "a.add(cq.Workplane().sphere(1))\n"
+    )
+
+    messages = []
+    status, payload = run_job(dict(script=script, stream=True), messages.append)
+
+    assert status == "ok"
+    assert [list(msg[1]) for msg in messages] == [["assy"]]
+    assert list(payload) == ["assy"]
+    assert len(deserialize_objects(payload)["assy"].shape.toCompound().Solids()) == 2
+
+
+def test_stream_objects_error(qtbot):
+
+    from cq_editor.render_worker import run_job, deserialize_objects
+    from cq_editor.widgets.debugger import Debugger
+    from cq_editor.widgets.object_tree import ObjectTree
+
+    tree = ObjectTree(None)
+    qtbot.addWidget(tree)
+
+    debugger = Debugger(None)
+    debugger.sigObjectsStreamed.connect(tree.streamObjects)
+    debugger.sigStreamAborted.connect(tree.abortStream)
+
+    # the previous run
+    _, payload = run_job(dict(script=code, stream=True), lambda msg: None)
+    tree.addObjects(deserialize_objects(payload))
+
+    messages = []
+    result = run_job(dict(script=code_stream + "f()\n", stream=True), messages.append)
+    assert result[0] == "error"
+
+    for _, data in messages:
+        debugger._handle_worker_objects(data)
+
+    assert tree._streaming
+    assert tree.CQ.childCount() == 4
+
+    # the items of the previous run are kept like after a failed render in
+    # the GUI process
+    with qtbot.waitSignal(debugger.sigStreamAborted):
+        debugger._handle_worker_result(result)
+
+    assert not tree._streaming and debugger._streamed == {}
+
+    names = [tree.CQ.child(i).properties["Name"] for i in range(tree.CQ.childCount())]
+    assert names == ["result", "b0", "b1", "b2"]
+
+    # the next render is not streamed
+    with qtbot.waitSignal(tree.sigObjectsAdded[list]):
+        tree.addObjects(deserialize_objects(payload))
+
+    assert tree.CQ.childCount() == 1
+
+
+def test_selection_index(qtbot):
+
+    from types import SimpleNamespace
+    from cq_editor.widgets.object_tree import ObjectTree
+
+    tree = ObjectTree(None)
+    qtbot.addWidget(tree)
+
+    objects = {
+        f"b{i}": SimpleNamespace(
+            shape=cq.Workplane().box(1, 1, 1).translate((2 * i, 0, 0)), options={}
+        )
+        for i in range(20)
+    }
+    tree.addObjects(objects)
+
+    assert len(tree._index) == 20
+
+    items = [tree.CQ.child(i) for i in (3, 7)]
+    shapes = [item.ais.Shape() for item in items]
+
+    with qtbot.waitSignal(tree.sigAISObjectsSelected) as blocker:
+        tree.handleGraphicalSelection(shapes)
+
+    assert tree.tree.selectedItems() == items
+    assert blocker.args[0] == [item.ais for item in items]
+
+    # same TShape but a different location or orientation
+    moved = shapes[0].Moved(cq.Location((0, 0, 1)).wrapped)
+    tree.handleGraphicalSelection([moved, shapes[1].Reversed()])
+    assert tree.tree.selectedItems() == []
+
+    # index follows removals and redisplays
+    tree.removeObjects()
+    assert len(tree._index) == 0
+    tree.handleGraphicalSelection(shapes)
+    assert tree.tree.selectedItems() == []
+
+    tree.addObjects(objects)
+    item = tree.CQ.child(5)
+    tree.handleGraphicalSelection([item.ais.Shape()])
+    assert tree.tree.selectedItems() == [item]
+
+
+def test_lazy_components(qtbot):
+
+    from PyQt5.QtWidgets import QMainWindow
+
+    from cq_editor.mixins import MainMixin
+    from cq_editor.utils import dock
+
+    class Window(QMainWindow, MainMixin):
+
+        name = "CQ-editor-lazy-test"
+
+        def __init__(self):
+
+            super(Window, self).__init__()
+            MainMixin.__init__(self)
+
+            self.loaded = []
+
+        def componentLoaded(self, name, component):
+
+            self.loaded.append(name)
+
+    win = Window()
+    qtbot.addWidget(win)
+
+    win.registerComponent(
+        "traceback_viewer",
+        ".widgets.traceback_viewer:TracebackPane",
+        lambda c: dock(c, "Current traceback", win),
+        lazy=True,
+    )
+    win.registerComponent(
+        "log",
+        ".widgets.log:LogViewer",
+        lambda c: dock(c, "Log viewer", win),
+        lazy=True,
+    )
+    win.connectComponent(win.windowTitleChanged, "log", "append")
+
+    assert len(win.components) == 0
+    assert "not yet" in win.startupReport()
+
+    # a signal targeting a lazy component creates it
+    win.setWindowTitle("hello")
+
+    log = win.components["log"]
+    assert win.loaded == ["log"]
+    assert win.docks["log"].widget() is log
+    assert log.toPlainText() == "hello"
+
+    win.setWindowTitle("world")
+    assert log.toPlainText() == "helloworld"
+
+    # created after the dock becomes visible
+    win.show()
+    assert "traceback_viewer" not in win.components
+
+    qtbot.waitUntil(lambda: "traceback_viewer" in win.components)
+    assert win.loaded == ["log", "traceback_viewer"]
+    assert win.docks["traceback_viewer"].widget() is win.components["traceback_viewer"]
+
+    assert win.timings["log"].lazy
+    assert win.timings["log"].construction_time > 0
+    assert "traceback_viewer" in win.startupReport()
+
+    with pytest.raises(KeyError):
+        win.components["missing"]
+
+    # the excluded components stay pending
+    win.registerComponent("log2", ".widgets.log:LogViewer", lazy=True)
+    win.registerComponent(
+        "traceback_viewer2", ".widgets.traceback_viewer:TracebackPane", lazy=True
+    )
+
+    win.loadComponents(exclude=("log2",))
+    assert "traceback_viewer2" in win.components
+    assert "log2" not in win.components
+
+
+def test_console_kernel_startup(qtbot):
+
+    from cq_editor.widgets.console import ConsoleWidget
+
+    console = ConsoleWidget()
+    qtbot.addWidget(console)
+
+    # queued until the kernel is started in the background
+    console.push_vars({"a": 1})
+    assert not console.kernel_ready
+    assert "Starting" in console._control.toPlainText()
+
+    qtbot.waitUntil(lambda: console.kernel_ready, timeout=30000)
+
+    shell = console.kernel_manager.kernel.shell
+    assert shell.user_ns["a"] == 1
+    assert console.startup_time > 0
+
+    console.execute_command("b = a + 1")
+    assert shell.user_ns["b"] == 2
+
+    # commands wait for the kernel
+    console = ConsoleWidget()
+    qtbot.addWidget(console)
+
+    console.push_vars({"c": 3})
+    console.execute_command("d = 2 * c")
+
+    assert console.kernel_ready
+    assert console.kernel_manager.kernel.shell.user_ns["d"] == 6
+
+
+def test_completer(qtbot):
+
+    from time import perf_counter
+
+    from cq_editor.completion import Completer, ScriptCache
+
+    cache = ScriptCache()
+
+    assert cache.complete("import cadquery as cq\nres = cq.W") == [
+        "Wire",
+        "Workplane",
+    ]
+
+    text = "import cadquery as cq\nres = cq.Workplane().box("
+    assert cache.complete(
+        text, line=2, column=len("res = cq.Workplane().box("), signatures=True
+    ) == ["box(length,width,height,centered=True,combine=True,clean=True)"]
+
+    # cadquery is inferred already
+    t0 = perf_counter()
+    assert "box" in cache.complete("import cadquery as cq\nres = cq.Workplane().")
+    assert perf_counter() - t0 < 1
+
+    completer = Completer(warmup=None)
+    results = []
+
+    def callback(*args):
+        results.append(args)
+
+    # only the newest pending request is answered
+    completer.submit("import os\nos.pa", None, 2, 5, False, callback)
+    request_id = completer.submit("import os\nos.ge", None, 2, 5, False, callback)
+
+    qtbot.waitUntil(lambda: completer.poll() == 0, timeout=30000)
+
+    assert len(results) == 1
+    assert results[0][0] == request_id
+    assert "getcwd" in results[0][1]
+
+    process = completer._process
+    completer.shutdown()
+    assert not process.is_alive() and completer._process is None
+
+    # a process that died on its own
+    completer.start()
+    completer._process.kill()
+    completer._process.join()
+    completer.shutdown()
+    assert completer._process is None
+
+
+def test_highlighter(qtbot):
+
+    from PyQt5.QtGui import QTextDocument, QTextCursor
+    from PyQt5.QtWidgets import QPlainTextDocumentLayout
+
+    from cq_editor.widgets.pyhighlight import (
+        PythonHighlighter,
+        STYLES,
+        NORMAL,
+        IN_TRIPLE_DOUBLE,
+    )
+
+    class CountingHighlighter(PythonHighlighter):
+
+        calls = 0
+
+        def highlightBlock(self, text):
+
+            self.calls += 1
+            super(CountingHighlighter, self).highlightBlock(text)
+
+    def styles(block):
+
+        return {
+            block.text()[r.start : r.start + r.length]: next(
+                k for k, v in STYLES.items() if v == r.format
+            )
+            for r in block.layout().formats()
+        }
+
+    doc = QTextDocument()
+    # changes are signaled only with a layout
+    doc.setDocumentLayout(QPlainTextDocumentLayout(doc))
+    doc.setPlainText(
+        'def f(self):\n    """doc\n    s = "\'\'\'"\n    """\n    return "a" + 1.5  # c\n'
+        + "x = 1\n" * 1000
+    )
+
+    # the document is highlighted after returning to the event loop
+    highlighter = CountingHighlighter(doc)
+    qtbot.waitUntil(lambda: highlighter.calls > 0)
+
+    block = doc.firstBlock()
+    assert styles(block) == {
+        "def": "keyword",
+        "f": "defclass",
+        "(": "brace",
+        "self": "self",
+        ")": "brace",
+    }
+
+    block = block.next()
+    assert block.userState() == IN_TRIPLE_DOUBLE
+    assert styles(block) == {'"""doc': "string2"}
+
+    block = block.next()
+    assert block.userState() == IN_TRIPLE_DOUBLE
+    assert styles(block) == {block.text(): "string2"}
+
+    block = block.next()
+    assert block.userState() == NORMAL
+
+    block = block.next()
+    assert styles(block) == {
+        "return": "keyword",
+        '"a"': "string",
+        "+": "operator",
+        "1.5": "numbers",
+        "# c": "comment",
+    }
+
+    # only the edited block is highlighted again
+    highlighter.calls = 0
+    cursor = QTextCursor(doc.findBlockByNumber(10))
+    cursor.insertText("y")
+
+    assert highlighter.calls == 1
+
+    # until the state of the following blocks does not change anymore
+    highlighter.calls = 0
+    cursor = QTextCursor(doc.findBlockByNumber(500))
+    cursor.insertText('"""')
+
+    assert highlighter.calls > 500
+    assert doc.lastBlock().previous().userState() == IN_TRIPLE_DOUBLE
+
+    highlighter.calls = 0
+    cursor.deletePreviousChar()
+
+    assert highlighter.calls > 500
+    assert doc.lastBlock().previous().userState() == NORMAL